@@ -4,6 +4,10 @@ from . import production
 from . import sources
 from . import analysis
 from . import plot
+from . import compression
+from . import metrics
+from . import provenance
+from . import work_queue
 
 import os
 import numpy as np
@@ -12,6 +16,10 @@ import json_line_logger
 import plenopy
 from importlib import resources as importlib_resources
 import subprocess
+import functools
+import importlib
+import sebastians_matplotlib_addons as sebplt
+import merlict_development_kit_python
 
 
 def init(work_dir, random_seed=42, minimal=False):
@@ -20,67 +28,328 @@ def init(work_dir, random_seed=42, minimal=False):
 
 
 def run(work_dir, pool=None, logger=None):
+    """
+    Makes everything in work_dir which does not exist yet. Each chain of
+    an instrument and an observation, from its light-field-geometry, to its
+    responses, to its analysis, to its plots, runs as soon as its own
+    inputs exist, see make_tasks() and production.dag.
+
+    Pass pool=work_queue.Pool(work_dir) to share the jobs with workers on
+    other nodes, see plenoptics.work_queue.
+    """
     config = utils.config_if_None(work_dir=work_dir, config=None)
     logger = utils.LoggerStdout_if_None(logger=logger)
     pool = utils.pool_if_None(pool=pool)
 
     logger.info("Start")
-
-    logger.info("Make light-field-geometryies")
-    production.light_field_geometry.run(
-        work_dir=work_dir, pool=pool, logger=logger
+    production.dag.run(
+        tasks=make_tasks(work_dir=work_dir, config=config),
+        pool=pool,
+        logger=logger,
     )
-    logger.info("Light-field-geometryies done")
+    logger.info("Done")
 
-    logger.info("Make observations")
-    production.observations.run(work_dir=work_dir, pool=pool, logger=logger)
-    logger.info("Observations done")
 
-    logger.info("Make Analysis")
-    production.analysis.run(work_dir=work_dir, pool=pool, logger=logger)
-    logger.info("Analysis done")
+def make_tasks(work_dir, config=None):
+    """
+    Returns the tasks to make everything in work_dir for production.dag.
+    """
+    config = utils.config_if_None(work_dir=work_dir, config=config)
+    lfg = production.light_field_geometry
+    obs = production.observations
+    ana = production.analysis
+    tasks = []
+
+    for ikey in config["instruments"]:
+        tasks.append(
+            _task(
+                work_dir=work_dir,
+                key=_task_key("lfg_sceneries", ikey),
+                depends_on=[],
+                make_jobs=functools.partial(
+                    _jobs_of_instrument,
+                    planner=functools.partial(
+                        lfg.make_sceneries_make_jobs, work_dir=work_dir
+                    ),
+                    instrument_key=ikey,
+                ),
+                run_job=lfg.make_sceneries_run_job,
+            )
+        )
+        tasks.append(
+            _task(
+                work_dir=work_dir,
+                key=_task_key("lfg_map", ikey),
+                depends_on=[_task_key("lfg_sceneries", ikey)],
+                make_jobs=functools.partial(
+                    _first,
+                    planner=functools.partial(
+                        lfg.map_and_reduce_make_jobs,
+                        work_dir=work_dir,
+                        instrument_keys=[ikey],
+                    ),
+                ),
+                run_job=merlict_development_kit_python.light_field_calibration.run_job,
+            )
+        )
+        tasks.append(
+            _task(
+                work_dir=work_dir,
+                key=_task_key("lfg_reduce", ikey),
+                depends_on=[_task_key("lfg_map", ikey)],
+                make_jobs=functools.partial(
+                    lfg.reduce_make_jobs,
+                    work_dir=work_dir,
+                    instrument_keys=[ikey],
+                ),
+                run_job=lfg.reduce_run_job,
+            )
+        )
+        tasks.append(
+            _task(
+                work_dir=work_dir,
+                key=_task_key("lfg_plot", ikey),
+                depends_on=[_task_key("lfg_reduce", ikey)],
+                make_jobs=functools.partial(
+                    _jobs_of_instrument,
+                    planner=functools.partial(
+                        lfg.plot_make_jobs, work_dir=work_dir
+                    ),
+                    instrument_key=ikey,
+                ),
+                run_job=lfg.plot_run_job,
+            )
+        )
+        # The plot is written into the light-field-geometry's directory.
+        # Publish after it, or the publication would be outdated.
+        tasks.append(
+            _task(
+                work_dir=work_dir,
+                key=_task_key("lfg_publish", ikey),
+                depends_on=[_task_key("lfg_plot", ikey)],
+                make_jobs=functools.partial(
+                    _jobs_of_instrument,
+                    planner=functools.partial(
+                        lfg.publish_make_jobs, work_dir=work_dir
+                    ),
+                    instrument_key=ikey,
+                ),
+                run_job=lfg.publish_run_job,
+            )
+        )
 
-    logger.info("Make Plots")
+    stages = [
+        ("responses_map", obs._make_mapping_jobs, "responses"),
+        ("responses_reduce", obs._make_reducing_jobs, "responses"),
+        ("analysis_map", obs._make_mapping_jobs, "analysis"),
+        ("analysis_reduce", obs._make_reducing_jobs, "analysis"),
+    ]
+    run_jobs = {
+        "responses_map": obs._observations_run_mapjob,
+        "responses_reduce": obs._observations_run_reducejob,
+        "analysis_map": ana._analysis_run_mapjob,
+        "analysis_reduce": ana._analysis_run_reducejob,
+    }
+    star_summaries = []
+
+    for ikey in config["observations"]["instruments"]:
+        for okey in config["observations"]["instruments"][ikey]:
+            depends_on = [_task_key("lfg_publish", ikey)]
+            for stage, planner, task_key in stages:
+                tasks.append(
+                    _task(
+                        work_dir=work_dir,
+                        key=_task_key(stage, ikey, okey),
+                        depends_on=depends_on,
+                        make_jobs=functools.partial(
+                            _jobs_of_instrument,
+                            planner=functools.partial(
+                                planner,
+                                config=config,
+                                work_dir=work_dir,
+                                task_key=task_key,
+                            ),
+                            instrument_key=ikey,
+                            observation_key=okey,
+                        ),
+                        run_job=run_jobs[stage],
+                    )
+                )
+                depends_on = [_task_key(stage, ikey, okey)]
+
+            if okey in ["star", "point"]:
+                tasks.append(
+                    _task(
+                        work_dir=work_dir,
+                        key=_task_key("analysis_summary", ikey, okey),
+                        depends_on=depends_on,
+                        make_jobs=functools.partial(
+                            _jobs_of_instrument,
+                            planner=functools.partial(
+                                ana._make_summary_jobs,
+                                config=config,
+                                work_dir=work_dir,
+                            ),
+                            instrument_key=ikey,
+                            observation_key=okey,
+                        ),
+                        run_job=ana._analysis_run_summaryjob,
+                    )
+                )
+            if okey == "star":
+                star_summaries.append(
+                    _task_key("analysis_summary", ikey, okey)
+                )
 
-    logger.info("Plot beam statistics")
-    pjobs = _plot_beam_statistics_make_jobs(work_dir=work_dir, config=config)
-    logger.info("{:d} jobs to do".format(len(pjobs)))
-    pool.map(_run_script_job, pjobs)
+        tasks.append(
+            _task(
+                work_dir=work_dir,
+                key=_task_key("plot_beam_statistics", ikey),
+                depends_on=[_task_key("lfg_reduce", ikey)],
+                make_jobs=functools.partial(
+                    _plot_beam_statistics_make_jobs,
+                    work_dir=work_dir,
+                    config=config,
+                    instrument_keys=[ikey],
+                ),
+                run_job=_run_script_job,
+            )
+        )
+        if "point" in config["observations"]["instruments"][ikey]:
+            tasks.append(
+                _task(
+                    work_dir=work_dir,
+                    key=_task_key("plot_depth", ikey),
+                    depends_on=[_task_key("analysis_summary", ikey, "point")],
+                    make_jobs=functools.partial(
+                        _plot_depth_make_jobs,
+                        work_dir=work_dir,
+                        config=config,
+                        instrument_keys=[ikey],
+                    ),
+                    run_job=_run_script_job,
+                )
+            )
+        if "phantom" in config["observations"]["instruments"][ikey]:
+            tasks.append(
+                _task(
+                    work_dir=work_dir,
+                    key=_task_key("plot_phantom", ikey),
+                    depends_on=[
+                        _task_key("responses_reduce", ikey, "phantom")
+                    ],
+                    make_jobs=functools.partial(
+                        _plot_phantom_source_make_jobs,
+                        work_dir=work_dir,
+                        config=config,
+                        instrument_keys=[ikey],
+                    ),
+                    run_job=_run_script_job,
+                )
+            )
 
-    logger.info("Plot mirror deformations")
-    pjobs = _plot_mirror_deformations_make_jobs(
-        work_dir=work_dir, config=config
+    tasks.append(
+        _task(
+            work_dir=work_dir,
+            key=_task_key("plot_mirror_deformations"),
+            depends_on=[],
+            make_jobs=functools.partial(
+                _plot_mirror_deformations_make_jobs,
+                work_dir=work_dir,
+                config=config,
+            ),
+            run_job=_run_script_job,
+        )
+    )
+    tasks.append(
+        _task(
+            work_dir=work_dir,
+            key=_task_key("plot_guide_stars_cmap"),
+            depends_on=[],
+            make_jobs=functools.partial(
+                _plot_guide_stars_cmap_make_jobs,
+                work_dir=work_dir,
+                config=config,
+            ),
+            run_job=_run_script_job,
+        )
+    )
+    tasks.append(
+        _task(
+            work_dir=work_dir,
+            key=_task_key("plot_guide_stars"),
+            depends_on=[_task_key("plot_guide_stars_cmap")] + star_summaries,
+            make_jobs=functools.partial(
+                _plot_guide_stars_make_jobs,
+                work_dir=work_dir,
+                config=config,
+            ),
+            run_job=_run_script_job,
+        )
     )
-    logger.info("{:d} jobs to do".format(len(pjobs)))
-    pool.map(_run_script_job, pjobs)
+    tasks.append(
+        _task(
+            work_dir=work_dir,
+            key=_task_key("plot_guide_stars_vs_offaxis"),
+            depends_on=star_summaries,
+            make_jobs=functools.partial(
+                _plot_guide_stars_vs_offaxis_make_jobs,
+                work_dir=work_dir,
+                config=config,
+            ),
+            run_job=_run_script_job,
+        )
+    )
+    return tasks
 
-    logger.info("Plot guide stars")
-    plot_guide_stars(work_dir=work_dir, pool=pool, logger=logger)
 
-    logger.info("Plot guide stars vs. offaxis")
-    plot_guide_stars_vs_offaxis(work_dir=work_dir, logger=logger)
+def _task(work_dir, key, depends_on, make_jobs, run_job):
+    # Each job appends its wall-time, cpu-time, memory and io to the
+    # metrics in work_dir, see plenoptics.metrics.
+    return {
+        "key": key,
+        "depends_on": depends_on,
+        "make_jobs": make_jobs,
+        "run_job": functools.partial(
+            metrics.run_job_and_record,
+            run_job=run_job,
+            work_dir=work_dir,
+            stage=key.split("/")[0],
+        ),
+    }
 
-    logger.info("Plot depth")
-    pjobs = _plot_depth_make_jobs(work_dir=work_dir, config=config)
-    logger.info("{:d} jobs to do".format(len(pjobs)))
-    pool.map(_run_script_job, pjobs)
 
-    logger.info("Plot phantom")
-    pjobs = _plot_phantom_source_make_jobs(work_dir=work_dir, config=config)
-    logger.info("{:d} jobs to do".format(len(pjobs)))
-    pool.map(_run_script_job, pjobs)
+def _task_key(stage, *keys):
+    return str.join("/", [stage] + list(keys))
+
+
+def _jobs_of_instrument(planner, instrument_key, observation_key=None):
+    out = []
+    for job in planner():
+        if job["instrument_key"] != instrument_key:
+            continue
+        if observation_key is not None:
+            if job["observation_key"] != observation_key:
+                continue
+        out.append(job)
+    return out
 
-    logger.info("Plots done")
-    logger.info("Done")
 
+def _first(planner):
+    return planner()[0]
 
-def _plot_beam_statistics_make_jobs(work_dir, config=None):
+
+def _plot_beam_statistics_make_jobs(
+    work_dir, config=None, instrument_keys=None
+):
     config = utils.config_if_None(work_dir=work_dir, config=config)
+    if instrument_keys is None:
+        instrument_keys = list(config["observations"]["instruments"].keys())
     jobs = []
     for ylim in [False, True]:
         ylim_dir = "ylim_based_on_num_channels" if ylim else "ylim_guess"
         for colormode_key in config["plot"]["colormodes"]:
-            for instrument_key in config["observations"]["instruments"]:
+            for instrument_key in instrument_keys:
                 out_dir = os.path.join(
                     work_dir,
                     "plots",
@@ -95,9 +364,14 @@ def _plot_beam_statistics_make_jobs(work_dir, config=None):
                     instrument_key,
                     "light_field_geometry",
                 )
-                if not os.path.exists(out_dir):
+                digest = provenance.instrument_digest(
+                    config=config, instrument_key=instrument_key
+                )
+                if _plot_is_due(out_dir=out_dir, digest=digest):
                     job = {
                         "script": "plot_beams_statistics",
+                        "out_dir": out_dir,
+                        "digest": digest,
                         "argv": [
                             "--light_field_geometry_path",
                             lfg_dir,
@@ -142,9 +416,16 @@ def _plot_mirror_deformations_make_jobs(work_dir, config=None):
                     deformation_key + ".json",
                 )
 
-                if not os.path.exists(outpath):
+                digest = provenance.mirror_deformation_digest(
+                    config=config,
+                    mirror_key=mirror_key,
+                    deformation_key=deformation_key,
+                )
+                if _plot_is_due(out_dir=outpath, digest=digest):
                     job = {
                         "script": "plot_mirror_deformation",
+                        "out_dir": outpath,
+                        "digest": digest,
                         "argv": [
                             mirror_dimensions_path,
                             mirror_deformations_path,
@@ -158,22 +439,31 @@ def _plot_mirror_deformations_make_jobs(work_dir, config=None):
     return jobs
 
 
-def _plot_depth_make_jobs(work_dir, config=None):
+def _plot_depth_make_jobs(work_dir, config=None, instrument_keys=None):
     config = utils.config_if_None(work_dir=work_dir, config=config)
+    if instrument_keys is None:
+        instrument_keys = list(config["observations"]["instruments"].keys())
 
     jobs = []
     for colormode_key in config["plot"]["colormodes"]:
-        for instrument_key in config["observations"]["instruments"]:
+        for instrument_key in instrument_keys:
             if (
                 "point"
                 in config["observations"]["instruments"][instrument_key]
             ):
+                digest = provenance.analysis_digest(
+                    config=config,
+                    instrument_key=instrument_key,
+                    observation_key="point",
+                )
                 depth_out_dir = os.path.join(
                     work_dir, "plots", colormode_key, "depth", instrument_key
                 )
-                if not os.path.exists(depth_out_dir):
+                if _plot_is_due(out_dir=depth_out_dir, digest=digest):
                     job = {
                         "script": "plot_depth",
+                        "out_dir": depth_out_dir,
+                        "digest": digest,
                         "argv": [
                             "--work_dir",
                             work_dir,
@@ -194,9 +484,11 @@ def _plot_depth_make_jobs(work_dir, config=None):
                     "depth_refocus",
                     instrument_key,
                 )
-                if not os.path.exists(depth_refocus_out_dir):
+                if _plot_is_due(out_dir=depth_refocus_out_dir, digest=digest):
                     job = {
                         "script": "plot_depth_refocus",
+                        "out_dir": depth_refocus_out_dir,
+                        "digest": digest,
                         "argv": [
                             "--work_dir",
                             work_dir,
@@ -212,12 +504,16 @@ def _plot_depth_make_jobs(work_dir, config=None):
     return jobs
 
 
-def _plot_phantom_source_make_jobs(work_dir, config=None):
+def _plot_phantom_source_make_jobs(
+    work_dir, config=None, instrument_keys=None
+):
     config = utils.config_if_None(work_dir=work_dir, config=config)
+    if instrument_keys is None:
+        instrument_keys = list(config["observations"]["instruments"].keys())
 
     jobs = []
     for colormode_key in config["plot"]["colormodes"]:
-        for instrument_key in config["observations"]["instruments"]:
+        for instrument_key in instrument_keys:
             if (
                 "phantom"
                 in config["observations"]["instruments"][instrument_key]
@@ -226,9 +522,16 @@ def _plot_phantom_source_make_jobs(work_dir, config=None):
                     work_dir, "plots", colormode_key, "phantom", instrument_key
                 )
 
-                if not os.path.exists(out_dir):
+                digest = provenance.responses_digest(
+                    config=config,
+                    instrument_key=instrument_key,
+                    observation_key="phantom",
+                )
+                if _plot_is_due(out_dir=out_dir, digest=digest):
                     job = {
                         "script": "plot_phantom_source",
+                        "out_dir": out_dir,
+                        "digest": digest,
                         "argv": [
                             "--work_dir",
                             work_dir,
@@ -245,7 +548,43 @@ def _plot_phantom_source_make_jobs(work_dir, config=None):
 
 
 def _run_script_job(job):
-    return _run_script(script=job["script"], argv=job["argv"])
+    rc = _run_script_in_process(script=job["script"], argv=job["argv"])
+    if "digest" in job:
+        provenance.write(path=job["out_dir"], digest=job["digest"])
+    return rc
+
+
+def _plot_is_due(out_dir, digest):
+    """
+    Returns True when the plots in out_dir need to be made. Plots made with
+    a different digest are removed first, see plenoptics.provenance.
+    """
+    provenance.remove_if_outdated(path=out_dir, digest=digest)
+    return not os.path.exists(out_dir)
+
+
+def _run_script_in_process(script, argv):
+    """
+    Runs the script with argv in this process instead of starting a new
+    python. The modules it imports, and the light-field-geometries it reads
+    via plenoptics.cache, stay loaded for the next job of this process.
+    Changes to matplotlib's rcParams do not leak into the next job.
+    """
+    if script.endswith(".py"):
+        script = script[: -len(".py")]
+
+    module = importlib.import_module("plenoptics.scripts." + script)
+    try:
+        args = module.make_argparser().parse_args(argv)
+    except SystemExit as err:
+        # Fail only this job, not the pool's worker.
+        msg = "Script '{:s}' exits with {:s} on argv {:s}.".format(
+            script, str(err.code), str(argv)
+        )
+        raise RuntimeError(msg) from err
+    with sebplt.matplotlib.rc_context():
+        module.run(args=args)
+    return 0
 
 
 def _run_script(script, argv):
@@ -268,60 +607,108 @@ def plot_guide_stars(work_dir, pool=None, logger=None, config=None):
     pool = utils.pool_if_None(pool=pool)
     config = utils.config_if_None(work_dir=work_dir, config=config)
 
+    jobs = _plot_guide_stars_cmap_make_jobs(work_dir=work_dir, config=config)
+    logger.debug("run script 'plot_image_of_star_cmap'")
+    pool.map(_run_script_job, jobs)
+
+    jobs = _plot_guide_stars_make_jobs(work_dir=work_dir, config=config)
+    pool.map(_run_script_job, jobs)
+
+
+def _plot_guide_stars_cmap_make_jobs(work_dir, config=None):
+    config = utils.config_if_None(work_dir=work_dir, config=config)
+
+    jobs = []
     for colormode_key in config["plot"]["colormodes"]:
         guide_stars_dir = os.path.join(
             work_dir, "plots", colormode_key, "guide_stars"
         )
-
         if not os.path.exists(guide_stars_dir):
-            logger.debug("run script 'plot_image_of_star_cmap'")
-            _run_script(
-                script="plot_image_of_star_cmap",
-                argv=["--work_dir", work_dir, "--out_dir", guide_stars_dir],
-            )
+            job = {
+                "script": "plot_image_of_star_cmap",
+                "argv": ["--work_dir", work_dir, "--out_dir", guide_stars_dir],
+            }
+            jobs.append(job)
+    return jobs
 
-            table_vmax = analysis.guide_stars.table_vmax(work_dir=work_dir)
-            vmax = analysis.guide_stars.table_vmax_max(table_vmax=table_vmax)
-
-            jobs = []
-            for instrument_key in table_vmax:
-                out_dir = os.path.join(guide_stars_dir, instrument_key)
-                if not os.path.exists(out_dir):
-                    logger.debug("missing '{:s}'".format(out_dir))
-                    for star_key in table_vmax[instrument_key]:
-                        job = {"script": "plot_image_of_star"}
-                        job["argv"] = [
-                            "--work_dir",
-                            work_dir,
-                            "--out_dir",
-                            out_dir,
-                            "--instrument_key",
-                            instrument_key,
-                            "--star_key",
-                            star_key,
-                            "--vmax",
-                            "{:e}".format(vmax),
-                            "--colormode",
-                            colormode_key,
-                        ]
-                        jobs.append(job)
 
-            pool.map(_run_script_job, jobs)
+def _plot_guide_stars_make_jobs(work_dir, config=None):
+    config = utils.config_if_None(work_dir=work_dir, config=config)
+
+    instrument_keys = (
+        analysis.guide_stars.list_instruments_observing_guide_stars(
+            config=config
+        )
+    )
+    # The stars of all instruments share the same vmax.
+    digest = _guide_stars_digest(config=config)
+    table_vmax = None
+    jobs = []
+    for colormode_key in config["plot"]["colormodes"]:
+        guide_stars_dir = os.path.join(
+            work_dir, "plots", colormode_key, "guide_stars"
+        )
+        for instrument_key in instrument_keys:
+            out_dir = os.path.join(guide_stars_dir, instrument_key)
+            if not _plot_is_due(out_dir=out_dir, digest=digest):
+                continue
+
+            if table_vmax is None:
+                table_vmax = analysis.guide_stars.table_vmax(work_dir=work_dir)
+                vmax = analysis.guide_stars.table_vmax_max(
+                    table_vmax=table_vmax
+                )
+
+            for star_key in table_vmax[instrument_key]:
+                job = {
+                    "script": "plot_image_of_star",
+                    "out_dir": out_dir,
+                    "digest": digest,
+                }
+                job["argv"] = [
+                    "--work_dir",
+                    work_dir,
+                    "--out_dir",
+                    out_dir,
+                    "--instrument_key",
+                    instrument_key,
+                    "--star_key",
+                    star_key,
+                    "--vmax",
+                    "{:e}".format(vmax),
+                    "--colormode",
+                    colormode_key,
+                ]
+                jobs.append(job)
+    return jobs
 
 
 def plot_guide_stars_vs_offaxis(work_dir, logger=None, config=None):
     logger = utils.LoggerStdout_if_None(logger=logger)
     config = utils.config_if_None(work_dir=work_dir, config=config)
 
+    for job in _plot_guide_stars_vs_offaxis_make_jobs(
+        work_dir=work_dir, config=config
+    ):
+        logger.info("Plot guide stars vs. offaxis")
+        _run_script_job(job)
+
+
+def _plot_guide_stars_vs_offaxis_make_jobs(work_dir, config=None):
+    config = utils.config_if_None(work_dir=work_dir, config=config)
+
+    digest = _guide_stars_digest(config=config)
+    jobs = []
     for colormode_key in config["plot"]["colormodes"]:
         out_dir = os.path.join(
             work_dir, "plots", colormode_key, "guide_stars_vs_offaxis"
         )
-        if not os.path.exists(out_dir):
-            logger.info("Plot guide stars vs. offaxis")
-            _run_script(
-                script="plot_image_of_star_vs_offaxis",
-                argv=[
+        if _plot_is_due(out_dir=out_dir, digest=digest):
+            job = {
+                "script": "plot_image_of_star_vs_offaxis",
+                "out_dir": out_dir,
+                "digest": digest,
+                "argv": [
                     "--work_dir",
                     work_dir,
                     "--out_dir",
@@ -329,7 +716,25 @@ def plot_guide_stars_vs_offaxis(work_dir, logger=None, config=None):
                     "--colormode",
                     colormode_key,
                 ],
-            )
+            }
+            jobs.append(job)
+    return jobs
+
+
+def _guide_stars_digest(config):
+    instrument_keys = (
+        analysis.guide_stars.list_instruments_observing_guide_stars(
+            config=config
+        )
+    )
+    star_digests = {}
+    for instrument_key in instrument_keys:
+        star_digests[instrument_key] = provenance.analysis_digest(
+            config=config,
+            instrument_key=instrument_key,
+            observation_key="star",
+        )
+    return provenance.digest(star_digests)
 
 
 def mv_observation(work_dir, observation_key="phantom", postfix=".old"):
@@ -0,0 +1,32 @@
+import argparse
+import plenoptics
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="plenoptics")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    worker = commands.add_parser(
+        "worker", help="Run the jobs in the queue of work_dir."
+    )
+    worker.add_argument("work_dir", type=str)
+    worker.add_argument("--poll_s", type=float, default=1.0)
+    worker.add_argument(
+        "--max_idle_s",
+        type=float,
+        default=None,
+        help="Stop after there were no jobs for this long.",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        plenoptics.work_queue.work(
+            work_dir=args.work_dir,
+            poll_s=args.poll_s,
+            max_idle_s=args.max_idle_s,
+        )
+
+
+if __name__ == "__main__":
+    main()
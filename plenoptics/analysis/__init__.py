@@ -1,4 +1,7 @@
 from . import image
+from . import image_stack
 from . import statistical_estimators
 from . import point_source_report
 from . import guide_stars
+from . import compact_response
+from . import summary
@@ -0,0 +1,123 @@
+"""
+A compact representation of a plenoscope's raw sensor response which
+holds only what the analysis of stars and points needs:
+
+- The number of photons in each lixel (point analysis).
+- The isochor weights of each lixel and of each time-slice (star
+  analysis).
+
+Unlike the raw sensor response, it does not contain the arrival time of
+each individual photon.
+"""
+import numpy as np
+import plenopy
+
+
+def make(raw_sensor_response, light_field_geometry):
+    """
+    Returns the compact response of the raw_sensor_response.
+
+    Parameters
+    ----------
+    raw_sensor_response : dict
+        The raw sensor response as read by
+        plenopy.raw_light_field_sensor_response.read().
+    light_field_geometry : plenopy.LightFieldGeometry
+        The geometry of the plenoscope which recorded the response.
+        Used to correct the arrival times of the photons for the
+        time-delays of the beams.
+    """
+    out = make_header(raw_sensor_response=raw_sensor_response)
+    out["number_lixel"] = int(light_field_geometry.number_lixel)
+    out.update(make_lixel_counts(raw_sensor_response=raw_sensor_response))
+    out.update(
+        make_isochor_weights(
+            raw_sensor_response=raw_sensor_response,
+            light_field_geometry=light_field_geometry,
+        )
+    )
+    return out
+
+
+def make_header(raw_sensor_response):
+    rsr = raw_sensor_response
+    return {
+        "number_photons": int(rsr["number_photons"]),
+        "time_slice_duration": float(rsr["time_slice_duration"]),
+        "number_time_slices": int(rsr["number_time_slices"]),
+    }
+
+
+def make_lixel_counts(raw_sensor_response):
+    (
+        _,
+        lixel_ids,
+    ) = plenopy.light_field_sequence.photon_arrival_times_and_lixel_ids(
+        raw_sensor_response=raw_sensor_response
+    )
+    lixel_ids, lixel_num_photons = np.unique(lixel_ids, return_counts=True)
+    return {
+        "lixel_ids": lixel_ids.astype(np.uint32),
+        "lixel_num_photons": lixel_num_photons.astype(np.uint32),
+    }
+
+
+def make_isochor_weights(raw_sensor_response, light_field_geometry):
+    isochor_image_seqence = plenopy.light_field_sequence.make_isochor_image(
+        raw_sensor_response=raw_sensor_response,
+        time_delay_image_mean=light_field_geometry.time_delay_image_mean,
+    )
+    lixel_weights = isochor_image_seqence.sum(axis=0)
+    (lixel_ids,) = np.nonzero(lixel_weights)
+    return {
+        "isochor_time_weights": isochor_image_seqence.sum(axis=1),
+        "isochor_lixel_ids": lixel_ids.astype(np.uint32),
+        "isochor_lixel_weights": lixel_weights[lixel_ids],
+    }
+
+
+def isochor_lixel_weights(compact_response, number_lixel):
+    """
+    Returns the dense array of the isochor weights of all lixels.
+    """
+    out = np.zeros(number_lixel)
+    out[compact_response["isochor_lixel_ids"]] = compact_response[
+        "isochor_lixel_weights"
+    ]
+    return out
+
+
+def participating_beams(compact_response):
+    """
+    Returns the participating beams as used in sources.point.
+    """
+    return {
+        "beam_ids": compact_response["lixel_ids"].astype(np.int64),
+        "num_photons": compact_response["lixel_num_photons"].astype(np.int64),
+    }
+
+
+SCALAR_KEYS = {
+    "number_photons": int,
+    "time_slice_duration": float,
+    "number_time_slices": int,
+    "number_lixel": int,
+}
+
+
+def write(f, compact_response):
+    arrays = {}
+    for key in compact_response:
+        arrays[key] = np.asarray(compact_response[key])
+    np.savez_compressed(f, **arrays)
+
+
+def read(f):
+    out = {}
+    with np.load(f) as arrays:
+        for key in arrays.files:
+            if key in SCALAR_KEYS:
+                out[key] = SCALAR_KEYS[key](arrays[key])
+            else:
+                out[key] = arrays[key]
+    return out
@@ -1,8 +1,7 @@
 import numpy as np
 import json_utils
 import os
-from . import point_source_report
-from .. import utils
+from . import summary
 
 
 def list_instruments_observing_guide_stars(config):
@@ -40,19 +39,19 @@ def table_vmax(work_dir):
     for instrument_key in list_instruments_observing_guide_stars(config):
         out[instrument_key] = {}
 
-        reports_zip_path = os.path.join(
-            work_dir,
-            "analysis",
-            instrument_key,
-            "star.zip",
+        star_summary = summary.read(
+            summary.make_path(
+                work_dir=work_dir,
+                instrument_key=instrument_key,
+                observation_key="star",
+            )
         )
-        reports = utils.zipfile_json_read_to_dict(reports_zip_path)
+        key_to_row = {key: i for i, key in enumerate(star_summary["key"])}
 
         for guide_star_key in list_guide_star_keys(config):
-            img = point_source_report.make_norm_image(
-                point_source_report=reports[guide_star_key]
-            )
-            out[instrument_key][guide_star_key] = np.max(img)
+            out[instrument_key][guide_star_key] = star_summary[
+                "norm_image_max"
+            ][key_to_row[guide_star_key]]
 
     return out
 
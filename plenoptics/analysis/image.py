@@ -1,6 +1,5 @@
-import plenopy
 import numpy as np
-
+from .. import cache
 
 BINNING = {}
 BINNING["image"] = {}
@@ -43,7 +42,7 @@ def compute_image(
 ):
     photon_arrival_times_s, photon_lixel_ids = light_field
 
-    image_rays = plenopy.image.ImageRays(
+    image_rays = cache.get_image_rays(
         light_field_geometry=light_field_geometry
     )
 
@@ -72,23 +71,140 @@ def compute_image(
     return img
 
 
-def write_image(path, image):
-    imo = image.astype(np.float32)
-    x = np.array([imo.shape[0]], dtype=np.uint64)
-    y = np.array([imo.shape[1]], dtype=np.uint64)
-    with open(path, "wb") as f:
-        f.write(x.tobytes())
-        f.write(y.tobytes())
-        f.write(imo.flatten(order="C").tobytes())
+def histogram2d_roi(x, y, bins):
+    """
+    Histogram of (x, y) which is only allocated in the region of interest
+    where there are samples. The counts in the region of interest are
+    identical to the ones in the full np.histogram2d(x, y, bins).
 
+    Parameters
+    ----------
+    x, y : array of floats
+        Samples.
+    bins : tuple(array, array)
+        The bin-edges in x and y.
 
-def read_image(path):
-    with open(path, "rb") as f:
-        x = np.frombuffer(f.read(8), dtype=np.uint64)[0]
-        y = np.frombuffer(f.read(8), dtype=np.uint64)[0]
-        img = np.frombuffer(f.read(), dtype=np.float32)
-    img = np.reshape(img, (x, y), order="C")
-    return img
+    Returns
+    -------
+    (counts, (offset_x, offset_y)) : tuple(array, tuple(int, int))
+        The counts in the region of interest. The bin counts[0, 0] is the
+        bin (offset_x, offset_y) in the full histogram.
+    """
+    bin_edges_x, bin_edges_y = bins
+    ibx = _bin_indices_like_histogram(a=x, bin_edges=bin_edges_x)
+    iby = _bin_indices_like_histogram(a=y, bin_edges=bin_edges_y)
+    valid = np.logical_and(ibx >= 0, iby >= 0)
+    ibx = ibx[valid]
+    iby = iby[valid]
+
+    if len(ibx) == 0:
+        return np.zeros(shape=(0, 0)), (0, 0)
+
+    offset_x = np.min(ibx)
+    offset_y = np.min(iby)
+    num_x = np.max(ibx) - offset_x + 1
+    num_y = np.max(iby) - offset_y + 1
+
+    ibin = (ibx - offset_x) * num_y + (iby - offset_y)
+    counts = np.bincount(ibin, minlength=num_x * num_y).astype(float)
+    counts = counts.reshape((num_x, num_y))
+    return counts, (int(offset_x), int(offset_y))
+
+
+def histogram2d_stack(x, y, bins, roi=False):
+    """
+    Histograms of a stack of samples in one np.bincount. Row i of x and y
+    are the samples of image i. With roi, all images are cut to the one
+    region of interest which contains the samples of any image in the
+    stack, see histogram2d_roi().
+
+    Parameters
+    ----------
+    x, y : 2D array of floats
+        Samples with shape (num_images, num_samples).
+    bins : tuple(array, array)
+        The bin-edges in x and y.
+
+    Returns
+    -------
+    counts : 3D array of ints
+        With shape (num_images, num_x, num_y).
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    assert x.ndim == 2
+    assert x.shape == y.shape
+    num_images = x.shape[0]
+    bin_edges_x, bin_edges_y = bins
+    ibx = _bin_indices_like_histogram(a=x, bin_edges=bin_edges_x)
+    iby = _bin_indices_like_histogram(a=y, bin_edges=bin_edges_y)
+    valid = np.logical_and(ibx >= 0, iby >= 0)
+
+    if roi:
+        if not np.any(valid):
+            return np.zeros(shape=(num_images, 0, 0), dtype=np.int64)
+        offset_x = np.min(ibx[valid])
+        offset_y = np.min(iby[valid])
+        ibx -= offset_x
+        iby -= offset_y
+        num_x = np.max(ibx[valid]) + 1
+        num_y = np.max(iby[valid]) + 1
+    else:
+        num_x = len(bin_edges_x) - 1
+        num_y = len(bin_edges_y) - 1
+
+    # Samples outside of the bins go into one more bin which is dropped.
+    num = num_images * num_x * num_y
+    iimg = np.arange(num_images)[:, None]
+    ibin = np.where(valid, (iimg * num_x + ibx) * num_y + iby, num)
+    counts = np.bincount(ibin.ravel(), minlength=num + 1)[:num]
+    return counts.reshape((num_images, num_x, num_y))
+
+
+def _bin_indices_like_histogram(a, bin_edges):
+    """
+    Index of the bin for each value in a, or -1 when the value is outside
+    of the bin_edges. Like np.histogram, the last bin includes its upper
+    edge.
+    """
+    num_bins = len(bin_edges) - 1
+    a = np.asarray(a)
+    if _is_uniform(bin_edges):
+        idx = _bin_indices_of_uniform_edges(a=a, bin_edges=bin_edges)
+    else:
+        idx = np.searchsorted(bin_edges, a, side="right") - 1
+    idx[a == bin_edges[-1]] = num_bins - 1
+    idx[np.logical_or(idx < 0, idx >= num_bins)] = -1
+    return idx
+
+
+def _is_uniform(bin_edges):
+    widths = np.diff(bin_edges)
+    return len(widths) > 0 and np.allclose(widths, widths[0], rtol=1e-9)
+
+
+def _bin_indices_of_uniform_edges(a, bin_edges):
+    """
+    Same as np.searchsorted(bin_edges, a, side="right") - 1, but guesses
+    the index from the width of the bins and then corrects the guess by
+    comparing with the actual bin_edges. Values outside are -1 or
+    len(bin_edges) - 1.
+    """
+    num_bins = len(bin_edges) - 1
+    width = (bin_edges[-1] - bin_edges[0]) / num_bins
+    guess = np.subtract(a, bin_edges[0], dtype=np.float64)
+    guess *= 1.0 / width
+    np.floor(guess, out=guess)
+    np.clip(guess, -1, num_bins, out=guess)
+    guess[np.isnan(guess)] = -1
+    idx = guess.astype(np.int64)
+
+    # The guess is off by at most one bin due to rounding.
+    lower = np.take(bin_edges, idx, mode="clip")
+    idx[np.logical_and(idx >= 0, a < lower)] -= 1
+    upper = np.take(bin_edges, idx + 1, mode="clip")
+    idx[np.logical_and(idx < num_bins, a >= upper)] += 1
+    return idx
 
 
 def histogram2d_std(
@@ -100,13 +216,43 @@ def histogram2d_std(
     bins,
     prng,
     num_sub_samples=10,
+    chunk_size=2**20,
 ):
+    """
+    Histogram of samples which are each spread by a normal distribution.
+    Each sample i is drawn num_sub_samples times from
+    normal(x[i], x_std[i]) and normal(y[i], y_std[i]) and contributes
+    weights[i] / num_sub_samples to the bin it lands in.
+
+    Parameters
+    ----------
+    x, y : array of floats
+        Means of the samples.
+    x_std, y_std : array of floats
+        Standard deviations of the samples.
+    weights : array of floats
+        Weight of each sample. Samples with zero weight are skipped.
+    bins : tuple(array, array)
+        The bin-edges in x and y.
+    prng : numpy.random.Generator
+        Pseudo random number generator.
+    num_sub_samples : int
+        Number of draws per sample.
+    chunk_size : int
+        Max. number of draws to be held in memory at once.
+
+    Returns
+    -------
+    (counts, bins) : tuple(array, tuple)
+        The counts have shape (num_bins_x, num_bins_y).
+    """
     num_samples = len(x)
     assert len(y) == num_samples
     assert len(x_std) == num_samples
     assert len(y_std) == num_samples
     assert len(weights) == num_samples
     assert num_sub_samples > 0
+    assert chunk_size > 0
 
     bin_edges_x, bin_edges_y = bins
     assert np.all(np.gradient(bin_edges_x) > 0)
@@ -117,19 +263,38 @@ def histogram2d_std(
     assert num_bins_x > 0
     assert num_bins_y > 0
 
-    counts = np.zeros(shape=(num_bins_x, num_bins_y))
+    x = np.asarray(x)
+    y = np.asarray(y)
+    x_std = np.asarray(x_std)
+    y_std = np.asarray(y_std)
+    weights = np.asarray(weights, dtype=float)
+
+    (active,) = np.nonzero(weights)
+    num_beams_per_chunk = max(1, chunk_size // num_sub_samples)
+
+    counts = np.zeros(num_bins_x * num_bins_y)
+
+    for start in range(0, len(active), num_beams_per_chunk):
+        a = active[start : start + num_beams_per_chunk]
+        shape = (len(a), num_sub_samples)
+
+        rx = prng.normal(loc=x[a, None], scale=x_std[a, None], size=shape)
+        ry = prng.normal(loc=y[a, None], scale=y_std[a, None], size=shape)
 
-    for i in range(num_samples):
-        if weights[i] == 0:
-            continue
+        ibx = np.digitize(x=rx, bins=bin_edges_x) - 1
+        iby = np.digitize(x=ry, bins=bin_edges_y) - 1
+        del rx, ry
 
-        for s in range(num_sub_samples):
-            rx = prng.normal(loc=x[i], scale=x_std[i])
-            ry = prng.normal(loc=y[i], scale=y_std[i])
+        valid = np.logical_and(
+            np.logical_and(ibx >= 0, ibx < num_bins_x),
+            np.logical_and(iby >= 0, iby < num_bins_y),
+        )
+        ibin = ibx[valid] * num_bins_y + iby[valid]
+        w = np.broadcast_to(weights[a, None] / num_sub_samples, shape)
 
-            ibx = np.digitize(x=rx, bins=bin_edges_x) - 1
-            iby = np.digitize(x=ry, bins=bin_edges_y) - 1
+        counts += np.bincount(
+            ibin, weights=w[valid], minlength=num_bins_x * num_bins_y
+        )
 
-            if 0 <= ibx < num_bins_x and 0 <= iby < num_bins_y:
-                counts[ibx, iby] += weights[i] / num_sub_samples
+    counts = counts.reshape((num_bins_x, num_bins_y))
     return counts, bins
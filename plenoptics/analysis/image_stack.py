@@ -0,0 +1,107 @@
+"""
+A stack of same-shaped float32 images in a single file which can grow by
+appending images. Each image has the object-distance it was focused on.
+
+The file starts with a header:
+
+- 8 bytes magic,
+- uint64, the size of the json which follows,
+- json with the bin-edges of the images,
+- zero-padding to the next multiple of 64 bytes.
+
+Then the records follow, each with a float64 object-distance and the
+float32 image in C-order. The records are read with np.memmap.
+"""
+import os
+import json_utils
+import numpy as np
+
+
+MAGIC = b"PLIMGSTK"
+HEADER_ALIGNMENT = 64
+
+
+def init(path, bins):
+    """
+    Writes an empty stack for images with the bin-edges bins into path.
+    """
+    bin_edges_x, bin_edges_y = bins
+    header = {
+        "bin_edges_x": [float(e) for e in bin_edges_x],
+        "bin_edges_y": [float(e) for e in bin_edges_y],
+    }
+    header_json = json_utils.dumps(header).encode()
+    payload = MAGIC + np.uint64(len(header_json)).tobytes() + header_json
+    padding = (-len(payload)) % HEADER_ALIGNMENT
+    with open(path + ".incomplete", "wb") as f:
+        f.write(payload + b"\x00" * padding)
+    os.rename(path + ".incomplete", path)
+
+
+def _read_header(f):
+    magic = f.read(len(MAGIC))
+    assert magic == MAGIC, "Expected an image-stack."
+    header_size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+    header = json_utils.loads(f.read(header_size).decode())
+    offset = len(MAGIC) + 8 + header_size
+    offset += (-offset) % HEADER_ALIGNMENT
+    bins = [
+        np.array(header["bin_edges_x"]),
+        np.array(header["bin_edges_y"]),
+    ]
+    return bins, offset
+
+
+def _record_dtype(bins):
+    shape = (len(bins[0]) - 1, len(bins[1]) - 1)
+    return np.dtype([("object_distance", "<f8"), ("image", "<f4", shape)])
+
+
+def _num_records(path, offset, dtype):
+    return (os.stat(path).st_size - offset) // dtype.itemsize
+
+
+def append(path, image, object_distance):
+    """
+    Appends the image focused on object_distance to the stack in path.
+    A partial record left behind by an interrupted append is dropped.
+    """
+    with open(path, "rb") as f:
+        bins, offset = _read_header(f)
+    dtype = _record_dtype(bins=bins)
+    assert image.shape == dtype["image"].shape
+
+    num = _num_records(path=path, offset=offset, dtype=dtype)
+    record = np.zeros(1, dtype=dtype)
+    record["object_distance"] = object_distance
+    record["image"] = image
+
+    with open(path, "r+b") as f:
+        f.truncate(offset + num * dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(record.tobytes())
+
+
+def read(path):
+    """
+    Returns the stack in path as dict with the bin-edges 'bins', and the
+    memory-mapped 'object_distance' of shape (N, ) and 'images' of shape
+    (N, num_bins_x, num_bins_y). The arrays are read-only views into the
+    file, no images are copied.
+    """
+    with open(path, "rb") as f:
+        bins, offset = _read_header(f)
+    dtype = _record_dtype(bins=bins)
+    num = _num_records(path=path, offset=offset, dtype=dtype)
+
+    if num == 0:
+        records = np.zeros(0, dtype=dtype)
+    else:
+        records = np.memmap(
+            path, dtype=dtype, mode="r", offset=offset, shape=(num,)
+        )
+    return {
+        "bins": bins,
+        "object_distance": records["object_distance"],
+        "images": records["image"],
+    }
@@ -1,9 +1,10 @@
 from . import image
 from . import statistical_estimators
+from . import compact_response as _compact_response
 import binning_utils
 import copy
 import numpy as np
-import plenopy
+from .. import cache
 
 
 def make_point_source_report(
@@ -15,11 +16,23 @@ def make_point_source_report(
     containment_percentile,
     binning,
     prng,
+    compact_response=None,
 ):
+    """
+    Either the raw_sensor_response or the compact_response (see
+    analysis.compact_response) must be given.
+    """
+    if compact_response is None:
+        compact_response = make_isochor_compact_response(
+            raw_sensor_response=raw_sensor_response,
+            light_field_geometry=light_field_geometry,
+        )
+
     calibrated_response = calibrate_plenoscope_response(
         light_field_geometry=light_field_geometry,
-        raw_sensor_response=raw_sensor_response,
+        raw_sensor_response=None,
         object_distance=object_distance_m,
+        compact_response=compact_response,
     )
 
     cres = calibrated_response
@@ -34,6 +47,7 @@ def make_point_source_report(
         prng=prng,
         percentile=containment_percentile,
         num_sub_samples=1,
+        method="sorted",
     )
 
     thisbinning = copy.deepcopy(binning)
@@ -79,9 +93,7 @@ def make_point_source_report(
         cres["image_beams"]["valid"]
     )
     out["statistics"]["photons"] = {}
-    out["statistics"]["photons"]["total"] = raw_sensor_response[
-        "number_photons"
-    ]
+    out["statistics"]["photons"]["total"] = compact_response["number_photons"]
     out["statistics"]["photons"]["valid"] = np.sum(
         cres["image_beams"]["weights"]
     )
@@ -113,14 +125,21 @@ def calibrate_plenoscope_response(
     raw_sensor_response,
     light_field_geometry,
     object_distance,
+    compact_response=None,
 ):
-    image_rays = plenopy.image.ImageRays(
+    if compact_response is None:
+        compact_response = make_isochor_compact_response(
+            raw_sensor_response=raw_sensor_response,
+            light_field_geometry=light_field_geometry,
+        )
+
+    image_rays = cache.get_image_rays(
         light_field_geometry=light_field_geometry
     )
 
     time_bin_edges = binning_utils.edges_from_width_and_num(
-        bin_width=raw_sensor_response["time_slice_duration"],
-        num_bins=raw_sensor_response["number_time_slices"],
+        bin_width=compact_response["time_slice_duration"],
+        num_bins=compact_response["number_time_slices"],
         first_bin_center=0.0,
     )
     time_bin_centers = binning_utils.centers(bin_edges=time_bin_edges)
@@ -130,15 +149,13 @@ def calibrate_plenoscope_response(
     out["time"]["bin_edges"] = time_bin_edges
     out["time"]["bin_centers"] = time_bin_centers
 
-    isochor_image_seqence = plenopy.light_field_sequence.make_isochor_image(
-        raw_sensor_response=raw_sensor_response,
-        time_delay_image_mean=light_field_geometry.time_delay_image_mean,
-    )
-
-    out["time"]["weights"] = isochor_image_seqence.sum(axis=1)
+    out["time"]["weights"] = compact_response["isochor_time_weights"]
 
     out["image_beams"] = {}
-    out["image_beams"]["_weights"] = isochor_image_seqence.sum(axis=0)
+    out["image_beams"]["_weights"] = _compact_response.isochor_lixel_weights(
+        compact_response=compact_response,
+        number_lixel=light_field_geometry.number_lixel,
+    )
     (
         out["image_beams"]["_cx"],
         out["image_beams"]["_cy"],
@@ -162,3 +179,19 @@ def calibrate_plenoscope_response(
     out["image_beams"]["cx_std"] = out["image_beams"]["_cx_std"][valid]
     out["image_beams"]["cy_std"] = out["image_beams"]["_cy_std"][valid]
     return out
+
+
+def make_isochor_compact_response(raw_sensor_response, light_field_geometry):
+    """
+    The part of the compact response which is needed here.
+    """
+    out = _compact_response.make_header(
+        raw_sensor_response=raw_sensor_response
+    )
+    out.update(
+        _compact_response.make_isochor_weights(
+            raw_sensor_response=raw_sensor_response,
+            light_field_geometry=light_field_geometry,
+        )
+    )
+    return out
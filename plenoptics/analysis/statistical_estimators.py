@@ -13,7 +13,26 @@ def encirclement2d(
     percentile=80,
     iteration_shrinking_factor=0.99,
     num_sub_samples=1,
+    method="kdtree",
 ):
+    """
+    Estimates the center and the radius of the circle which contains the
+    percentile of the weighted samples. Each sample i is spread by a
+    normal distribution with x_std[i] and y_std[i].
+
+    Parameters
+    ----------
+    method : str
+        Either 'kdtree' or 'sorted'. With 'kdtree' each weight is expanded
+        into individual photons and the radius is shrunk iteratively.
+        With 'sorted' the weighted radial distances are sorted and the
+        radius is read off at the percentile directly. The weights do not
+        need to be integers then.
+
+    Returns
+    -------
+    (center_x, center_y, radius) : tuple(float, float, float)
+    """
     assert not np.any(np.isnan(x))
     assert not np.any(np.isnan(y))
     assert not np.any(np.isnan(x_std))
@@ -26,6 +45,20 @@ def encirclement2d(
     assert num_sub_samples > 0
     assert 0 < iteration_shrinking_factor < 1.0
 
+    if method == "sorted":
+        return _encirclement2d_sorted(
+            x=x,
+            y=y,
+            x_std=x_std,
+            y_std=y_std,
+            weights=weights,
+            prng=prng,
+            percentile=percentile,
+            num_sub_samples=num_sub_samples,
+        )
+    elif method != "kdtree":
+        raise ValueError("Expected method to be in ['kdtree', 'sorted'].")
+
     xy = []
     for i in range(len(x)):
         for w in range(weights[i]):
@@ -64,6 +97,57 @@ def encirclement2d(
     return center_x, center_y, radius
 
 
+def _encirclement2d_sorted(
+    x,
+    y,
+    x_std,
+    y_std,
+    weights,
+    prng,
+    percentile,
+    num_sub_samples,
+):
+    x = np.asarray(x)
+    y = np.asarray(y)
+    weights = np.asarray(weights, dtype=float)
+    (active,) = np.nonzero(weights)
+
+    shape = (len(active), num_sub_samples)
+    rx = prng.normal(
+        loc=x[active, None], scale=np.asarray(x_std)[active, None], size=shape
+    ).flatten()
+    ry = prng.normal(
+        loc=y[active, None], scale=np.asarray(y_std)[active, None], size=shape
+    ).flatten()
+    w = np.repeat(weights[active], num_sub_samples)
+
+    integral = np.sum(w)
+    if integral == 0:
+        return float("nan"), float("nan"), float("nan")
+
+    center_x = weighted_percentile(a=rx, weights=w, percentile=50)
+    center_y = weighted_percentile(a=ry, weights=w, percentile=50)
+    radii = np.hypot((rx - center_x), (ry - center_y))
+    radius = weighted_percentile(a=radii, weights=w, percentile=percentile)
+    return center_x, center_y, radius
+
+
+def weighted_percentile(a, weights, percentile):
+    """
+    Returns the smallest value in a for which the sum of the weights of
+    all values less or equal to it reaches the percentile of the total
+    weight.
+    """
+    assert len(a) == len(weights)
+    assert 0 <= percentile <= 100
+    order = np.argsort(a)
+    cumsum = np.cumsum(weights[order])
+    total = cumsum[-1]
+    i = np.searchsorted(cumsum, (percentile / 100.0) * total, side="left")
+    i = min(i, len(a) - 1)
+    return a[order[i]]
+
+
 def encirclement1d(x, f, percentile=80, oversample=137):
     assert len(x) == len(f)
     assert len(x) >= 3
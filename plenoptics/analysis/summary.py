@@ -0,0 +1,127 @@
+"""
+Columnar summaries of the reports of the star and point analysis.
+
+The reports of an observation are reduced into analysis/<instrument>/
+<observation>.zip and each report is a gzipped JSON. The plots only need a
+few scalars of each report. The summary holds these as one array per
+column, in the order of the reports' keys, in a single '.npz' file.
+"""
+import os
+import numpy as np
+import rename_after_writing
+from . import point_source_report
+
+
+def make_path(work_dir, instrument_key, observation_key):
+    return os.path.join(
+        work_dir,
+        "analysis",
+        instrument_key,
+        observation_key + ".summary.npz",
+    )
+
+
+def make(observation_key, reports):
+    if observation_key == "star":
+        return make_star(reports=reports)
+    elif observation_key == "point":
+        return make_point(reports=reports)
+    else:
+        raise ValueError(
+            "Expected observation_key to be in ['star', 'point']."
+        )
+
+
+def make_star(reports):
+    keys = sorted(reports.keys())
+    out = {
+        "key": np.array(keys, dtype=str),
+        "angle80_rad": np.zeros(len(keys)),
+        "cx_deg": np.zeros(len(keys)),
+        "cy_deg": np.zeros(len(keys)),
+        "num_photons_valid": np.zeros(len(keys)),
+        "norm_image_max": np.zeros(len(keys)),
+    }
+    for i, key in enumerate(keys):
+        report = reports[key]
+        center = report["image"]["binning"]["image"]["center"]
+        out["angle80_rad"][i] = report["image"]["angle80"]
+        out["cx_deg"][i] = center["cx_deg"]
+        out["cy_deg"][i] = center["cy_deg"]
+        out["num_photons_valid"][i] = report["statistics"]["photons"]["valid"]
+        out["norm_image_max"][i] = np.max(
+            point_source_report.make_norm_image(point_source_report=report)
+        )
+    return out
+
+
+def make_point(reports):
+    """
+    The depths and spreads of each point's refocus-curve have different
+    lengths. They are concatenated into 'curve_depth_m' and
+    'curve_spreads_pixel_per_photon' where the curve of the i-th point is
+    in the slice curve_start[i]:curve_start[i + 1], see point_curve().
+    """
+    keys = sorted(reports.keys())
+    out = {
+        "key": np.array(keys, dtype=str),
+        "cx_deg": np.zeros(len(keys)),
+        "cy_deg": np.zeros(len(keys)),
+        "object_distance_m": np.zeros(len(keys)),
+        "num_photons": np.zeros(len(keys)),
+        "reco_object_distance_m": np.zeros(len(keys)),
+        "spread_pixel_per_photon": np.zeros(len(keys)),
+        "curve_start": np.zeros(len(keys) + 1, dtype=np.int64),
+    }
+    curve_depth_m = []
+    curve_spreads = []
+    for i, key in enumerate(keys):
+        report = reports[key]
+        for column in ["cx_deg", "cy_deg", "object_distance_m", "num_photons"]:
+            out[column][i] = report[column]
+
+        depth_m = np.asarray(report["depth_m"], dtype=float)
+        spreads = np.asarray(report["spreads_pixel_per_photon"], dtype=float)
+        afocus = np.argmin(spreads)
+        out["reco_object_distance_m"][i] = depth_m[afocus]
+        out["spread_pixel_per_photon"][i] = spreads[afocus]
+
+        curve_depth_m.append(depth_m)
+        curve_spreads.append(spreads)
+        out["curve_start"][i + 1] = out["curve_start"][i] + len(depth_m)
+
+    out["curve_depth_m"] = _concatenate(curve_depth_m)
+    out["curve_spreads_pixel_per_photon"] = _concatenate(curve_spreads)
+    return out
+
+
+def _concatenate(arrays):
+    if len(arrays) == 0:
+        return np.zeros(0)
+    return np.concatenate(arrays)
+
+
+def point_curve(summary, i):
+    """
+    Returns the depths and the spreads of the refocus-curve of the i-th
+    point in the summary.
+    """
+    start = summary["curve_start"][i]
+    stop = summary["curve_start"][i + 1]
+    return (
+        summary["curve_depth_m"][start:stop],
+        summary["curve_spreads_pixel_per_photon"][start:stop],
+    )
+
+
+def write(path, summary):
+    with rename_after_writing.open(path, "wb") as f:
+        np.savez(f, **summary)
+
+
+def read(path):
+    out = {}
+    with np.load(path) as arrays:
+        for key in arrays.files:
+            out[key] = arrays[key]
+    return out
@@ -0,0 +1,228 @@
+"""
+A per-process cache for light-field-geometries and their image-rays.
+
+Each worker in a pool keeps its own cache. The first job for an
+instrument pays for reading the light-field-geometry from disk, all later
+jobs on the same instrument get it from memory. An entry is invalidated
+when the files in the light-field-geometry's directory are modified.
+
+To not hold a private copy of the large arrays in each worker, the
+light-field-geometry can be published once into a directory of '.npy'
+files next to it, see publish_light_field_geometry(). Workers then
+memory-map these read-only and share the pages via the page-cache.
+"""
+
+import os
+import glob
+import shutil
+import pickle
+import collections
+import numpy as np
+import plenopy
+
+MAX_NUM_BYTES = 4 * 1024**3
+MAX_NUM_ENTRIES = 4
+
+
+class LightFieldGeometryCache:
+    """
+    Least-recently-used cache of plenopy.LightFieldGeometry and
+    plenopy.image.ImageRays keyed by the path of the light-field-geometry
+    and its modification time.
+    """
+
+    def __init__(
+        self, max_num_bytes=MAX_NUM_BYTES, max_num_entries=MAX_NUM_ENTRIES
+    ):
+        assert max_num_bytes > 0
+        assert max_num_entries > 0
+        self.max_num_bytes = max_num_bytes
+        self.max_num_entries = max_num_entries
+        self.entries = collections.OrderedDict()
+
+    def get_light_field_geometry(self, path):
+        return self._get(path=path)["light_field_geometry"]
+
+    def get_image_rays(self, light_field_geometry):
+        for path in self.entries:
+            entry = self.entries[path]
+            if entry["light_field_geometry"] is light_field_geometry:
+                self.entries.move_to_end(path)
+                if entry["image_rays"] is None:
+                    entry["image_rays"] = plenopy.image.ImageRays(
+                        light_field_geometry=light_field_geometry
+                    )
+                    entry["num_bytes"] += _num_bytes(entry["image_rays"])
+                    self._evict()
+                return entry["image_rays"]
+        return plenopy.image.ImageRays(
+            light_field_geometry=light_field_geometry
+        )
+
+    def num_bytes(self):
+        return sum([self.entries[p]["num_bytes"] for p in self.entries])
+
+    def clear(self):
+        self.entries.clear()
+
+    def _get(self, path):
+        path = os.path.abspath(path)
+        mtime = _modification_time_ns(path=path)
+
+        if path in self.entries:
+            if self.entries[path]["mtime"] == mtime:
+                self.entries.move_to_end(path)
+                return self.entries[path]
+            del self.entries[path]
+
+        lfg = read_published_light_field_geometry(path=path, mtime=mtime)
+        if lfg is None:
+            lfg = plenopy.LightFieldGeometry(path)
+        self.entries[path] = {
+            "mtime": mtime,
+            "light_field_geometry": lfg,
+            "image_rays": None,
+            "num_bytes": _num_bytes(lfg),
+        }
+        self._evict()
+        return self.entries[path]
+
+    def _evict(self):
+        while len(self.entries) > 1 and (
+            len(self.entries) > self.max_num_entries
+            or self.num_bytes() > self.max_num_bytes
+        ):
+            self.entries.popitem(last=False)
+
+    def __repr__(self):
+        return "{:s}(num_entries={:d}, num_bytes={:d})".format(
+            self.__class__.__name__, len(self.entries), self.num_bytes()
+        )
+
+
+def _modification_time_ns(path):
+    """
+    Returns the newest modification time of path and, when path is a
+    directory, of all the files and directories below it.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    if os.path.isdir(path):
+        for root, dirnames, filenames in os.walk(path):
+            for name in dirnames + filenames:
+                mtime = max(
+                    mtime, os.stat(os.path.join(root, name)).st_mtime_ns
+                )
+    return mtime
+
+
+def _num_bytes(obj):
+    """
+    Returns the number of bytes in the arrays which are private to this
+    process. Memory-mapped arrays are shared and not counted.
+    """
+    num = 0
+    for key in vars(obj):
+        value = getattr(obj, key)
+        if isinstance(value, np.ndarray) and not isinstance(value, np.memmap):
+            num += value.nbytes
+    return num
+
+
+def published_path(path):
+    return os.path.abspath(path) + ".shared"
+
+
+def publish_light_field_geometry(path):
+    """
+    Writes the arrays of the light-field-geometry in path into
+    published_path(path), one '.npy' file per array. All other attributes
+    go into 'attributes.pkl' together with the modification-time of path.
+    """
+    mtime = _modification_time_ns(path=path)
+    lfg = plenopy.LightFieldGeometry(path)
+    _write_shared(obj=lfg, out_dir=published_path(path=path), mtime=mtime)
+
+
+def is_published(path):
+    """
+    Returns True when the light-field-geometry in path is published and
+    the publication is up to date.
+    """
+    return _read_shared_mtime(
+        out_dir=published_path(path=path)
+    ) == _modification_time_ns(path=path)
+
+
+def read_published_light_field_geometry(path, mtime=None):
+    """
+    Returns a plenopy.LightFieldGeometry with its arrays memory-mapped
+    read-only from published_path(path). Returns None when path is not
+    published, or when the publication does not match the modification
+    time mtime of path.
+    """
+    if mtime is None:
+        mtime = _modification_time_ns(path=path)
+    out_dir = published_path(path=path)
+    if _read_shared_mtime(out_dir=out_dir) != mtime:
+        return None
+    return _read_shared(cls=plenopy.LightFieldGeometry, out_dir=out_dir)
+
+
+def _write_shared(obj, out_dir, mtime):
+    tmp_dir = out_dir + ".incomplete"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    attributes = {}
+    for key in vars(obj):
+        value = getattr(obj, key)
+        if isinstance(value, np.ndarray) and value.dtype != object:
+            np.save(os.path.join(tmp_dir, key + ".npy"), value)
+        else:
+            attributes[key] = value
+
+    with open(os.path.join(tmp_dir, "attributes.pkl"), "wb") as f:
+        pickle.dump({"mtime": mtime, "attributes": attributes}, f)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.rename(tmp_dir, out_dir)
+
+
+def _read_shared_mtime(out_dir):
+    try:
+        with open(os.path.join(out_dir, "attributes.pkl"), "rb") as f:
+            return pickle.load(f)["mtime"]
+    except FileNotFoundError:
+        return None
+
+
+def _read_shared(cls, out_dir):
+    with open(os.path.join(out_dir, "attributes.pkl"), "rb") as f:
+        attributes = pickle.load(f)["attributes"]
+
+    obj = cls.__new__(cls)
+    vars(obj).update(attributes)
+    for array_path in glob.glob(os.path.join(out_dir, "*.npy")):
+        key = os.path.splitext(os.path.basename(array_path))[0]
+        setattr(obj, key, np.load(array_path, mmap_mode="r"))
+    return obj
+
+
+_CACHE = LightFieldGeometryCache()
+
+
+def get_light_field_geometry(path):
+    """
+    Returns the plenopy.LightFieldGeometry in path. Reads it from disk
+    only when it is not already cached in this process.
+    """
+    return _CACHE.get_light_field_geometry(path=path)
+
+
+def get_image_rays(light_field_geometry):
+    """
+    Returns the plenopy.image.ImageRays of the light_field_geometry.
+    When the light_field_geometry was obtained from this cache, its
+    image-rays are computed only once per process.
+    """
+    return _CACHE.get_image_rays(light_field_geometry=light_field_geometry)
@@ -0,0 +1,193 @@
+"""
+Codecs to compress the artifacts, such as the raw sensor responses and the
+results of the analysis.
+
+A codec is described by a dict like {"codec": "gzip", "level": 9}.
+
+- "none": The payload is stored as it is.
+- "gzip": Deflate (zlib) in a gzip container, level 1 to 9.
+- "lzma": LZMA in an xz container, preset 0 to 9.
+- "zstd": Zstandard, level 1 to 22. Only if the module 'zstandard' is
+  installed.
+
+Readers detect the codec from the magic bytes at the start of the payload.
+"""
+import os
+import io
+import gzip
+import lzma
+import time
+import json_utils
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT = {"codec": "gzip", "level": 9}
+
+GZIP_MAGIC = b"\x1f\x8b"
+LZMA_MAGIC = b"\xfd7zXZ\x00"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# The kinds of artifacts in config/compression.json.
+KINDS = ["raw_sensor_response", "result"]
+
+
+def read_config(work_dir):
+    """
+    Returns the codec of each kind of artifact in config/compression.json
+    of work_dir. Kinds which are missing, e.g. in work_dirs made before
+    this file existed, use gzip as before.
+    """
+    path = os.path.join(work_dir, "config", "compression.json")
+    config = json_utils.read(path) if os.path.exists(path) else {}
+    return {kind: config.get(kind, DEFAULT) for kind in KINDS}
+
+
+def list_available_codecs():
+    out = ["none", "gzip", "lzma"]
+    if zstandard is not None:
+        out.append("zstd")
+    return out
+
+
+def assert_valid(codec):
+    assert codec["codec"] in list_available_codecs(), "Codec not available."
+    if codec["codec"] == "gzip":
+        assert 1 <= codec["level"] <= 9
+    elif codec["codec"] == "lzma":
+        assert 0 <= codec["level"] <= 9
+    elif codec["codec"] == "zstd":
+        assert 1 <= codec["level"] <= 22
+
+
+def detect(head):
+    """
+    Returns the name of the codec which produced the payload starting with
+    the bytes in head.
+    """
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    elif head.startswith(LZMA_MAGIC):
+        return "lzma"
+    elif head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    else:
+        return "none"
+
+
+class _NonClosingWriter(io.RawIOBase):
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        return self.fileobj.write(b)
+
+
+def open_writer(fileobj, codec=DEFAULT):
+    """
+    Returns a binary file-like which compresses what is written into it
+    with codec and writes it into fileobj. Closing it finishes the
+    compressed stream but does not close fileobj.
+    """
+    assert_valid(codec)
+    if codec["codec"] == "none":
+        return _NonClosingWriter(fileobj=fileobj)
+    elif codec["codec"] == "gzip":
+        return gzip.GzipFile(
+            filename="",
+            fileobj=fileobj,
+            mode="wb",
+            compresslevel=codec["level"],
+        )
+    elif codec["codec"] == "lzma":
+        return lzma.LZMAFile(fileobj, mode="wb", preset=codec["level"])
+    elif codec["codec"] == "zstd":
+        cctx = zstandard.ZstdCompressor(level=codec["level"])
+        return cctx.stream_writer(fileobj, closefd=False)
+
+
+def open_reader(fileobj):
+    """
+    Returns a binary file-like which decompresses what is read from the
+    fileobj. The codec is detected.
+    """
+    if not hasattr(fileobj, "peek"):
+        fileobj = io.BufferedReader(fileobj)
+    codec = detect(head=fileobj.peek(len(LZMA_MAGIC)))
+
+    if codec == "none":
+        return fileobj
+    elif codec == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    elif codec == "lzma":
+        return lzma.LZMAFile(fileobj, mode="rb")
+    elif codec == "zstd":
+        assert zstandard is not None, "Need module 'zstandard' to read."
+        dctx = zstandard.ZstdDecompressor()
+        return dctx.stream_reader(fileobj, closefd=False)
+
+
+def compress(data, codec=DEFAULT):
+    f = io.BytesIO()
+    with open_writer(fileobj=f, codec=codec) as fz:
+        fz.write(data)
+    return f.getvalue()
+
+
+def decompress(data):
+    with open_reader(fileobj=io.BytesIO(data)) as f:
+        return f.read()
+
+
+def benchmark(payload, codecs):
+    """
+    Compresses and decompresses the payload with each of the codecs.
+
+    Returns
+    -------
+    results : list of dicts
+        For each codec the compression-ratio (uncompressed / compressed),
+        and the speed to compress and to decompress in MB/s of
+        uncompressed payload.
+    """
+    out = []
+    size_mb = len(payload) / 1e6
+    for codec in codecs:
+        t_start = time.perf_counter()
+        compressed = compress(data=payload, codec=codec)
+        t_compress = time.perf_counter() - t_start
+
+        t_start = time.perf_counter()
+        decompressed = decompress(data=compressed)
+        t_decompress = time.perf_counter() - t_start
+        assert decompressed == payload
+
+        out.append(
+            {
+                "codec": codec["codec"],
+                "level": codec.get("level", None),
+                "size_MB": size_mb,
+                "ratio": len(payload) / max(1, len(compressed)),
+                "compress_MB_per_s": size_mb / max(t_compress, 1e-9),
+                "decompress_MB_per_s": size_mb / max(t_decompress, 1e-9),
+            }
+        )
+    return out
+
+
+def list_benchmark_codecs():
+    codecs = [{"codec": "none", "level": 0}]
+    for level in [1, 3, 6, 9]:
+        codecs.append({"codec": "gzip", "level": level})
+    for level in [0, 3, 6]:
+        codecs.append({"codec": "lzma", "level": level})
+    if zstandard is not None:
+        for level in [1, 3, 9, 19]:
+            codecs.append({"codec": "zstd", "level": level})
+    return codecs
@@ -27,6 +27,8 @@ def write_default_config(cfg_dir, minimal):
 
     write_plot_config(cfg_dir)
 
+    write_compression_config(cfg_dir)
+
 
 def write_instruments_config(cfg_dir, minimal):
     cfg_inst_dir = os.path.join(cfg_dir, "instruments")
@@ -96,6 +98,10 @@ def write_merlict_config(cfg_dir):
         os.path.join(cfg_merl_dir, "merlict_propagation_config.json"),
         merlict.PROPAGATION_CONFIG,
     )
+    json_utils.write(
+        os.path.join(cfg_merl_dir, "streaming.json"),
+        {"use_named_pipe": False},
+    )
 
 
 def write_mirror_deformations(cfg_dir):
@@ -173,6 +179,10 @@ def write_observations_config(cfg_dir, minimal):
             ],
             "max_angle_off_optical_axis_deg": 4.0,
             "areal_photon_density_per_m2": 5 if minimal else 50,
+            "write_raw_sensor_response": True,
+            "write_compact_response": True,
+            "analyse_in_map_job": True,
+            "map_job_chunk_size": 8,
         },
     )
 
@@ -184,6 +194,10 @@ def write_observations_config(cfg_dir, minimal):
             "min_object_distance_m": 2e3,
             "max_object_distance_m": 40e3,
             "areal_photon_density_per_m2": 5 if minimal else 50,
+            "write_raw_sensor_response": False,
+            "write_compact_response": True,
+            "analyse_in_map_job": True,
+            "map_job_chunk_size": 8,
         },
     )
 
@@ -272,6 +286,9 @@ def write_analysis_config(cfg_dir):
             * piont_obs_cfg["min_object_distance_m"],
             "image_containment_percentile": 80,
             "oversampling_beam_spread": 100,
+            "depth_search": "golden",
+            "depth_search_relative_tolerance": 1e-3,
+            "depth_search_max_num_evaluations": 64,
         },
     )
 
@@ -283,3 +300,13 @@ def write_plot_config(cfg_dir):
             "colormodes": ["default", "dark_background"],
         },
     )
+
+
+def write_compression_config(cfg_dir):
+    json_utils.write(
+        os.path.join(cfg_dir, "compression.json"),
+        {
+            "raw_sensor_response": {"codec": "gzip", "level": 9},
+            "result": {"codec": "gzip", "level": 9},
+        },
+    )
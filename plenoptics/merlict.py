@@ -3,7 +3,8 @@ import os
 import tempfile
 import plenopy
 import merlict_development_kit_python
-
+from . import cache
+from . import utils
 
 PROPAGATION_CONFIG = {
     "night_sky_background_ligth": {
@@ -24,47 +25,200 @@ PROPAGATION_CONFIG = {
 }
 
 
+PHOTON_LINE_FORMAT = "{:d} {:.3e} {:.3e} {:.3e} {:.9e} {:.9e} {:.9e} {:.3e}\n"
+
+
 def append_photons_to_space_seperated_values(
-    path, ids, supports, directions, wavelengths
+    path, ids, supports, directions, wavelengths, chunk_size=2**16
 ):
     """
     [0] id,
     [1] [2] [3] support
     [4] [5] [6] direction
     [7] wavelength
+
+    Each line is identical to PHOTON_LINE_FORMAT.format(...), but the
+    photons are formatted in chunks of chunk_size at once.
     """
-    with open(path, "at") as f:
-        for i in range(len(ids)):
-            f.write(
-                "{:d} {:.3e} {:.3e} {:.3e} {:.9e} {:.9e} {:.9e} {:.3e}".format(
-                    ids[i],
-                    supports[i, 0],
-                    supports[i, 1],
-                    supports[i, 2],
-                    directions[i, 0],
-                    directions[i, 1],
-                    directions[i, 2],
-                    wavelengths[i],
-                )
+    with open(path, "ab") as f:
+        write_photons_to_space_seperated_values(
+            f=f,
+            ids=ids,
+            supports=supports,
+            directions=directions,
+            wavelengths=wavelengths,
+            chunk_size=chunk_size,
+        )
+
+
+def write_photons_to_space_seperated_values(
+    f, ids, supports, directions, wavelengths, chunk_size=2**16
+):
+    """
+    Same as append_photons_to_space_seperated_values() but writes into the
+    open binary file f.
+    """
+    assert chunk_size > 0
+    for start in range(0, len(ids), chunk_size):
+        stop = min(start + chunk_size, len(ids))
+        f.write(
+            format_photons_to_space_seperated_values(
+                ids=ids[start:stop],
+                supports=supports[start:stop],
+                directions=directions[start:stop],
+                wavelengths=wavelengths[start:stop],
             )
-            f.write("\n")
+        )
+
+
+def format_photons_to_space_seperated_values(
+    ids, supports, directions, wavelengths
+):
+    """
+    Returns the bytes of the lines PHOTON_LINE_FORMAT.format(...) of all
+    photons.
+
+    The characters of each field are written into a matrix with one row
+    per photon. Unused characters are padded with zero-bytes which are
+    removed in the end.
+    """
+    supports = np.asarray(supports)
+    directions = np.asarray(directions)
+    num = len(ids)
+    space = np.full(shape=(num, 1), fill_value=ord(" "), dtype=np.uint8)
+    newline = np.full(shape=(num, 1), fill_value=ord("\n"), dtype=np.uint8)
+
+    fields = [_format_integer(ids)]
+    for column, precision in [
+        (supports[:, 0], 3),
+        (supports[:, 1], 3),
+        (supports[:, 2], 3),
+        (directions[:, 0], 9),
+        (directions[:, 1], 9),
+        (directions[:, 2], 9),
+        (wavelengths, 3),
+    ]:
+        fields.append(space)
+        fields.append(_format_scientific(x=column, precision=precision))
+    fields.append(newline)
+
+    chars = np.concatenate(fields, axis=1)
+    return chars[chars != 0].tobytes()
+
+
+_DIGITS = np.frombuffer(b"0123456789", dtype=np.uint8)
+_POWERS_OF_TEN = np.array([float(10**i) for i in range(23)])
+_INTEGER_WIDTH = 20
+
+
+def _format_integer(x):
+    """
+    Returns the characters of '{:d}'.format(x) for each element in x.
+    """
+    x = np.asarray(x)
+    out = np.zeros(shape=(len(x), _INTEGER_WIDTH), dtype=np.uint8)
+    ok = np.logical_and(x >= 0, x < 10 ** (_INTEGER_WIDTH - 1))
+
+    v = x[ok].astype(np.int64)
+    num_digits = len(str(np.max(v))) if len(v) > 0 else 0
+    chars = np.zeros(shape=(len(v), _INTEGER_WIDTH), dtype=np.uint8)
+    for col in range(_INTEGER_WIDTH - 1, _INTEGER_WIDTH - 1 - num_digits, -1):
+        is_leading_zero = np.logical_and(v == 0, col < _INTEGER_WIDTH - 1)
+        chars[:, col] = np.where(is_leading_zero, 0, _DIGITS[v % 10])
+        v = v // 10
+    out[ok] = chars
+
+    for i in np.flatnonzero(np.logical_not(ok)):
+        _put_left_aligned(out=out, i=i, s="{:d}".format(x[i]))
+    return out
+
+
+def _format_scientific(x, precision):
+    """
+    Returns the characters of '{:.<precision>e}'.format(x) for each
+    element in x.
+
+    The mantissa is rounded from x times an exact power of ten. Elements
+    which are not finite, which are close to a tie in the rounding, or
+    whose exponent is off, are formatted by python.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    num = len(x)
+    width = 1 + 1 + 1 + precision + 1 + 1 + 3
+    out = np.zeros(shape=(num, width), dtype=np.uint8)
+
+    a = np.abs(x)
+    is_zero = a == 0.0
+    is_normal = np.logical_and(np.isfinite(a), np.logical_not(is_zero))
+
+    exponent = np.zeros(num, dtype=np.int64)
+    exponent[is_normal] = np.floor(np.log10(a[is_normal]))
+    k = precision - exponent
+    ok = np.logical_or(is_zero, np.logical_and(is_normal, np.abs(k) <= 22))
+
+    power = _POWERS_OF_TEN[np.clip(np.abs(k), 0, 22)]
+    with np.errstate(over="ignore", invalid="ignore"):
+        scaled = np.where(k >= 0, a * power, a / power)
+        mantissa = np.rint(scaled)
+        distance_to_tie = np.abs(scaled - np.floor(scaled) - 0.5)
+    ok[is_normal] = np.logical_and.reduce(
+        [
+            ok[is_normal],
+            distance_to_tie[is_normal] > 4 * np.spacing(scaled[is_normal]),
+            mantissa[is_normal] >= 10**precision,
+            mantissa[is_normal] < 10 ** (precision + 1),
+        ]
+    )
+    mantissa[np.logical_not(ok)] = 0
+    mantissa = mantissa.astype(np.int64)
+    exponent[is_zero] = 0
+
+    out[:, 0] = np.where(np.signbit(x), ord("-"), 0)
+    for j in range(precision, -1, -1):
+        col = 1 if j == 0 else 2 + j
+        out[:, col] = _DIGITS[mantissa % 10]
+        mantissa = mantissa // 10
+    out[:, 2] = ord(".")
+    out[:, 3 + precision] = ord("e")
+    out[:, 4 + precision] = np.where(exponent < 0, ord("-"), ord("+"))
+    e = np.abs(exponent)
+    out[:, 5 + precision] = np.where(e >= 100, _DIGITS[(e // 100) % 10], 0)
+    out[:, 6 + precision] = _DIGITS[(e // 10) % 10]
+    out[:, 7 + precision] = _DIGITS[e % 10]
+
+    fmt = "{:." + str(precision) + "e}"
+    for i in np.flatnonzero(np.logical_not(ok)):
+        _put_left_aligned(out=out, i=i, s=fmt.format(x[i]))
+    return out
+
+
+def _put_left_aligned(out, i, s):
+    b = np.frombuffer(s.encode(), dtype=np.uint8)
+    assert len(b) <= out.shape[1]
+    out[i, :] = 0
+    out[i, 0 : len(b)] = b
 
 
 def write_light_fields_to_space_seperated_values(light_fields, path):
+    """
+    Opens path only once for all light_fields. On a named pipe, closing it
+    would end the stream for the reader.
+    """
     curid = 0
-    for lf in light_fields:
-        sups = lf[0]
-        dirs = lf[1]
-        ids = np.arange(curid, curid + len(sups))
-        curid += len(sups)
+    with open(path, "ab") as f:
+        for lf in light_fields:
+            sups = lf[0]
+            dirs = lf[1]
+            ids = np.arange(curid, curid + len(sups))
+            curid += len(sups)
 
-        append_photons_to_space_seperated_values(
-            path=path,
-            ids=ids,
-            supports=sups,
-            directions=dirs,
-            wavelengths=np.ones(len(sups)) * 433e-9,
-        )
+            write_photons_to_space_seperated_values(
+                f=f,
+                ids=ids,
+                supports=sups,
+                directions=dirs,
+                wavelengths=np.ones(len(sups)) * 433e-9,
+            )
 
 
 def make_plenopy_event_and_read_light_field_geometry(
@@ -73,7 +227,13 @@ def make_plenopy_event_and_read_light_field_geometry(
     merlict_propagate_config_path,
     random_seed=0,
     work_dir=None,
+    use_named_pipe=False,
 ):
+    """
+    When use_named_pipe is True, the photons are streamed through a named
+    pipe into merlict while they are formatted instead of being written
+    into a file first.
+    """
     if work_dir == None:
         work_dir_cleanup = True
         tmpdir_handle = tempfile.TemporaryDirectory(prefix="phantom_source_")
@@ -85,21 +245,31 @@ def make_plenopy_event_and_read_light_field_geometry(
     photons_path = os.path.join(work_dir, "photons.ssv")
     run_dir = os.path.join(work_dir, "run")
 
-    write_light_fields_to_space_seperated_values(
-        light_fields=light_fields,
-        path=photons_path,
-    )
+    def _write_photons(path):
+        write_light_fields_to_space_seperated_values(
+            light_fields=light_fields,
+            path=path,
+        )
 
-    rc = merlict_development_kit_python.plenoscope_propagator.plenoscope_propagator_raw_photons(
-        input_path=photons_path,
-        output_path=run_dir,
-        light_field_geometry_path=light_field_geometry_path,
-        merlict_plenoscope_propagator_config_path=merlict_propagate_config_path,
-        random_seed=0,
-    )
+    def _propagate_photons():
+        return merlict_development_kit_python.plenoscope_propagator.plenoscope_propagator_raw_photons(
+            input_path=photons_path,
+            output_path=run_dir,
+            light_field_geometry_path=light_field_geometry_path,
+            merlict_plenoscope_propagator_config_path=merlict_propagate_config_path,
+            random_seed=0,
+        )
+
+    if use_named_pipe:
+        rc = utils.named_pipe_write_while_reading(
+            path=photons_path, write=_write_photons, read=_propagate_photons
+        )
+    else:
+        _write_photons(path=photons_path)
+        rc = _propagate_photons()
 
-    light_field_geometry = plenopy.LightFieldGeometry(
-        light_field_geometry_path
+    light_field_geometry = cache.get_light_field_geometry(
+        path=light_field_geometry_path
     )
     event = plenopy.Event(
         os.path.join(run_dir, "1"),
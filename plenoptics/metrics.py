@@ -0,0 +1,246 @@
+"""
+Metrics of the jobs which make a work_dir.
+
+Each job run by plenoptics.run() appends one record to a JSON-lines file
+in work_dir/metrics. There is one file for each process, so processes do
+not interleave their lines, also not across the nodes of a cluster. A
+record has:
+
+- "stage": The stage of the job, e.g. "responses_map" or "plot_depth".
+- "instrument_key" and "observation_key": When the job has them.
+- "ok": False when the job raised.
+- "wall_s": The wall time.
+- "cpu_s": The CPU time of the worker.
+- "cpu_children_s": The CPU time of the subprocesses which finished
+  during the job, e.g. merlict.
+- "max_rss_bytes": The peak resident memory of the worker during the
+  job. The peak is reset before the job via /proc/self/clear_refs and
+  read from VmHWM in /proc/self/status. When the OS does not allow
+  this, it is None and "worker_max_rss_bytes_so_far" has the peak of the
+  worker since it started instead, which is not the job's own.
+- "worker_max_rss_children_bytes_so_far": The peak resident memory of
+  the largest subprocess of the worker since it started.
+- "read_bytes" and "write_bytes": The bytes read and written by the
+  worker. None when the OS does not tell.
+- Counters which the job returns, e.g. "num_photons" of the simulations.
+
+See summarize() to aggregate the records per stage and per instrument.
+"""
+import os
+import sys
+import glob
+import time
+import socket
+import resource
+import json_utils
+
+
+def make_dir(work_dir):
+    return os.path.join(work_dir, "metrics")
+
+
+def make_path(work_dir):
+    return os.path.join(
+        make_dir(work_dir=work_dir),
+        "{:s}.{:d}.jsonl".format(socket.gethostname(), os.getpid()),
+    )
+
+
+def run_job_and_record(job, run_job, work_dir, stage):
+    """
+    Runs run_job(job) and appends its record to the metrics of work_dir.
+    When run_job returns a dict of numbers, these are added as counters.
+    """
+    peak_was_reset = _reset_peak_rss()
+    start = _probe()
+    ok = False
+    try:
+        out = run_job(job)
+        ok = True
+        return out
+    finally:
+        stop = _probe()
+        record = _make_record(job=job, stage=stage, start=start, stop=stop)
+        if peak_was_reset:
+            record["max_rss_bytes"] = _read_peak_rss_bytes()
+        else:
+            record["max_rss_bytes"] = None
+            record["worker_max_rss_bytes_so_far"] = stop["max_rss_bytes"]
+        record["ok"] = ok
+        if ok and isinstance(out, dict):
+            for key in out:
+                record[key] = out[key]
+        append(work_dir=work_dir, record=record)
+
+
+def append(work_dir, record):
+    os.makedirs(make_dir(work_dir=work_dir), exist_ok=True)
+    with open(make_path(work_dir=work_dir), "at") as f:
+        f.write(json_utils.dumps(record) + "\n")
+
+
+def read(work_dir):
+    records = []
+    for path in sorted(glob.glob(os.path.join(make_dir(work_dir), "*.jsonl"))):
+        with open(path, "rt") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json_utils.loads(line))
+    return records
+
+
+def summarize(records):
+    """
+    Returns the sums of the records per stage and per stage and
+    instrument. The peak memory is the maximum, not the sum, e.g.
+    "max_rss_bytes" is the largest peak of a single job. A peak is None
+    when no record has it.
+
+    Returns
+    -------
+    summary : dict
+        {"stage": {stage: sums}, "stage_instrument": {stage: {ikey: sums}}}
+    """
+    out = {"stage": {}, "stage_instrument": {}}
+    for record in records:
+        stage = record["stage"]
+        if stage not in out["stage"]:
+            out["stage"][stage] = _init_sums()
+            out["stage_instrument"][stage] = {}
+        _add(sums=out["stage"][stage], record=record)
+
+        if "instrument_key" in record:
+            ikey = record["instrument_key"]
+            if ikey not in out["stage_instrument"][stage]:
+                out["stage_instrument"][stage][ikey] = _init_sums()
+            _add(sums=out["stage_instrument"][stage][ikey], record=record)
+    return out
+
+
+SUMMED_KEYS = [
+    "wall_s",
+    "cpu_s",
+    "cpu_children_s",
+    "read_bytes",
+    "write_bytes",
+    "num_photons",
+]
+MAXED_KEYS = [
+    "max_rss_bytes",
+    "worker_max_rss_bytes_so_far",
+    "worker_max_rss_children_bytes_so_far",
+]
+
+
+def _init_sums():
+    sums = {"num_jobs": 0, "num_failed": 0}
+    for key in SUMMED_KEYS:
+        sums[key] = 0
+    for key in MAXED_KEYS:
+        sums[key] = None
+    return sums
+
+
+def _add(sums, record):
+    sums["num_jobs"] += 1
+    if not record["ok"]:
+        sums["num_failed"] += 1
+    for key in SUMMED_KEYS:
+        if record.get(key, None) is not None:
+            sums[key] += record[key]
+    for key in MAXED_KEYS:
+        if record.get(key, None) is not None:
+            if sums[key] is None:
+                sums[key] = record[key]
+            else:
+                sums[key] = max(sums[key], record[key])
+
+
+def _make_record(job, stage, start, stop):
+    record = {"stage": stage}
+    for key in ["instrument_key", "observation_key"]:
+        if key in job:
+            record[key] = job[key]
+    if "instrument_key" not in record and "argv" in job:
+        # plot-jobs only have the arguments of their script.
+        if "--instrument_key" in job["argv"]:
+            i = job["argv"].index("--instrument_key")
+            record["instrument_key"] = job["argv"][i + 1]
+    if "numbers" in job:
+        record["num_numbers"] = len(job["numbers"])
+
+    record["host"] = socket.gethostname()
+    record["pid"] = os.getpid()
+    record["start_unix_s"] = start["unix_s"]
+    record["wall_s"] = stop["wall_s"] - start["wall_s"]
+    record["cpu_s"] = stop["cpu_s"] - start["cpu_s"]
+    record["cpu_children_s"] = stop["cpu_children_s"] - start["cpu_children_s"]
+    record["worker_max_rss_children_bytes_so_far"] = stop[
+        "max_rss_children_bytes"
+    ]
+    for key in ["read_bytes", "write_bytes"]:
+        if start[key] is None or stop[key] is None:
+            record[key] = None
+        else:
+            record[key] = stop[key] - start[key]
+    return record
+
+
+def _probe():
+    rself = resource.getrusage(resource.RUSAGE_SELF)
+    rchildren = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io = _read_proc_self_io()
+    return {
+        "unix_s": time.time(),
+        "wall_s": time.perf_counter(),
+        "cpu_s": rself.ru_utime + rself.ru_stime,
+        "cpu_children_s": rchildren.ru_utime + rchildren.ru_stime,
+        "max_rss_bytes": _maxrss_to_bytes(rself.ru_maxrss),
+        "max_rss_children_bytes": _maxrss_to_bytes(rchildren.ru_maxrss),
+        "read_bytes": io.get("rchar", None),
+        "write_bytes": io.get("wchar", None),
+    }
+
+
+def _reset_peak_rss():
+    """
+    Resets the peak resident memory (VmHWM) of this process. Returns False
+    when the OS does not allow it, e.g. when it is not Linux.
+    """
+    try:
+        with open("/proc/self/clear_refs", "wt") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _read_peak_rss_bytes():
+    try:
+        with open("/proc/self/status", "rt") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _maxrss_to_bytes(maxrss):
+    # Linux reports kilobytes, macOS bytes.
+    if sys.platform == "darwin":
+        return int(maxrss)
+    return int(maxrss) * 1024
+
+
+def _read_proc_self_io():
+    out = {}
+    try:
+        with open("/proc/self/io", "rt") as f:
+            for line in f:
+                key, value = line.split(":")
+                out[key.strip()] = int(value)
+    except (OSError, ValueError):
+        pass
+    return out
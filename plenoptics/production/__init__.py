@@ -1,3 +1,4 @@
 from . import light_field_geometry
 from . import observations
 from . import analysis
+from . import dag
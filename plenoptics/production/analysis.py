@@ -1,14 +1,14 @@
 import json_line_logger
 import os
-import zipfile
 import glob
 import json_utils
-import rename_after_writing
 import plenopy
-import shutil
 from . import observations
-from .. import sources
 from .. import utils
+from .. import cache
+from .. import analysis
+from .. import provenance
+from .. import compression
 
 
 def run(work_dir, pool, logger=None):
@@ -31,21 +31,23 @@ def run(work_dir, pool, logger=None):
     pool.map(_analysis_run_reducejob, reducejobs)
     logger.info("Analysis:Reducing: done.")
 
+    logger.info("Analysis:Summarizing: ...")
+    summaryjobs = _make_summary_jobs(config=config, work_dir=work_dir)
+    logger.info(
+        "Analysis:Summarizing: {:d} jobs to do".format(len(summaryjobs))
+    )
+    pool.map(_analysis_run_summaryjob, summaryjobs)
+    logger.info("Analysis:Summarizing: done.")
+
     logger.info("Analysis: Complete.")
 
 
 def _analysis_run_mapjob(job):
-    map_dir = os.path.join(
-        job["work_dir"],
-        "analysis",
-        job["instrument_key"],
-        job["observation_key"] + ".map",
-    )
-    os.makedirs(map_dir, exist_ok=True)
-
-    job_number_str = "{:06d}".format(job["number"])
-    outpath = os.path.join(map_dir, "{:s}.job.zip".format(job_number_str))
-
+    """
+    Analyses the responses of all numbers in the chunk-job. The responses'
+    zip-file, the light-field-geometry and the configs are opened once for
+    the chunk.
+    """
     responses_path = os.path.join(
         job["work_dir"],
         "responses",
@@ -53,13 +55,51 @@ def _analysis_run_mapjob(job):
         job["observation_key"] + ".zip",
     )
 
-    with zipfile.ZipFile(file=responses_path, mode="r") as z:
+    light_field_geometry = cache.get_light_field_geometry(
+        path=os.path.join(
+            job["work_dir"],
+            "instruments",
+            job["instrument_key"],
+            "light_field_geometry",
+        )
+    )
+
+    compression_config = compression.read_config(work_dir=job["work_dir"])
+
+    with utils.zipfile_open_for_reading(file=responses_path) as z:
+        for number_job in observations._jobs_of_chunk(job=job):
+            _analysis_run_mapjob_number(
+                job=number_job,
+                responses_zipfile=z,
+                light_field_geometry=light_field_geometry,
+                codec=compression_config["result"],
+            )
+
+
+def _analysis_run_mapjob_number(
+    job, responses_zipfile, light_field_geometry, codec
+):
+    z = responses_zipfile
+    job_number_str = "{:06d}".format(job["number"])
+
+    with utils.ZipReader(
+        zipfile=z,
+        name=os.path.join(job_number_str, "source_config.json"),
+        mode="rt",
+    ) as f:
+        source_config = json_utils.loads(f.read())
+
+    compact_response_name = os.path.join(
+        job_number_str, "compact_response.npz"
+    )
+    if utils.zipfile_has_member(zipfile=z, name=compact_response_name):
+        raw_sensor_response = None
         with utils.ZipReader(
-            zipfile=z,
-            name=os.path.join(job_number_str, "source_config.json"),
-            mode="rt",
+            zipfile=z, name=compact_response_name, mode="rb"
         ) as f:
-            source_config = json_utils.loads(f.read())
+            compact_response = analysis.compact_response.read(f=f)
+    else:
+        compact_response = None
         with utils.ZipReader(
             zipfile=z,
             name=os.path.join(job_number_str, "raw_sensor_response.phs.gz"),
@@ -69,46 +109,15 @@ def _analysis_run_mapjob(job):
                 f=f
             )
 
-    light_field_geometry = plenopy.LightFieldGeometry(
-        os.path.join(
-            job["work_dir"],
-            "instruments",
-            job["instrument_key"],
-            "light_field_geometry",
-        )
+    result = observations.analyse_response_to_source(
+        work_dir=job["work_dir"],
+        source_config=source_config,
+        light_field_geometry=light_field_geometry,
+        raw_sensor_response=raw_sensor_response,
+        compact_response=compact_response,
+        random_seed=job["number"],
     )
-
-    if job["observation_key"] == "star":
-        result = sources.star.analyse(
-            work_dir=job["work_dir"],
-            light_field_geometry=light_field_geometry,
-            source_config=source_config,
-            raw_sensor_response=raw_sensor_response,
-            random_seed=job["number"],
-        )
-    elif job["observation_key"] == "point":
-        result = sources.point.analyse(
-            work_dir=job["work_dir"],
-            light_field_geometry=light_field_geometry,
-            source_config=source_config,
-            raw_sensor_response=raw_sensor_response,
-            random_seed=job["number"],
-        )
-    elif job["observation_key"] == "phantom":
-        result = {}
-    else:
-        raise ValueError(
-            "Expected observation_key to be in ['star', 'point', 'phantom']."
-        )
-
-    with rename_after_writing.open(outpath, "wb") as file:
-        with zipfile.ZipFile(
-            file=file, mode="w", compression=zipfile.ZIP_STORED
-        ) as z:
-            with utils.ZipWriter(
-                zipfile=z, name="result.json.gz", mode="wt|gz"
-            ) as f:
-                f.write(json_utils.dumps(result))
+    observations.write_analysis_mapjob(job=job, result=result, codec=codec)
 
 
 def _analysis_run_reducejob(job):
@@ -129,8 +138,67 @@ def _analysis_run_reducejob(job):
         remove_after_reduce=True,
     )
 
-    if os.path.exists(base_path + ".zip"):
-        shutil.rmtree(base_path + ".map")
+    observations._finish_reduce(base_path=base_path)
+
+
+def _make_summary_jobs(config, work_dir):
+    jobs = []
+    for instrument_key in config["observations"]["instruments"]:
+        for observation_key in config["observations"]["instruments"][
+            instrument_key
+        ]:
+            if observation_key not in ["star", "point"]:
+                continue
+
+            result_path = os.path.join(
+                work_dir, "analysis", instrument_key, observation_key + ".zip"
+            )
+            summary_path = analysis.summary.make_path(
+                work_dir=work_dir,
+                instrument_key=instrument_key,
+                observation_key=observation_key,
+            )
+
+            digest = provenance.analysis_digest(
+                config=config,
+                instrument_key=instrument_key,
+                observation_key=observation_key,
+            )
+            provenance.remove_if_outdated(path=summary_path, digest=digest)
+
+            if os.path.exists(result_path) and not os.path.exists(
+                summary_path
+            ):
+                jobs.append(
+                    {
+                        "work_dir": work_dir,
+                        "instrument_key": instrument_key,
+                        "observation_key": observation_key,
+                        "digest": digest,
+                    }
+                )
+    return jobs
+
+
+def _analysis_run_summaryjob(job):
+    reports = utils.zipfile_json_read_to_dict(
+        os.path.join(
+            job["work_dir"],
+            "analysis",
+            job["instrument_key"],
+            job["observation_key"] + ".zip",
+        )
+    )
+    summary = analysis.summary.make(
+        observation_key=job["observation_key"], reports=reports
+    )
+    summary_path = analysis.summary.make_path(
+        work_dir=job["work_dir"],
+        instrument_key=job["instrument_key"],
+        observation_key=job["observation_key"],
+    )
+    analysis.summary.write(path=summary_path, summary=summary)
+    provenance.write(path=summary_path, digest=job["digest"])
 
 
 """
@@ -0,0 +1,205 @@
+"""
+Runs a graph of tasks. A task starts as soon as all the tasks it depends
+on are done, independent of other tasks in the graph.
+
+A task is a dict with:
+
+- "key": A unique str.
+- "depends_on": A list of keys of other tasks.
+- "make_jobs": A function without arguments which returns the list of
+  jobs still to be done. It is called when the task becomes ready, so it
+  can skip the jobs whose output already exists.
+- "run_job": A function which runs one job. Must be picklable, i.e.
+  defined on module level.
+
+The jobs of ready tasks are submitted to the pool as soon as they become
+available when the pool has 'apply_async' (multiprocessing.Pool) or
+'submit' (concurrent.futures). Pools which only have 'map' run the jobs of
+all ready tasks in waves.
+"""
+
+import queue
+import traceback
+from .. import utils
+
+
+def run(tasks, pool=None, logger=None):
+    """
+    Runs all tasks. A task whose jobs fail is marked as failed and the
+    tasks which depend on it are skipped. All other tasks still run.
+
+    Raises
+    ------
+    RuntimeError
+        When at least one task failed.
+    """
+    logger = utils.LoggerStdout_if_None(logger=logger)
+    pool = utils.pool_if_None(pool=pool)
+    graph = _make_graph(tasks=tasks)
+
+    if hasattr(pool, "apply_async") or hasattr(pool, "submit"):
+        state = _run_async(graph=graph, pool=pool, logger=logger)
+    else:
+        state = _run_in_waves(graph=graph, pool=pool, logger=logger)
+
+    if len(state["failed"]) > 0:
+        for key in state["errors"]:
+            logger.critical(
+                "Task '{:s}' failed: {:s}".format(key, state["errors"][key])
+            )
+        raise RuntimeError(
+            "Tasks failed: {:s}.".format(str(sorted(state["failed"])))
+        )
+
+
+def _make_graph(tasks):
+    graph = {}
+    for task in tasks:
+        assert task["key"] not in graph, "Task keys must be unique."
+        graph[task["key"]] = task
+    for key in graph:
+        for dep in graph[key]["depends_on"]:
+            assert (
+                dep in graph
+            ), "Task '{:s}' depends on unknown '{:s}'.".format(key, dep)
+    _assert_no_cycles(graph=graph)
+    return graph
+
+
+def _assert_no_cycles(graph):
+    done = set()
+    for key in graph:
+        path = set()
+        stack = [(key, False)]
+        while stack:
+            k, leaving = stack.pop()
+            if leaving:
+                path.discard(k)
+                done.add(k)
+                continue
+            if k in done:
+                continue
+            assert k not in path, "Cycle in tasks at '{:s}'.".format(k)
+            path.add(k)
+            stack.append((k, True))
+            for dep in graph[k]["depends_on"]:
+                stack.append((dep, False))
+
+
+def _init_state(graph):
+    return {
+        "pending": list(graph.keys()),
+        "num_open_jobs": {},
+        "done": set(),
+        "failed": set(),
+        "errors": {},
+    }
+
+
+def _start_ready_tasks(graph, state, logger):
+    """
+    Moves the tasks whose dependencies are done from pending to running and
+    returns their jobs as list of (key, item). Tasks without jobs are done
+    right away which can make further tasks ready.
+    """
+    out = []
+    changed = True
+    while changed:
+        changed = False
+        for key in list(state["pending"]):
+            depends_on = graph[key]["depends_on"]
+            if any([dep in state["failed"] for dep in depends_on]):
+                state["pending"].remove(key)
+                state["failed"].add(key)
+                logger.warning("Task '{:s}': skipped.".format(key))
+                changed = True
+            elif all([dep in state["done"] for dep in depends_on]):
+                state["pending"].remove(key)
+                changed = True
+                try:
+                    jobs = graph[key]["make_jobs"]()
+                except Exception:
+                    state["failed"].add(key)
+                    state["errors"][key] = traceback.format_exc()
+                    continue
+                logger.info(
+                    "Task '{:s}': {:d} jobs to do.".format(key, len(jobs))
+                )
+                if len(jobs) == 0:
+                    state["done"].add(key)
+                else:
+                    state["num_open_jobs"][key] = len(jobs)
+                    for job in jobs:
+                        item = {"run_job": graph[key]["run_job"], "job": job}
+                        out.append((key, item))
+    return out
+
+
+def _finish_job(state, key, error, logger):
+    if error is not None:
+        state["errors"][key] = error
+    state["num_open_jobs"][key] -= 1
+    if state["num_open_jobs"][key] == 0:
+        del state["num_open_jobs"][key]
+        if key in state["errors"]:
+            state["failed"].add(key)
+        else:
+            state["done"].add(key)
+            logger.info("Task '{:s}': done.".format(key))
+
+
+def _run_item(item):
+    """
+    Runs the job in item. Returns None or the traceback as str when the
+    job raised.
+    """
+    try:
+        item["run_job"](item["job"])
+        return None
+    except Exception:
+        return traceback.format_exc()
+
+
+def _run_async(graph, pool, logger):
+    state = _init_state(graph=graph)
+    completions = queue.Queue()
+
+    def submit(key, item):
+        if hasattr(pool, "apply_async"):
+            pool.apply_async(
+                _run_item,
+                (item,),
+                callback=lambda error: completions.put((key, error)),
+                error_callback=lambda err: completions.put((key, repr(err))),
+            )
+        else:
+            future = pool.submit(_run_item, item)
+            future.add_done_callback(
+                lambda f: completions.put(
+                    (key, repr(f.exception()) if f.exception() else f.result())
+                )
+            )
+
+    while True:
+        for key, item in _start_ready_tasks(
+            graph=graph, state=state, logger=logger
+        ):
+            submit(key=key, item=item)
+        if len(state["num_open_jobs"]) == 0:
+            break
+        key, error = completions.get()
+        _finish_job(state=state, key=key, error=error, logger=logger)
+    return state
+
+
+def _run_in_waves(graph, pool, logger):
+    state = _init_state(graph=graph)
+    while True:
+        wave = _start_ready_tasks(graph=graph, state=state, logger=logger)
+        if len(wave) == 0:
+            break
+        errors = pool.map(_run_item, [item for key, item in wave])
+        for i in range(len(wave)):
+            key = wave[i][0]
+            _finish_job(state=state, key=key, error=errors[i], logger=logger)
+    return state
@@ -11,6 +11,8 @@ import tarfile
 from .. import instruments
 from .. import merlict
 from .. import utils
+from .. import cache
+from .. import provenance
 
 
 def run(work_dir, pool, logger=None):
@@ -36,6 +38,12 @@ def run(work_dir, pool, logger=None):
     logger.info("lfg: {:d} jobs to do".format(len(pjobs)))
     pool.map(plot_run_job, pjobs)
     logger.info("lfg: Plots Done")
+
+    logger.info("lfg: Publish arrays to be shared by workers")
+    ujobs = publish_make_jobs(work_dir=work_dir)
+    logger.info("lfg: {:d} jobs to do".format(len(ujobs)))
+    pool.map(publish_run_job, ujobs)
+    logger.info("lfg: Publish done")
     logger.info("lfg: Done")
 
 
@@ -46,10 +54,18 @@ def make_sceneries_make_jobs(work_dir):
     for instrument_key in config["instruments"]:
         instrument_dir = os.path.join(instruments_dir, instrument_key)
 
+        # The scenery, the light-field-geometry, its plots and its
+        # publication are all in the instrument's directory.
+        digest = provenance.instrument_digest(
+            config=config, instrument_key=instrument_key
+        )
+        provenance.remove_if_outdated(path=instrument_dir, digest=digest)
+
         if not os.path.exists(instrument_dir):
             job = {
                 "work_dir": work_dir,
                 "instrument_key": instrument_key,
+                "digest": digest,
             }
             jobs.append(job)
     return jobs
@@ -97,16 +113,19 @@ def make_sceneries_run_job(job):
     json_utils.write(
         os.path.join(scenery_dir, "scenery.json"), merlict_scenery
     )
+    provenance.write(path=instrument_dir, digest=job["digest"])
 
 
-def map_and_reduce_make_jobs(work_dir):
+def map_and_reduce_make_jobs(work_dir, instrument_keys=None):
     config = json_utils.tree.read(os.path.join(work_dir, "config"))
     instruments_dir = os.path.join(work_dir, "instruments")
+    if instrument_keys is None:
+        instrument_keys = list(config["instruments"].keys())
 
     jobs = []
     rjobs = []
 
-    for instrument_key in config["instruments"]:
+    for instrument_key in instrument_keys:
         instrument_dir = os.path.join(instruments_dir, instrument_key)
         light_field_geometry_dir = os.path.join(
             instrument_dir, "light_field_geometry"
@@ -149,6 +168,26 @@ def map_and_reduce_make_jobs(work_dir):
     return jobs, rjobs
 
 
+def reduce_make_jobs(work_dir, instrument_keys=None):
+    config = json_utils.tree.read(os.path.join(work_dir, "config"))
+    instruments_dir = os.path.join(work_dir, "instruments")
+    if instrument_keys is None:
+        instrument_keys = list(config["instruments"].keys())
+
+    rjobs = []
+    for instrument_key in instrument_keys:
+        instrument_dir = os.path.join(instruments_dir, instrument_key)
+        lfg_dir = os.path.join(instrument_dir, "light_field_geometry")
+        map_dir = os.path.join(instrument_dir, "light_field_geometry.map")
+
+        if os.path.exists(map_dir) and not os.path.exists(lfg_dir):
+            rjob = {}
+            rjob["work_dir"] = work_dir
+            rjob["instrument_key"] = instrument_key
+            rjobs.append(rjob)
+    return rjobs
+
+
 def reduce_run_job(job):
     config = json_utils.tree.read(os.path.join(job["work_dir"], "config"))
 
@@ -218,3 +257,33 @@ def plot_run_job(job):
     with tarfile.open(plot_tar_path, "w") as tar:
         tar.add(name=plot_dir, arcname="plot", recursive=True)
     shutil.rmtree(plot_dir)
+
+
+def publish_make_jobs(work_dir):
+    config = json_utils.tree.read(os.path.join(work_dir, "config"))
+    instruments_dir = os.path.join(work_dir, "instruments")
+
+    jobs = []
+
+    for instrument_key in config["instruments"]:
+        lfg_dir = os.path.join(
+            instruments_dir, instrument_key, "light_field_geometry"
+        )
+
+        if not cache.is_published(path=lfg_dir):
+            job = {}
+            job["work_dir"] = work_dir
+            job["instrument_key"] = instrument_key
+            jobs.append(job)
+
+    return jobs
+
+
+def publish_run_job(job):
+    lfg_dir = os.path.join(
+        job["work_dir"],
+        "instruments",
+        job["instrument_key"],
+        "light_field_geometry",
+    )
+    cache.publish_light_field_geometry(path=lfg_dir)
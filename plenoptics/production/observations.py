@@ -4,9 +4,13 @@ import zipfile
 import json_utils
 import plenopy
 import rename_after_writing
-import shutil
+import tempfile
 from .. import sources
 from .. import utils
+from .. import cache
+from .. import analysis
+from .. import provenance
+from .. import compression
 
 
 def run(work_dir, pool, logger=None):
@@ -47,9 +51,42 @@ def _make_mapping_jobs(config, work_dir, task_key):
             result_path = base_path + ".zip"
             map_dir = base_path + ".map"
 
+            digest = _digest(
+                config=config,
+                task_key=task_key,
+                instrument_key=instrument_key,
+                observation_key=observation_key,
+            )
+            _remove_if_outdated(base_path=base_path, digest=digest)
+
             if os.path.exists(result_path):
                 continue
 
+            _init_map_dir(map_dir=map_dir, digest=digest)
+
+            if task_key == "responses" and _analyse_in_mapjob(
+                observation_config=config["observations"][observation_key],
+                observation_key=observation_key,
+            ):
+                # The map jobs also write into the analysis' map.
+                analysis_base_path = os.path.join(
+                    work_dir, "analysis", instrument_key, observation_key
+                )
+                analysis_digest = _digest(
+                    config=config,
+                    task_key="analysis",
+                    instrument_key=instrument_key,
+                    observation_key=observation_key,
+                )
+                _remove_if_outdated(
+                    base_path=analysis_base_path, digest=analysis_digest
+                )
+                if not os.path.exists(analysis_base_path + ".zip"):
+                    _init_map_dir(
+                        map_dir=analysis_base_path + ".map",
+                        digest=analysis_digest,
+                    )
+
             if observation_key == "star":
                 num_jobs = config["observations"]["star"]["num_stars"]
             elif observation_key == "point":
@@ -59,24 +96,118 @@ def _make_mapping_jobs(config, work_dir, task_key):
             else:
                 raise ValueError("Unknown observation_key")
 
+            chunk_size = _map_job_chunk_size(
+                config=config, observation_key=observation_key
+            )
+
             jobs = []
-            for job_number in range(num_jobs):
-                job_number_key = "{:06d}".format(job_number)
-                map_job_path = os.path.join(
-                    map_dir, job_number_key + ".job.zip"
-                )
-                if not os.path.exists(map_job_path):
+            for chunk_start in range(0, num_jobs, chunk_size):
+                chunk_stop = min(chunk_start + chunk_size, num_jobs)
+                numbers = []
+                for job_number in range(chunk_start, chunk_stop):
+                    job_number_key = "{:06d}".format(job_number)
+                    map_job_path = os.path.join(
+                        map_dir, job_number_key + ".job.zip"
+                    )
+                    if not os.path.exists(map_job_path):
+                        numbers.append(job_number)
+                if len(numbers) > 0:
                     job = {
                         "work_dir": work_dir,
                         "instrument_key": instrument_key,
                         "observation_key": observation_key,
-                        "number": job_number,
+                        "numbers": numbers,
                     }
                     jobs.append(job)
             mapjobs += jobs
     return mapjobs
 
 
+def _digest(config, task_key, instrument_key, observation_key):
+    if task_key == "responses":
+        make_digest = provenance.responses_digest
+    elif task_key == "analysis":
+        make_digest = provenance.analysis_digest
+    else:
+        raise ValueError("Unknown task_key")
+    return make_digest(
+        config=config,
+        instrument_key=instrument_key,
+        observation_key=observation_key,
+    )
+
+
+def _remove_if_outdated(base_path, digest):
+    """
+    Removes the reduced archive base_path.zip and the map base_path.map
+    when they were made with a different digest. An interrupted reduction
+    and the archive's index are removed with them.
+    """
+    result_path = base_path + ".zip"
+    map_dir = base_path + ".map"
+    if provenance.is_outdated(
+        path=result_path, digest=digest
+    ) or provenance.is_outdated(path=map_dir, digest=digest):
+        provenance.remove(path=result_path)
+        provenance.remove(path=map_dir)
+        for path in [
+            result_path + ".part",
+            result_path + ".part.checkpoint.json",
+            utils.zipfile_index_path(result_path),
+        ]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _init_map_dir(map_dir, digest):
+    os.makedirs(map_dir, exist_ok=True)
+    if provenance.read(path=map_dir) is None:
+        provenance.write(path=map_dir, digest=digest)
+
+
+def _finish_reduce(base_path):
+    """
+    The reduced archive inherits the digest of its map. Then the map is
+    removed.
+    """
+    if os.path.exists(base_path + ".zip"):
+        digest = provenance.read(path=base_path + ".map")
+        if digest is not None:
+            provenance.write(path=base_path + ".zip", digest=digest)
+        provenance.remove(path=base_path + ".map")
+
+
+def _map_job_chunk_size(config, observation_key):
+    """
+    Returns how many numbers of the observation one map job covers.
+    Each number still writes its own '.job.zip' into the map, so an
+    interrupted job only has to redo the numbers it did not write yet.
+    """
+    if observation_key == "phantom":
+        return 1
+    chunk_size = config["observations"][observation_key].get(
+        "map_job_chunk_size", 1
+    )
+    assert chunk_size >= 1, "Expected map_job_chunk_size >= 1."
+    return chunk_size
+
+
+def _jobs_of_chunk(job):
+    """
+    Returns one job for each number in the chunk-job.
+    """
+    out = []
+    for number in job["numbers"]:
+        number_job = {
+            "work_dir": job["work_dir"],
+            "instrument_key": job["instrument_key"],
+            "observation_key": job["observation_key"],
+            "number": number,
+        }
+        out.append(number_job)
+    return out
+
+
 def _make_reducing_jobs(config, work_dir, task_key):
     reducejobs = []
 
@@ -102,6 +233,12 @@ def _make_reducing_jobs(config, work_dir, task_key):
 
 
 def _observations_run_mapjob(job):
+    """
+    Simulates the responses of all numbers in the chunk-job. The configs,
+    the geometry of the instrument and merlict's propagation config are
+    set up once for the chunk. Returns the number of photons detected in
+    the responses.
+    """
     mapdir = os.path.join(
         job["work_dir"],
         "responses",
@@ -110,8 +247,6 @@ def _observations_run_mapjob(job):
     )
     os.makedirs(mapdir, exist_ok=True)
 
-    outpath = os.path.join(mapdir, "{:06d}.job.zip".format(job["number"]))
-
     light_field_geometry_path = os.path.join(
         job["work_dir"],
         "instruments",
@@ -119,9 +254,69 @@ def _observations_run_mapjob(job):
         "light_field_geometry",
     )
 
-    merlict_config = json_utils.tree.read(
+    setup = {}
+    setup["mapdir"] = mapdir
+    setup["light_field_geometry_path"] = light_field_geometry_path
+    setup["merlict_config"] = json_utils.tree.read(
         os.path.join(job["work_dir"], "config", "merlict")
     )
+    setup["basenames"] = _response_basenames(
+        work_dir=job["work_dir"], observation_key=job["observation_key"]
+    )
+    setup["compression_config"] = compression.read_config(
+        work_dir=job["work_dir"]
+    )
+    analysis_path = os.path.join(
+        job["work_dir"],
+        "analysis",
+        job["instrument_key"],
+        job["observation_key"] + ".zip",
+    )
+    setup["analyse_in_mapjob"] = False
+    if job["observation_key"] != "phantom":
+        observation_config = json_utils.read(
+            os.path.join(
+                job["work_dir"],
+                "config",
+                "observations",
+                job["observation_key"] + ".json",
+            )
+        )
+        setup["analyse_in_mapjob"] = _analyse_in_mapjob(
+            observation_config=observation_config,
+            observation_key=job["observation_key"],
+        ) and not os.path.exists(analysis_path)
+    setup["instrument_geometry"] = (
+        utils.get_instrument_geometry_from_light_field_geometry(
+            light_field_geometry_path=light_field_geometry_path
+        )
+    )
+
+    with tempfile.TemporaryDirectory(
+        prefix="plenoscope-aberration-demo_"
+    ) as tmp_dir:
+        setup["merlict_propagation_config_path"] = os.path.join(
+            tmp_dir, "merlict_propagation_config.json"
+        )
+        json_utils.write(
+            setup["merlict_propagation_config_path"],
+            setup["merlict_config"]["merlict_propagation_config"],
+        )
+
+        num_photons = 0
+        for number_job in _jobs_of_chunk(job=job):
+            num_photons += _observations_run_mapjob_number(
+                job=number_job, setup=setup
+            )
+
+    return {"num_photons": num_photons}
+
+
+def _observations_run_mapjob_number(job, setup):
+    outpath = os.path.join(
+        setup["mapdir"], "{:06d}.job.zip".format(job["number"])
+    )
+    basenames = setup["basenames"]
 
     if job["observation_key"] == "star":
         source_config = sources.star.make_source_config_from_job(job=job)
@@ -134,10 +329,45 @@ def _observations_run_mapjob(job):
 
     raw_sensor_response = make_response_to_source(
         source_config=source_config,
-        light_field_geometry_path=light_field_geometry_path,
-        merlict_config=merlict_config,
+        light_field_geometry_path=setup["light_field_geometry_path"],
+        merlict_config=setup["merlict_config"],
+        instrument_geometry=setup["instrument_geometry"],
+        merlict_propagation_config_path=setup[
+            "merlict_propagation_config_path"
+        ],
     )
 
+    compact_response = None
+    if "compact_response.npz" in basenames:
+        compact_response = analysis.compact_response.make(
+            raw_sensor_response=raw_sensor_response,
+            light_field_geometry=cache.get_light_field_geometry(
+                path=setup["light_field_geometry_path"]
+            ),
+        )
+
+    if setup["analyse_in_mapjob"]:
+        # Same input as the analysis would read back from the responses.
+        result = analyse_response_to_source(
+            work_dir=job["work_dir"],
+            source_config=source_config,
+            light_field_geometry=cache.get_light_field_geometry(
+                path=setup["light_field_geometry_path"]
+            ),
+            raw_sensor_response=(
+                raw_sensor_response if compact_response is None else None
+            ),
+            compact_response=compact_response,
+            random_seed=job["number"],
+        )
+        # Written before the response, so a job with a response always
+        # has its result.
+        write_analysis_mapjob(
+            job=job,
+            result=result,
+            codec=setup["compression_config"]["result"],
+        )
+
     with rename_after_writing.open(outpath, "wb") as file:
         with zipfile.ZipFile(
             file=file, mode="w", compression=zipfile.ZIP_STORED
@@ -146,41 +376,158 @@ def _observations_run_mapjob(job):
                 zipfile=z, name="source_config.json", mode="wt"
             ) as f:
                 f.write(json_utils.dumps(source_config))
-            with utils.ZipWriter(
-                zipfile=z, name="raw_sensor_response.phs.gz", mode="wb|gz"
-            ) as f:
-                plenopy.raw_light_field_sensor_response.write(
-                    f=f, raw_sensor_response=raw_sensor_response
-                )
+            if "raw_sensor_response.phs.gz" in basenames:
+                with utils.ZipWriter(
+                    zipfile=z,
+                    name="raw_sensor_response.phs.gz",
+                    mode="wb|gz",
+                    codec=setup["compression_config"]["raw_sensor_response"],
+                ) as f:
+                    plenopy.raw_light_field_sensor_response.write(
+                        f=f, raw_sensor_response=raw_sensor_response
+                    )
+            if "compact_response.npz" in basenames:
+                with utils.ZipWriter(
+                    zipfile=z, name="compact_response.npz", mode="wb"
+                ) as f:
+                    analysis.compact_response.write(
+                        f=f, compact_response=compact_response
+                    )
+
+    return int(raw_sensor_response["number_photons"])
+
+
+def _response_basenames(work_dir, observation_key):
+    """
+    Returns the basenames of the files written for each job of the
+    observation. Stars and points can write the full raw sensor response,
+    the compact response which is sufficient for their analysis, or both.
+    """
+    basenames = ["source_config.json"]
+    if observation_key == "phantom":
+        basenames.append("raw_sensor_response.phs.gz")
+        return basenames
+
+    observation_config = json_utils.read(
+        os.path.join(
+            work_dir, "config", "observations", observation_key + ".json"
+        )
+    )
+    # Configs from before the compact response only write the raw one.
+    write_raw = observation_config.get("write_raw_sensor_response", True)
+    write_compact = observation_config.get("write_compact_response", False)
+    assert write_raw or write_compact
+    if write_raw:
+        basenames.append("raw_sensor_response.phs.gz")
+    if write_compact:
+        basenames.append("compact_response.npz")
+    return basenames
+
+
+def _analyse_in_mapjob(observation_config, observation_key):
+    """
+    Returns True when the stars or points are analysed right after they
+    were simulated, in the same job, see analyse_response_to_source().
+    The analysis' map is then already done and it only needs to reduce.
+    """
+    if observation_key == "phantom":
+        return False
+    return observation_config.get("analyse_in_map_job", False)
 
 
 def make_response_to_source(
     source_config,
     light_field_geometry_path,
     merlict_config,
+    instrument_geometry=None,
+    merlict_propagation_config_path=None,
 ):
     if source_config["type"] == "star":
         return sources.star.make_response_to_star(
             star_config=source_config,
             light_field_geometry_path=light_field_geometry_path,
             merlict_config=merlict_config,
+            instrument_geometry=instrument_geometry,
+            merlict_propagation_config_path=merlict_propagation_config_path,
         )
     elif source_config["type"] == "mesh":
         return sources.mesh.make_response_to_mesh(
             mesh_config=source_config,
             light_field_geometry_path=light_field_geometry_path,
             merlict_config=merlict_config,
+            instrument_geometry=instrument_geometry,
+            merlict_propagation_config_path=merlict_propagation_config_path,
         )
     elif source_config["type"] == "point":
         return sources.point.make_response_to_point(
             point_config=source_config,
             light_field_geometry_path=light_field_geometry_path,
             merlict_config=merlict_config,
+            instrument_geometry=instrument_geometry,
+            merlict_propagation_config_path=merlict_propagation_config_path,
+        )
+    else:
+        raise AssertionError("Type of source is not known")
+
+
+def analyse_response_to_source(
+    work_dir,
+    source_config,
+    light_field_geometry,
+    raw_sensor_response,
+    compact_response,
+    random_seed,
+):
+    if source_config["type"] == "star":
+        return sources.star.analyse(
+            work_dir=work_dir,
+            light_field_geometry=light_field_geometry,
+            source_config=source_config,
+            raw_sensor_response=raw_sensor_response,
+            random_seed=random_seed,
+            compact_response=compact_response,
+        )
+    elif source_config["type"] == "point":
+        return sources.point.analyse(
+            work_dir=work_dir,
+            light_field_geometry=light_field_geometry,
+            source_config=source_config,
+            raw_sensor_response=raw_sensor_response,
+            random_seed=random_seed,
+            compact_response=compact_response,
         )
+    elif source_config["type"] == "mesh":
+        return {}
     else:
         raise AssertionError("Type of source is not known")
 
 
+def write_analysis_mapjob(job, result, codec):
+    """
+    Writes the result of the analysis of the job into the analysis' map.
+    """
+    map_dir = os.path.join(
+        job["work_dir"],
+        "analysis",
+        job["instrument_key"],
+        job["observation_key"] + ".map",
+    )
+    os.makedirs(map_dir, exist_ok=True)
+    outpath = os.path.join(map_dir, "{:06d}.job.zip".format(job["number"]))
+
+    with rename_after_writing.open(outpath, "wb") as file:
+        with zipfile.ZipFile(
+            file=file, mode="w", compression=zipfile.ZIP_STORED
+        ) as z:
+            with utils.ZipWriter(
+                zipfile=z,
+                name="result.json.gz",
+                mode="wt|gz",
+                codec=codec,
+            ) as f:
+                f.write(json_utils.dumps(result))
+
+
 def _observations_run_reducejob(job):
     base_path = os.path.join(
         job["work_dir"],
@@ -192,13 +539,11 @@ def _observations_run_reducejob(job):
     utils.zipfile_reduce(
         map_dir=base_path + ".map",
         out_path=base_path + ".zip",
-        job_basenames=[
-            "source_config.json",
-            "raw_sensor_response.phs.gz",
-        ],
+        job_basenames=_response_basenames(
+            work_dir=job["work_dir"], observation_key=job["observation_key"]
+        ),
         job_ext=".job.zip",
         remove_after_reduce=True,
     )
 
-    if os.path.exists(base_path + ".zip"):
-        shutil.rmtree(base_path + ".map")
+    _finish_reduce(base_path=base_path)
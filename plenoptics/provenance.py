@@ -0,0 +1,146 @@
+"""
+Which config an artifact in the work_dir was made with.
+
+Each artifact, a file or a directory, can have a sidecar '<path>.hash'
+which holds the digest of exactly the config it depends on, including the
+digests of the upstream artifacts it was made from. See e.g.
+responses_digest().
+
+When the config changes, the digest which the planners expect for an
+artifact changes as well and the outdated artifact is removed, see
+remove_if_outdated(). Artifacts downstream of it are outdated by the same
+change because their digests include the upstream digest.
+
+Artifacts without a sidecar, e.g. made before sidecars were written, are
+taken as they are.
+"""
+import os
+import shutil
+import hashlib
+import json_utils
+
+EXTENSION = ".hash"
+
+# Keys in the observations' config which do not change the responses.
+OBSERVATION_KEYS_WITHOUT_EFFECT = [
+    "analyse_in_map_job",
+    "map_job_chunk_size",
+]
+
+
+def digest(*objs):
+    """
+    Returns the sha256 hex-digest of the objs in canonical json.
+    """
+    payload = json_utils.dumps(list(objs), sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def instrument_digest(config, instrument_key):
+    """
+    Of the instrument's directory with its scenery and its
+    light-field-geometry.
+    """
+    icfg = config["instruments"][instrument_key]
+    return digest(
+        icfg,
+        config["mirrors"][icfg["mirror"]],
+        config["sensors"][icfg["sensor"]],
+        config["mirror_deformations"][icfg["mirror_deformation"]],
+        config["sensor_transformations"][icfg["sensor_transformation"]],
+        config["statistics"]["light_field_geometry"],
+    )
+
+
+def responses_digest(config, instrument_key, observation_key):
+    """
+    Of the responses of the instrument to the observation.
+    """
+    ocfg = dict(config["observations"][observation_key])
+    for key in OBSERVATION_KEYS_WITHOUT_EFFECT:
+        ocfg.pop(key, None)
+    return digest(
+        instrument_digest(config=config, instrument_key=instrument_key),
+        ocfg,
+        config["merlict"]["merlict_propagation_config"],
+    )
+
+
+def analysis_digest(config, instrument_key, observation_key):
+    """
+    Of the analysis of the responses of the instrument to the observation.
+    """
+    return digest(
+        responses_digest(
+            config=config,
+            instrument_key=instrument_key,
+            observation_key=observation_key,
+        ),
+        config["analysis"].get(observation_key, None),
+    )
+
+
+def mirror_deformation_digest(config, mirror_key, deformation_key):
+    return digest(
+        config["mirrors"][mirror_key],
+        config["mirror_deformations"][deformation_key],
+    )
+
+
+def sidecar_path(path):
+    return os.path.normpath(path) + EXTENSION
+
+
+def read(path):
+    """
+    Returns the digest of the artifact in path, or None when it has no
+    sidecar.
+    """
+    try:
+        with open(sidecar_path(path), "rt") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def write(path, digest):
+    tmp_path = sidecar_path(path) + ".tmp"
+    with open(tmp_path, "wt") as f:
+        f.write(digest)
+    os.rename(tmp_path, sidecar_path(path))
+
+
+def is_outdated(path, digest):
+    """
+    Returns True when the artifact in path exists but was made with a
+    different digest.
+    """
+    if not os.path.exists(path):
+        return False
+    recorded = read(path)
+    if recorded is None:
+        return False
+    return recorded != digest
+
+
+def remove(path):
+    """
+    Removes the artifact in path, a file or a directory, and its sidecar.
+    """
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+    if os.path.exists(sidecar_path(path)):
+        os.remove(sidecar_path(path))
+
+
+def remove_if_outdated(path, digest):
+    """
+    Removes the artifact in path when it is outdated. Returns True when it
+    was removed.
+    """
+    if is_outdated(path=path, digest=digest):
+        remove(path=path)
+        return True
+    return False
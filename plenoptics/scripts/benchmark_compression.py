@@ -0,0 +1,42 @@
+#!/usr/bin/python
+import os
+import zipfile
+import posixpath
+import json_utils
+import plenoptics
+import argparse
+
+argparser = argparse.ArgumentParser()
+argparser.add_argument("--work_dir", type=str)
+argparser.add_argument("--instrument_key", type=str)
+argparser.add_argument("--observation_key", default="star", type=str)
+argparser.add_argument("--max_num_payloads", default=10, type=int)
+
+args = argparser.parse_args()
+
+responses_path = os.path.join(
+    args.work_dir,
+    "responses",
+    args.instrument_key,
+    args.observation_key + ".zip",
+)
+
+payload = bytearray()
+with zipfile.ZipFile(file=responses_path, mode="r") as zin:
+    names = [
+        name
+        for name in zin.namelist()
+        if posixpath.basename(name) == "raw_sensor_response.phs.gz"
+    ]
+    for name in names[: args.max_num_payloads]:
+        with plenoptics.utils.ZipReader(
+            zipfile=zin, name=name, mode="rb|gz"
+        ) as f:
+            payload += f.read()
+
+results = plenoptics.compression.benchmark(
+    payload=bytes(payload),
+    codecs=plenoptics.compression.list_benchmark_codecs(),
+)
+for result in results:
+    print(json_utils.dumps(result))
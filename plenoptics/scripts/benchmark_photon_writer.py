@@ -0,0 +1,56 @@
+#!/usr/bin/python
+import numpy as np
+import time
+import plenoptics
+import json_utils
+import argparse
+
+argparser = argparse.ArgumentParser()
+argparser.add_argument("--num_photons", default=1000000, type=int)
+args = argparser.parse_args()
+
+prng = np.random.Generator(np.random.PCG64(1))
+num = args.num_photons
+ids = np.arange(num)
+supports = prng.uniform(low=-40.0, high=40.0, size=(num, 3))
+directions = prng.normal(loc=0.0, scale=0.01, size=(num, 3))
+wavelengths = 433e-9 * np.ones(num)
+
+t_start = time.perf_counter()
+lines = []
+for i in range(num):
+    lines.append(
+        plenoptics.merlict.PHOTON_LINE_FORMAT.format(
+            ids[i],
+            supports[i, 0],
+            supports[i, 1],
+            supports[i, 2],
+            directions[i, 0],
+            directions[i, 1],
+            directions[i, 2],
+            wavelengths[i],
+        )
+    )
+per_line = str.join("", lines).encode()
+t_per_line = time.perf_counter() - t_start
+
+t_start = time.perf_counter()
+bulk = plenoptics.merlict.format_photons_to_space_seperated_values(
+    ids=ids,
+    supports=supports,
+    directions=directions,
+    wavelengths=wavelengths,
+)
+t_bulk = time.perf_counter() - t_start
+
+assert bulk == per_line
+
+print(
+    json_utils.dumps(
+        {
+            "num_photons": num,
+            "per_line_photons_per_s": num / t_per_line,
+            "bulk_photons_per_s": num / t_bulk,
+        }
+    )
+)
@@ -0,0 +1,19 @@
+#!/usr/bin/python
+import plenoptics
+import json_utils
+import argparse
+
+argparser = argparse.ArgumentParser(
+    description=(
+        "Sums the metrics of the jobs per stage and per instrument. "
+        "max_rss_bytes is the largest peak memory of a single job. "
+        "worker_max_rss_*_so_far is the peak of a whole worker, not of a job."
+    )
+)
+argparser.add_argument("--work_dir", type=str)
+
+args = argparser.parse_args()
+
+records = plenoptics.metrics.read(work_dir=args.work_dir)
+summary = plenoptics.metrics.summarize(records=records)
+print(json_utils.dumps(summary, indent=4))
@@ -6,7 +6,6 @@ import os
 from .. import utils
 from .. import merlict
 
-
 EXAMPLE_MESH_CONFIG = {
     "type": "mesh",
     "meshes": [
@@ -21,10 +20,18 @@ def make_response_to_mesh(
     light_field_geometry_path,
     merlict_config,
     emission_distance_to_aperture_m=1e3,
+    instrument_geometry=None,
+    merlict_propagation_config_path=None,
 ):
-    instgeom = utils.get_instrument_geometry_from_light_field_geometry(
-        light_field_geometry_path=light_field_geometry_path
-    )
+    """
+    See sources.star.make_response_to_star() for instrument_geometry and
+    merlict_propagation_config_path.
+    """
+    instgeom = instrument_geometry
+    if instgeom is None:
+        instgeom = utils.get_instrument_geometry_from_light_field_geometry(
+            light_field_geometry_path=light_field_geometry_path
+        )
     illum_radius = (
         1.5 * instgeom["expected_imaging_system_max_aperture_radius"]
     )
@@ -42,13 +49,17 @@ def make_response_to_mesh(
     with tempfile.TemporaryDirectory(
         prefix="plenoscope-aberration-demo_"
     ) as tmp_dir:
-        merlict_plenoscope_propagator_config_path = os.path.join(
-            tmp_dir, "merlict_propagation_config.json"
-        )
-        json_utils.write(
-            merlict_plenoscope_propagator_config_path,
-            merlict_config["merlict_propagation_config"],
+        merlict_plenoscope_propagator_config_path = (
+            merlict_propagation_config_path
         )
+        if merlict_plenoscope_propagator_config_path is None:
+            merlict_plenoscope_propagator_config_path = os.path.join(
+                tmp_dir, "merlict_propagation_config.json"
+            )
+            json_utils.write(
+                merlict_plenoscope_propagator_config_path,
+                merlict_config["merlict_propagation_config"],
+            )
 
         (
             event,
@@ -59,6 +70,9 @@ def make_response_to_mesh(
             merlict_propagate_config_path=merlict_plenoscope_propagator_config_path,
             random_seed=merlict_random_seed,
             work_dir=None,
+            use_named_pipe=merlict_config.get("streaming", {}).get(
+                "use_named_pipe", False
+            ),
         )
         return event.raw_sensor_response
 
@@ -8,7 +8,8 @@ import binning_utils
 from . import mesh
 from .. import utils
 from .. import merlict
-
+from .. import cache
+from .. import analysis
 
 EXAMPLE_POINT_CONFIG = {
     "type": "point",
@@ -26,10 +27,18 @@ def make_response_to_point(
     merlict_config,
     point_source_apparent_radius_deg=0.005,
     emission_distance_to_aperture_m=1e3,
+    instrument_geometry=None,
+    merlict_propagation_config_path=None,
 ):
-    instgeom = utils.get_instrument_geometry_from_light_field_geometry(
-        light_field_geometry_path=light_field_geometry_path
-    )
+    """
+    See sources.star.make_response_to_star() for instrument_geometry and
+    merlict_propagation_config_path.
+    """
+    instgeom = instrument_geometry
+    if instgeom is None:
+        instgeom = utils.get_instrument_geometry_from_light_field_geometry(
+            light_field_geometry_path=light_field_geometry_path
+        )
     illum_radius = (
         1.5 * instgeom["expected_imaging_system_max_aperture_radius"]
     )
@@ -71,6 +80,8 @@ def make_response_to_point(
         light_field_geometry_path=light_field_geometry_path,
         merlict_config=merlict_config,
         emission_distance_to_aperture_m=emission_distance_to_aperture_m,
+        instrument_geometry=instgeom,
+        merlict_propagation_config_path=merlict_propagation_config_path,
     )
 
 
@@ -113,17 +124,26 @@ def analyse(
     source_config,
     raw_sensor_response,
     random_seed,
+    compact_response=None,
 ):
-    (
-        _,
-        beam_ids,
-    ) = plenopy.light_field_sequence.photon_arrival_times_and_lixel_ids(
-        raw_sensor_response=raw_sensor_response
-    )
-
-    participating_beams = make_participating_beams_from_lixel_ids(
-        beam_ids=beam_ids
-    )
+    """
+    Either the raw_sensor_response or the compact_response (see
+    analysis.compact_response) must be given.
+    """
+    if compact_response is None:
+        (
+            _,
+            beam_ids,
+        ) = plenopy.light_field_sequence.photon_arrival_times_and_lixel_ids(
+            raw_sensor_response=raw_sensor_response
+        )
+        participating_beams = make_participating_beams_from_lixel_ids(
+            beam_ids=beam_ids
+        )
+    else:
+        participating_beams = analysis.compact_response.participating_beams(
+            compact_response=compact_response
+        )
 
     prng = np.random.Generator(np.random.PCG64(random_seed))
 
@@ -147,6 +167,14 @@ def analyse(
             "image_containment_percentile"
         ],
         oversampling_beam_spread=cfg_analysis["oversampling_beam_spread"],
+        # Configs from before the golden-section search use the grid.
+        depth_search=cfg_analysis.get("depth_search", "grid"),
+        depth_search_relative_tolerance=cfg_analysis.get(
+            "depth_search_relative_tolerance", 1e-3
+        ),
+        depth_search_max_num_evaluations=cfg_analysis.get(
+            "depth_search_max_num_evaluations", 64
+        ),
     )
 
     report["cx_deg"] = source_config["cx_deg"]
@@ -258,12 +286,53 @@ def make_image_binning(field_of_view_deg, num_pixel_on_edge):
 
 
 def make_participating_beams_from_lixel_ids(beam_ids):
-    participating_beams = {}
-    for beam_id in beam_ids:
-        if beam_id not in participating_beams:
-            participating_beams[beam_id] = 0
-        participating_beams[beam_id] += 1
-    return participating_beams
+    """
+    Returns the participating beams of the photons with beam_ids.
+
+    Returns
+    -------
+    participating_beams : dict
+        beam_ids : array of ints
+            The unique ids of the beams which contain photons.
+        num_photons : array of ints
+            The number of photons in each of these beams.
+    """
+    unique_beam_ids, num_photons = np.unique(
+        np.asarray(beam_ids, dtype=np.int64), return_counts=True
+    )
+    return {"beam_ids": unique_beam_ids, "num_photons": num_photons}
+
+
+def make_participating_beams_from_dict(participating_beams_dict):
+    """
+    Adapter for the former representation of participating beams which
+    is a dict mapping each beam_id to its number of photons.
+    """
+    num = len(participating_beams_dict)
+    beam_ids = np.fromiter(
+        participating_beams_dict.keys(), dtype=np.int64, count=num
+    )
+    num_photons = np.fromiter(
+        participating_beams_dict.values(), dtype=np.int64, count=num
+    )
+    order = np.argsort(beam_ids)
+    return {"beam_ids": beam_ids[order], "num_photons": num_photons[order]}
+
+
+def make_dict_from_participating_beams(participating_beams):
+    out = {}
+    for beam_id, num_photons in zip(
+        participating_beams["beam_ids"], participating_beams["num_photons"]
+    ):
+        out[int(beam_id)] = int(num_photons)
+    return out
+
+
+def _participating_beams_as_arrays(participating_beams):
+    if "beam_ids" in participating_beams:
+        return participating_beams
+    else:
+        return make_participating_beams_from_dict(participating_beams)
 
 
 def plot_report(report, path):
@@ -312,9 +381,8 @@ def plot_report(report, path):
 
 
 def get_num_photons_in_participating_beams(participating_beams):
-    return np.sum(
-        [participating_beams[beam_id] for beam_id in participating_beams]
-    )
+    pb = _participating_beams_as_arrays(participating_beams)
+    return int(np.sum(pb["num_photons"]))
 
 
 def make_image(
@@ -326,33 +394,22 @@ def make_image(
     oversampling,
     prng,
 ):
+    pb = _participating_beams_as_arrays(participating_beams)
+    ids = pb["beam_ids"]
+    num_samples_per_beam = oversampling * pb["num_photons"]
+
     img_cx, img_cy = image_beams.cx_cy_in_object_distance(object_distance)
     img_cx_std = light_field_geometry.cx_std
     img_cy_std = light_field_geometry.cy_std
 
-    cx_hits = []
-    cy_hits = []
-    for beam_id in participating_beams:
-        num_photons = participating_beams[beam_id]
-        cx_h = prng.normal(
-            loc=img_cx[beam_id],
-            scale=img_cx_std[beam_id],
-            size=oversampling * num_photons,
-        )
-        cy_h = prng.normal(
-            loc=img_cy[beam_id],
-            scale=img_cy_std[beam_id],
-            size=oversampling * num_photons,
-        )
-        cx_hits.append(cx_h)
-        cy_hits.append(cy_h)
-
-    if cx_hits:
-        all_cx_hits = np.concatenate(cx_hits)
-        all_cy_hits = np.concatenate(cy_hits)
-    else:
-        all_cx_hits = []
-        all_cy_hits = []
+    all_cx_hits = prng.normal(
+        loc=np.repeat(img_cx[ids], num_samples_per_beam),
+        scale=np.repeat(img_cx_std[ids], num_samples_per_beam),
+    )
+    all_cy_hits = prng.normal(
+        loc=np.repeat(img_cy[ids], num_samples_per_beam),
+        scale=np.repeat(img_cy_std[ids], num_samples_per_beam),
+    )
 
     img = (1 / oversampling) * np.histogram2d(
         all_cx_hits,
@@ -364,6 +421,11 @@ def make_image(
 
 
 def estimate_inverse_photon_density_pixel_per_photon(image, percentile):
+    """
+    Returns the number of the brightest pixels needed to contain the
+    percentile of the photons in the image, divided by the number of
+    photons in these pixels. Only the non-zero pixels are sorted.
+    """
     assert 0.0 < percentile <= 100.0
     assert np.all(image >= 0.0)
 
@@ -372,19 +434,227 @@ def estimate_inverse_photon_density_pixel_per_photon(image, percentile):
     if S == 0:
         return float("nan")
 
-    a = np.flip(np.argsort(I))
-    num_photons = 0.0
-    fraction = 0.0
+    I = np.flip(np.sort(I[I > 0]))
+    fractions = np.cumsum(I / S)
     targeted_fraction = percentile / 100
-    num_pixel = 0
-    while fraction < targeted_fraction:
-        s = I[a[num_pixel]]
-        num_photons += s
-        fraction += s / S
-        num_pixel += 1
+    num_pixel = np.searchsorted(fractions, targeted_fraction, side="left") + 1
+    num_pixel = min(num_pixel, len(I))
+    num_photons = np.cumsum(I[:num_pixel])[-1]
     return num_pixel / num_photons
 
 
+class RefocusStack:
+    """
+    Refocuses the participating beams to many object distances.
+
+    The projection of each participating beam onto the image is
+    precomputed once. For an object distance d the beam's direction is
+    cx(d) = arctan(a_cx + b_cx / d), and likewise for cy. The
+    coefficients are fitted to image_beams.cx_cy_in_object_distance() on
+    two reference distances and verified on a third one. If the
+    verification fails, cx_cy_in_object_distance() is called for every
+    object distance instead.
+
+    With reuse_samples, the normal distributed spread of the beams is
+    drawn only once and reused for every object distance.
+    """
+
+    REFERENCE_OBJECT_DISTANCES_M = [1e3, 1e4, 1e5]
+
+    def __init__(
+        self,
+        image_beams,
+        light_field_geometry,
+        participating_beams,
+        oversampling,
+        prng,
+        reuse_samples=True,
+    ):
+        assert oversampling > 0
+        self.image_beams = image_beams
+        self.oversampling = oversampling
+        self.prng = prng
+        self.reuse_samples = reuse_samples
+
+        pb = _participating_beams_as_arrays(participating_beams)
+        self.beam_ids = pb["beam_ids"]
+        self.num_photons = pb["num_photons"]
+        self.num_samples_per_beam = self.oversampling * self.num_photons
+
+        self.cx_std = light_field_geometry.cx_std[self.beam_ids]
+        self.cy_std = light_field_geometry.cy_std[self.beam_ids]
+        self._init_projection_coefficients()
+
+        if self.reuse_samples:
+            self._normal_cx = self._draw_normal()
+            self._normal_cy = self._draw_normal()
+
+    def _init_projection_coefficients(self):
+        d0, d1, d2 = self.REFERENCE_OBJECT_DISTANCES_M
+        t0 = self._tan_cx_cy_from_image_beams(object_distance=d0)
+        t1 = self._tan_cx_cy_from_image_beams(object_distance=d1)
+        t2 = self._tan_cx_cy_from_image_beams(object_distance=d2)
+
+        self.b = (t0 - t2) / (1.0 / d0 - 1.0 / d2)
+        self.a = t0 - self.b / d0
+
+        t1_fit = self.a + self.b / d1
+        self.closed_form = bool(
+            np.allclose(t1_fit, t1, rtol=1e-6, atol=1e-9, equal_nan=True)
+        )
+
+    def _tan_cx_cy_from_image_beams(self, object_distance):
+        cx, cy = self.image_beams.cx_cy_in_object_distance(object_distance)
+        return np.tan(np.array([cx[self.beam_ids], cy[self.beam_ids]]))
+
+    def _draw_normal(self):
+        return self.prng.normal(size=np.sum(self.num_samples_per_beam))
+
+    def cx_cy_in_object_distance(self, object_distance):
+        """
+        Returns the directions (cx, cy) of the participating beams when
+        refocused to object_distance.
+        """
+        if self.closed_form:
+            t = self.a + self.b / object_distance
+            return np.arctan(t[0]), np.arctan(t[1])
+        else:
+            cx, cy = self.image_beams.cx_cy_in_object_distance(object_distance)
+            return cx[self.beam_ids], cy[self.beam_ids]
+
+    def samples(self, object_distance):
+        """
+        Returns the (cx, cy) of oversampling times num_photons samples
+        drawn from the participating beams refocused to object_distance.
+        """
+        cx, cy = self.cx_cy_in_object_distance(object_distance)
+        if self.reuse_samples:
+            normal_cx = self._normal_cx
+            normal_cy = self._normal_cy
+        else:
+            normal_cx = self._draw_normal()
+            normal_cy = self._draw_normal()
+        n = self.num_samples_per_beam
+        cx_hits = np.repeat(cx, n) + np.repeat(self.cx_std, n) * normal_cx
+        cy_hits = np.repeat(cy, n) + np.repeat(self.cy_std, n) * normal_cy
+        return cx_hits, cy_hits
+
+    def image(self, object_distance, image_binning, roi=False):
+        """
+        Returns the image refocused to object_distance. With roi, only the
+        region of interest which contains samples is returned, see
+        analysis.image.histogram2d_roi().
+        """
+        cx_hits, cy_hits = self.samples(object_distance=object_distance)
+        bins = (image_binning["cx"]["edges"], image_binning["cy"]["edges"])
+        if roi:
+            img, _ = analysis.image.histogram2d_roi(
+                x=cx_hits, y=cy_hits, bins=bins
+            )
+        else:
+            img = np.histogram2d(cx_hits, cy_hits, bins=bins)[0]
+        return (1 / self.oversampling) * img
+
+    def cx_cy_in_object_distances(self, object_distances):
+        """
+        Returns the directions (cx, cy) of the participating beams when
+        refocused to each of the object_distances. Each with shape
+        (num_object_distances, num_beams).
+        """
+        d = np.asarray(object_distances, dtype=float)
+        if self.closed_form:
+            t = self.a[:, None, :] + self.b[:, None, :] / d[None, :, None]
+            return np.arctan(t[0]), np.arctan(t[1])
+        else:
+            cxcy = [self.cx_cy_in_object_distance(di) for di in d]
+            cx = np.array([c[0] for c in cxcy])
+            cy = np.array([c[1] for c in cxcy])
+            return cx, cy
+
+    def samples_stack(self, object_distances):
+        """
+        Returns the samples() for each of the object_distances. Each with
+        shape (num_object_distances, num_samples).
+        """
+        if not self.reuse_samples:
+            # Each object distance draws its own samples.
+            s = [self.samples(object_distance=d) for d in object_distances]
+            return np.array([a[0] for a in s]), np.array([a[1] for a in s])
+
+        cx, cy = self.cx_cy_in_object_distances(object_distances)
+        n = self.num_samples_per_beam
+        spread_cx = np.repeat(self.cx_std, n) * self._normal_cx
+        spread_cy = np.repeat(self.cy_std, n) * self._normal_cy
+        cx_hits = np.repeat(cx, n, axis=1) + spread_cx[None, :]
+        cy_hits = np.repeat(cy, n, axis=1) + spread_cy[None, :]
+        return cx_hits, cy_hits
+
+    def spreads(
+        self,
+        object_distances,
+        image_binning,
+        percentile,
+        roi=True,
+        max_num_samples_per_pass=2**16,
+    ):
+        """
+        Returns the inverse photon density (pixel per photon) of the
+        image for each of the object_distances.
+
+        The images of many object distances are made in one pass, see
+        samples_stack() and analysis.image.histogram2d_stack(). Only to
+        limit the memory, the object_distances are split into passes of
+        at most max_num_samples_per_pass samples.
+        """
+        object_distances = np.asarray(object_distances, dtype=float)
+        num_samples = max(1, int(np.sum(self.num_samples_per_beam)))
+        step = max(1, max_num_samples_per_pass // num_samples)
+        bins = (image_binning["cx"]["edges"], image_binning["cy"]["edges"])
+
+        out = np.zeros(len(object_distances))
+        for start in range(0, len(object_distances), step):
+            stop = min(start + step, len(object_distances))
+            cx_hits, cy_hits = self.samples_stack(
+                object_distances=object_distances[start:stop]
+            )
+            counts = analysis.image.histogram2d_stack(
+                x=cx_hits, y=cy_hits, bins=bins, roi=roi
+            )
+            out[start:stop] = _inverse_photon_density_of_counts(
+                counts=counts.reshape((stop - start, -1)),
+                percentile=percentile,
+                oversampling=self.oversampling,
+            )
+        return out
+
+
+def _inverse_photon_density_of_counts(counts, percentile, oversampling):
+    """
+    Same as estimate_inverse_photon_density_pixel_per_photon() for each
+    row of counts, i.e. images of (1 / oversampling) * counts. The sums of
+    the integer counts are exact, so it does not matter whether the
+    images are cut to their region of interest.
+    """
+    assert 0.0 < percentile <= 100.0
+    num_images, num_pixel = counts.shape
+    out = np.full(num_images, float("nan"))
+    if num_pixel == 0:
+        return out
+
+    cumsum = np.cumsum(-np.sort(-counts, axis=1), axis=1)
+    total = cumsum[:, -1]
+    has = total > 0
+    cumsum = cumsum[has]
+    total = total[has]
+
+    fractions = cumsum / total[:, None]
+    num = np.sum(fractions < percentile / 100, axis=1) + 1
+    num = np.minimum(num, np.count_nonzero(counts[has], axis=1))
+    num_photons = cumsum[np.arange(len(num)), num - 1] / oversampling
+    out[has] = num / num_photons
+    return out
+
+
 def estimate_depth_from_participating_beams(
     prng,
     image_beams,
@@ -395,12 +665,33 @@ def estimate_depth_from_participating_beams(
     min_object_distance_m,
     image_containment_percentile,
     oversampling_beam_spread,
+    reuse_samples=True,
+    depth_search="grid",
+    depth_search_relative_tolerance=1e-3,
+    depth_search_max_num_evaluations=64,
 ):
+    """
+    Estimates the depth of a point source by refocusing its participating
+    beams to many depths. The depth where the image is the most dense is
+    the reconstructed depth.
+
+    Parameters
+    ----------
+    depth_search : str
+        Either 'grid' or 'golden'. After a rough scan on a grid of depths,
+        'grid' refines the grid around the minimum in a fixed number of
+        iterations. 'golden' brackets the minimum of the rough scan and
+        runs a golden-section search in log(depth) until the bracket is
+        narrower than depth_search_relative_tolerance, or until
+        depth_search_max_num_evaluations images were evaluated.
+    """
     assert oversampling_beam_spread > 0
     assert 0 < image_containment_percentile <= 100
     assert max_object_distance_m > 0
     assert min_object_distance_m > 0
     assert min_object_distance_m < max_object_distance_m
+    assert depth_search_relative_tolerance > 0
+    assert depth_search_max_num_evaluations > 0
 
     r = {}
     r["num_photons"] = get_num_photons_in_participating_beams(
@@ -408,6 +699,7 @@ def estimate_depth_from_participating_beams(
     )
     r["focus"] = False
     r["num_iterations"] = 0
+    r["num_evaluations"] = 0
     r["depth_m"] = []
     r["spreads_pixel_per_photon"] = []
 
@@ -429,55 +721,132 @@ def estimate_depth_from_participating_beams(
         )
     )
 
-    for i in range(len(r["depth_m"])):
-        img = make_image(
-            image_beams=image_beams,
-            light_field_geometry=light_field_geometry,
-            participating_beams=participating_beams,
-            object_distance=r["depth_m"][i],
+    refocus_stack = RefocusStack(
+        image_beams=image_beams,
+        light_field_geometry=light_field_geometry,
+        participating_beams=participating_beams,
+        oversampling=oversampling_beam_spread,
+        prng=prng,
+        reuse_samples=reuse_samples,
+    )
+
+    def evaluate(depths_m):
+        spreads = refocus_stack.spreads(
+            object_distances=depths_m,
             image_binning=image_binning,
-            oversampling=oversampling_beam_spread,
-            prng=prng,
-        )
-        spread = estimate_inverse_photon_density_pixel_per_photon(
-            image=img, percentile=image_containment_percentile
+            percentile=image_containment_percentile,
         )
-        r["spreads_pixel_per_photon"].append(spread)
-    reco_depth_m = r["depth_m"][np.argmin(r["spreads_pixel_per_photon"])]
+        r["num_evaluations"] += len(depths_m)
+        return spreads
+
+    r["spreads_pixel_per_photon"] = list(evaluate(depths_m=r["depth_m"]))
 
     # fine iteration
     # --------------
-    for it in range(12):
-        next_depths_m = estimate_next_focus_depth_m(
-            depths_m=r["depth_m"],
-            spreads_pixel_per_photon=r["spreads_pixel_per_photon"],
-            next_depths_radius_num_points=3,
-        )
-        for n in range(len(next_depths_m)):
-            n_depth_m = next_depths_m[n]
-            n_img = make_image(
-                image_beams=image_beams,
-                light_field_geometry=light_field_geometry,
-                participating_beams=participating_beams,
-                object_distance=n_depth_m,
-                image_binning=image_binning,
-                oversampling=oversampling_beam_spread,
-                prng=prng,
-            )
-            n_spread = estimate_inverse_photon_density_pixel_per_photon(
-                image=n_img, percentile=image_containment_percentile
+    if depth_search == "grid":
+        for it in range(12):
+            next_depths_m = estimate_next_focus_depth_m(
+                depths_m=r["depth_m"],
+                spreads_pixel_per_photon=r["spreads_pixel_per_photon"],
+                next_depths_radius_num_points=3,
             )
-            r["depth_m"].append(n_depth_m)
-            r["spreads_pixel_per_photon"].append(n_spread)
+            next_spreads = evaluate(depths_m=next_depths_m)
+            r["depth_m"] += list(next_depths_m)
+            r["spreads_pixel_per_photon"] += list(next_spreads)
+            r["num_iterations"] += 1
+
+    elif depth_search == "golden":
+        i_min = np.argmin(r["spreads_pixel_per_photon"])
+        i_start = max(i_min - 1, 0)
+        i_stop = min(i_min + 1, num_initial_estimates - 1)
+        _depths_m, _spreads = golden_section_search_log(
+            evaluate=lambda depth_m: evaluate(depths_m=[depth_m])[0],
+            start=r["depth_m"][i_start],
+            stop=r["depth_m"][i_stop],
+            relative_tolerance=depth_search_relative_tolerance,
+            max_num_evaluations=(
+                depth_search_max_num_evaluations - r["num_evaluations"]
+            ),
+        )
+        r["depth_m"] += _depths_m
+        r["spreads_pixel_per_photon"] += _spreads
+        r["num_iterations"] = len(_depths_m)
 
-        reco_depth_m = r["depth_m"][np.argmin(r["spreads_pixel_per_photon"])]
-        r["num_iterations"] += 1
+    else:
+        raise ValueError("Expected depth_search to be in ['grid', 'golden'].")
 
     r["focus"] = True
 
     return r
 
 
+def golden_section_search_log(
+    evaluate, start, stop, relative_tolerance, max_num_evaluations
+):
+    """
+    Golden-section search for the minimum of evaluate(x) in the interval
+    [start, stop] in log(x).
+
+    Parameters
+    ----------
+    evaluate : function(float) -> float
+        The function to be minimized.
+    start : float
+        Lower limit of the bracket, > 0.
+    stop : float
+        Upper limit of the bracket, > start.
+    relative_tolerance : float
+        Stop when stop / start < 1 + relative_tolerance.
+    max_num_evaluations : int
+        Stop when evaluate was called this many times.
+
+    Returns
+    -------
+    (xs, fs) : tuple(list of floats, list of floats)
+        All positions x where evaluate was called and its results.
+    """
+    assert 0 < start <= stop
+    assert relative_tolerance > 0
+    INV_GOLDEN_RATIO = (np.sqrt(5) - 1) / 2
+
+    xs = []
+    fs = []
+
+    def f(log_x):
+        x = np.exp(log_x)
+        xs.append(x)
+        fs.append(evaluate(x))
+        return fs[-1]
+
+    a = np.log(start)
+    b = np.log(stop)
+    log_tolerance = np.log1p(relative_tolerance)
+
+    if max_num_evaluations < 2 or (b - a) < log_tolerance:
+        return xs, fs
+
+    c = b - INV_GOLDEN_RATIO * (b - a)
+    d = a + INV_GOLDEN_RATIO * (b - a)
+    fc = f(c)
+    fd = f(d)
+
+    while (b - a) >= log_tolerance and len(xs) < max_num_evaluations:
+        if fc <= fd or np.isnan(fd):
+            b = d
+            d = c
+            fd = fc
+            c = b - INV_GOLDEN_RATIO * (b - a)
+            fc = f(c)
+        else:
+            a = c
+            c = d
+            fc = fd
+            d = a + INV_GOLDEN_RATIO * (b - a)
+            fd = f(d)
+
+    return xs, fs
+
+
 def estimate_next_focus_depth_m(
     depths_m,
     spreads_pixel_per_photon,
@@ -588,8 +957,12 @@ def estimate_focus(
     min_object_distance_m,
     image_containment_percentile,
     oversampling_beam_spread,
+    reuse_samples=True,
+    depth_search="grid",
+    depth_search_relative_tolerance=1e-3,
+    depth_search_max_num_evaluations=64,
 ):
-    image_beams = plenopy.image.ImageRays(
+    image_beams = cache.get_image_rays(
         light_field_geometry=light_field_geometry
     )
     report = estimate_depth_from_participating_beams(
@@ -602,5 +975,9 @@ def estimate_focus(
         min_object_distance_m=min_object_distance_m,
         image_containment_percentile=image_containment_percentile,
         oversampling_beam_spread=oversampling_beam_spread,
+        reuse_samples=reuse_samples,
+        depth_search=depth_search,
+        depth_search_relative_tolerance=depth_search_relative_tolerance,
+        depth_search_max_num_evaluations=depth_search_max_num_evaluations,
     )
     return report
@@ -10,7 +10,6 @@ from .. import utils
 from .. import analysis
 from .. import production
 
-
 EXAMPLE_STAR_CONFIG = {
     "type": "star",
     "cx_deg": 0.0,
@@ -24,10 +23,20 @@ def make_response_to_star(
     star_config,
     light_field_geometry_path,
     merlict_config,
+    instrument_geometry=None,
+    merlict_propagation_config_path=None,
 ):
-    instgeom = utils.get_instrument_geometry_from_light_field_geometry(
-        light_field_geometry_path=light_field_geometry_path
-    )
+    """
+    The instrument_geometry and the merlict_propagation_config_path can be
+    given when they are already at hand, e.g. for many stars in a row.
+    Otherwise they are read from the light-field-geometry and written from
+    merlict_config.
+    """
+    instgeom = instrument_geometry
+    if instgeom is None:
+        instgeom = utils.get_instrument_geometry_from_light_field_geometry(
+            light_field_geometry_path=light_field_geometry_path
+        )
     illum_radius = (
         1.5 * instgeom["expected_imaging_system_max_aperture_radius"]
     )
@@ -42,37 +51,53 @@ def make_response_to_star(
         prefix="plenoscope-aberration-demo_"
     ) as tmp_dir:
         star_light_path = os.path.join(tmp_dir, "star_light.tar")
+        run_path = os.path.join(tmp_dir, "run")
 
-        write_photon_bunches(
-            cx=np.deg2rad(star_config["cx_deg"]),
-            cy=np.deg2rad(star_config["cy_deg"]),
-            size=num_photons,
-            path=star_light_path,
-            prng=prng,
-            aperture_radius=illum_radius,
-            BUFFER_SIZE=10000,
+        merlict_plenoscope_propagator_config_path = (
+            merlict_propagation_config_path
         )
+        if merlict_plenoscope_propagator_config_path is None:
+            merlict_plenoscope_propagator_config_path = os.path.join(
+                tmp_dir, "merlict_propagation_config.json"
+            )
+            json_utils.write(
+                merlict_plenoscope_propagator_config_path,
+                merlict_config["merlict_propagation_config"],
+            )
 
-        run_path = os.path.join(tmp_dir, "run")
+        def _write_star_light(path):
+            _write_photon_bunches(
+                cx=np.deg2rad(star_config["cx_deg"]),
+                cy=np.deg2rad(star_config["cy_deg"]),
+                size=num_photons,
+                path=path,
+                prng=prng,
+                aperture_radius=illum_radius,
+                BUFFER_SIZE=10000,
+            )
 
-        merlict_plenoscope_propagator_config_path = os.path.join(
-            tmp_dir, "merlict_propagation_config.json"
-        )
-        json_utils.write(
-            merlict_plenoscope_propagator_config_path,
-            merlict_config["merlict_propagation_config"],
-        )
+        def _propagate_star_light():
+            merlict_development_kit_python.plenoscope_propagator.plenoscope_propagator(
+                corsika_run_path=star_light_path,
+                output_path=run_path,
+                light_field_geometry_path=light_field_geometry_path,
+                merlict_plenoscope_propagator_config_path=merlict_plenoscope_propagator_config_path,
+                random_seed=star_config["seed"],
+                photon_origins=True,
+                stdout_path=run_path + ".o",
+                stderr_path=run_path + ".e",
+            )
 
-        merlict_development_kit_python.plenoscope_propagator.plenoscope_propagator(
-            corsika_run_path=star_light_path,
-            output_path=run_path,
-            light_field_geometry_path=light_field_geometry_path,
-            merlict_plenoscope_propagator_config_path=merlict_plenoscope_propagator_config_path,
-            random_seed=star_config["seed"],
-            photon_origins=True,
-            stdout_path=run_path + ".o",
-            stderr_path=run_path + ".e",
-        )
+        if merlict_config.get("streaming", {}).get("use_named_pipe", False):
+            utils.named_pipe_write_while_reading(
+                path=star_light_path,
+                write=_write_star_light,
+                read=_propagate_star_light,
+            )
+        else:
+            _write_star_light(path=star_light_path + ".tmp")
+            os.rename(star_light_path + ".tmp", star_light_path)
+            _propagate_star_light()
 
         run = plenopy.Run(path=run_path)
         event = run[0]
@@ -93,13 +118,29 @@ def write_photon_bunches(
     size : int
         Number of bunches
     """
+    tmp_path = path + ".tmp"
+    _write_photon_bunches(
+        cx=cx,
+        cy=cy,
+        size=size,
+        path=tmp_path,
+        prng=prng,
+        aperture_radius=aperture_radius,
+        BUFFER_SIZE=BUFFER_SIZE,
+    )
+    os.rename(tmp_path, path)
+
+
+def _write_photon_bunches(
+    cx, cy, size, path, prng, aperture_radius, BUFFER_SIZE=10000
+):
+    """
+    Writes the bunches straight into path, which can be a named pipe.
+    """
     I = corsika_primary.I
 
     assert size >= 0
-    tmp_path = path + ".tmp"
-    with corsika_primary.cherenkov.CherenkovEventTapeWriter(
-        path=tmp_path
-    ) as run:
+    with corsika_primary.cherenkov.CherenkovEventTapeWriter(path=path) as run:
         runh = np.zeros(273, dtype=np.float32)
         runh[I.RUNH.MARKER] = I.RUNH.MARKER_FLOAT32
         runh[I.RUNH.RUN_NUMBER] = 1
@@ -133,7 +174,6 @@ def write_photon_bunches(
                 speed_of_light=299792458,
             )
             run.write_payload(bunches)
-    os.rename(tmp_path, path)
 
 
 def make_source_config_from_job(job):
@@ -186,7 +226,12 @@ def analyse(
     source_config,
     raw_sensor_response,
     random_seed,
+    compact_response=None,
 ):
+    """
+    Either the raw_sensor_response or the compact_response (see
+    analysis.compact_response) must be given.
+    """
     prng = np.random.Generator(np.random.PCG64(random_seed))
 
     cfg_analysis = json_utils.read(
@@ -202,6 +247,7 @@ def analyse(
         containment_percentile=cfg_analysis["containment_percentile"],
         binning=cfg_analysis["binning"],
         prng=prng,
+        compact_response=compact_response,
     )
 
     return result
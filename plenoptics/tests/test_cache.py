@@ -0,0 +1,116 @@
+import plenoptics
+import numpy as np
+import tempfile
+import os
+
+
+class Geometry:
+    def __init__(self):
+        self.number_lixel = 3
+        self.cx_mean = np.array([0.1, 0.2, 0.3])
+        self.efficiency = np.array([1.0, 0.5, 0.0], dtype=np.float32)
+
+
+def test_shared_arrays_are_read_only_views():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        out_dir = os.path.join(tmp, "geometry.shared")
+        geom = Geometry()
+        plenoptics.cache._write_shared(obj=geom, out_dir=out_dir, mtime=42)
+
+        assert plenoptics.cache._read_shared_mtime(out_dir=out_dir) == 42
+        assert plenoptics.cache._read_shared_mtime(out_dir=tmp) is None
+
+        back = plenoptics.cache._read_shared(cls=Geometry, out_dir=out_dir)
+        assert isinstance(back, Geometry)
+        assert back.number_lixel == 3
+        np.testing.assert_array_equal(back.cx_mean, geom.cx_mean)
+        assert back.efficiency.dtype == np.float32
+        assert isinstance(back.cx_mean, np.memmap)
+        assert not back.cx_mean.flags.writeable
+        assert plenoptics.cache._num_bytes(back) == 0
+        del back
+
+
+class LightFieldGeometry:
+    NUM_READS = 0
+
+    def __init__(self, path):
+        LightFieldGeometry.NUM_READS += 1
+        with open(os.path.join(path, "size"), "rt") as f:
+            self.cx_mean = np.zeros(int(f.read()), dtype=np.uint8)
+
+
+def _write_geometry(path, size):
+    os.makedirs(os.path.join(path, "sub"), exist_ok=True)
+    with open(os.path.join(path, "size"), "wt") as f:
+        f.write(str(size))
+    with open(os.path.join(path, "sub", "table.bin"), "wb") as f:
+        f.write(b"old")
+
+
+def _touch(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_cache_reloads_when_modified(monkeypatch):
+    monkeypatch.setattr(
+        plenoptics.cache.plenopy, "LightFieldGeometry", LightFieldGeometry
+    )
+    LightFieldGeometry.NUM_READS = 0
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        path = os.path.join(tmp, "A")
+        _write_geometry(path=path, size=10)
+        cache = plenoptics.cache.LightFieldGeometryCache()
+
+        first = cache.get_light_field_geometry(path=path)
+        assert cache.get_light_field_geometry(path=path) is first
+        assert LightFieldGeometry.NUM_READS == 1
+
+        # a file in a sub-directory is rewritten in place
+        sub_path = os.path.join(path, "sub", "table.bin")
+        with open(sub_path, "wb") as f:
+            f.write(b"new")
+        _touch(
+            sub_path,
+            mtime_ns=plenoptics.cache._modification_time_ns(path) + 10**9,
+        )
+        second = cache.get_light_field_geometry(path=path)
+        assert second is not first
+        assert LightFieldGeometry.NUM_READS == 2
+        assert len(cache.entries) == 1
+
+
+def test_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(
+        plenoptics.cache.plenopy, "LightFieldGeometry", LightFieldGeometry
+    )
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        paths = {}
+        for key in ["A", "B", "C"]:
+            paths[key] = os.path.join(tmp, key)
+            _write_geometry(path=paths[key], size=400)
+
+        cache = plenoptics.cache.LightFieldGeometryCache(
+            max_num_bytes=1000, max_num_entries=4
+        )
+        cache.get_light_field_geometry(path=paths["A"])
+        cache.get_light_field_geometry(path=paths["B"])
+        cache.get_light_field_geometry(path=paths["A"])
+        assert cache.num_bytes() == 800
+
+        # exceeds the byte cap, B was used least recently
+        cache.get_light_field_geometry(path=paths["C"])
+        assert cache.num_bytes() == 800
+        assert sorted(cache.entries.keys()) == [paths["A"], paths["C"]]
+
+        cache = plenoptics.cache.LightFieldGeometryCache(
+            max_num_bytes=10**6, max_num_entries=2
+        )
+        for key in ["A", "B", "C"]:
+            cache.get_light_field_geometry(path=paths[key])
+        assert list(cache.entries.keys()) == [paths["B"], paths["C"]]
+
+        # an entry larger than the cap is still kept on its own
+        cache = plenoptics.cache.LightFieldGeometryCache(max_num_bytes=100)
+        cache.get_light_field_geometry(path=paths["A"])
+        assert list(cache.entries.keys()) == [paths["A"]]
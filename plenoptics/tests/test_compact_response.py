@@ -0,0 +1,44 @@
+import plenoptics
+import numpy as np
+import io
+
+
+def test_compact_response_write_read():
+    cr = {
+        "number_photons": 7,
+        "time_slice_duration": 0.5e-9,
+        "number_time_slices": 4,
+        "number_lixel": 10,
+        "lixel_ids": np.array([1, 4, 9], dtype=np.uint32),
+        "lixel_num_photons": np.array([2, 4, 1], dtype=np.uint32),
+        "isochor_time_weights": np.array([0.0, 3.0, 4.0, 0.0]),
+        "isochor_lixel_ids": np.array([1, 4, 9], dtype=np.uint32),
+        "isochor_lixel_weights": np.array([2.0, 4.0, 1.0]),
+    }
+    f = io.BytesIO()
+    plenoptics.analysis.compact_response.write(f=f, compact_response=cr)
+    f.seek(0)
+    back = plenoptics.analysis.compact_response.read(f=f)
+
+    assert set(back.keys()) == set(cr.keys())
+    assert back["number_photons"] == 7
+    assert isinstance(back["number_photons"], int)
+    assert back["time_slice_duration"] == 0.5e-9
+    np.testing.assert_array_equal(back["lixel_ids"], cr["lixel_ids"])
+
+    weights = plenoptics.analysis.compact_response.isochor_lixel_weights(
+        compact_response=back, number_lixel=back["number_lixel"]
+    )
+    assert len(weights) == 10
+    assert np.sum(weights) == 7.0
+    assert weights[4] == 4.0
+
+    pb = plenoptics.analysis.compact_response.participating_beams(
+        compact_response=back
+    )
+    assert (
+        plenoptics.sources.point.get_num_photons_in_participating_beams(
+            participating_beams=pb
+        )
+        == 7
+    )
@@ -0,0 +1,38 @@
+import plenoptics
+import numpy as np
+import zipfile
+import io
+import tempfile
+
+
+def test_compress_decompress_all_codecs():
+    prng = np.random.Generator(np.random.PCG64(1))
+    payload = prng.integers(low=0, high=16, size=10000).astype(np.uint8)
+    payload = payload.tobytes()
+
+    for codec in plenoptics.compression.list_benchmark_codecs():
+        compressed = plenoptics.compression.compress(data=payload, codec=codec)
+        assert plenoptics.compression.detect(compressed[0:8]) == (
+            codec["codec"]
+        )
+        assert plenoptics.compression.decompress(compressed) == payload
+
+
+def test_zip_writer_reader_detect_codec():
+    for codec in plenoptics.compression.list_benchmark_codecs():
+        f = io.BytesIO()
+        with zipfile.ZipFile(file=f, mode="w") as z:
+            with plenoptics.utils.ZipWriter(
+                zipfile=z, name="a.json.gz", mode="wt|gz", codec=codec
+            ) as fz:
+                fz.write('{"a": 1}')
+        f.seek(0)
+        out = plenoptics.utils.zipfile_json_read_to_dict(file=f)
+        assert out[""]["a"] == 1
+
+
+def test_config_falls_back_to_gzip():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as work_dir:
+        config = plenoptics.compression.read_config(work_dir=work_dir)
+        for kind in plenoptics.compression.KINDS:
+            assert config[kind] == {"codec": "gzip", "level": 9}
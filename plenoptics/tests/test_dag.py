@@ -0,0 +1,98 @@
+import plenoptics
+import concurrent.futures
+import pytest
+
+
+LOG = []
+
+
+def _append_to_log(job):
+    LOG.append(job)
+
+
+def _raise(job):
+    raise ValueError("job {:s} fails".format(str(job)))
+
+
+def _task(key, depends_on, jobs, run_job=_append_to_log):
+    return {
+        "key": key,
+        "depends_on": depends_on,
+        "make_jobs": lambda: list(jobs),
+        "run_job": run_job,
+    }
+
+
+def _logger():
+    return plenoptics.utils.LoggerStdout_if_None(logger=None)
+
+
+def _pools():
+    return [
+        plenoptics.utils.SerialPool(),
+        concurrent.futures.ThreadPoolExecutor(max_workers=4),
+    ]
+
+
+def test_order_of_dependencies():
+    for pool in _pools():
+        LOG.clear()
+        tasks = [
+            _task("c", ["a", "b"], ["c0"]),
+            _task("a", [], ["a0", "a1", "a2"]),
+            _task("b", ["a"], ["b0", "b1"]),
+            _task("empty", ["a"], []),
+            _task("d", ["empty"], ["d0"]),
+        ]
+        plenoptics.production.dag.run(tasks=tasks, pool=pool, logger=_logger())
+
+        assert sorted(LOG) == ["a0", "a1", "a2", "b0", "b1", "c0", "d0"]
+        for a in ["a0", "a1", "a2"]:
+            for b in ["b0", "b1", "c0", "d0"]:
+                assert LOG.index(a) < LOG.index(b)
+        for b in ["b0", "b1"]:
+            assert LOG.index(b) < LOG.index("c0")
+
+
+def test_failed_task_skips_its_dependents_only():
+    for pool in _pools():
+        LOG.clear()
+        tasks = [
+            _task("a", [], ["a0"], run_job=_raise),
+            _task("b", ["a"], ["b0"]),
+            _task("c", ["b"], ["c0"]),
+            _task("x", [], ["x0"]),
+            _task("y", ["x"], ["y0"]),
+        ]
+        with pytest.raises(RuntimeError) as err:
+            plenoptics.production.dag.run(
+                tasks=tasks, pool=pool, logger=_logger()
+            )
+        assert "'a'" in str(err.value)
+        assert "'c'" in str(err.value)
+        assert "'x'" not in str(err.value)
+        assert sorted(LOG) == ["x0", "y0"]
+
+
+def test_cycle_is_rejected():
+    tasks = [
+        _task("a", ["c"], ["a0"]),
+        _task("b", ["a"], ["b0"]),
+        _task("c", ["b"], ["c0"]),
+    ]
+    with pytest.raises(AssertionError):
+        plenoptics.production.dag.run(
+            tasks=tasks,
+            pool=plenoptics.utils.SerialPool(),
+            logger=_logger(),
+        )
+
+
+def test_unknown_dependency_is_rejected():
+    tasks = [_task("a", ["nope"], ["a0"])]
+    with pytest.raises(AssertionError):
+        plenoptics.production.dag.run(
+            tasks=tasks,
+            pool=plenoptics.utils.SerialPool(),
+            logger=_logger(),
+        )
@@ -0,0 +1,120 @@
+import plenoptics
+import numpy as np
+
+
+def histogram2d_std_reference(
+    x, y, x_std, y_std, weights, bins, prng, num_sub_samples
+):
+    bin_edges_x, bin_edges_y = bins
+    num_bins_x = len(bin_edges_x) - 1
+    num_bins_y = len(bin_edges_y) - 1
+    counts = np.zeros(shape=(num_bins_x, num_bins_y))
+    for i in range(len(x)):
+        if weights[i] == 0:
+            continue
+        for s in range(num_sub_samples):
+            rx = prng.normal(loc=x[i], scale=x_std[i])
+            ry = prng.normal(loc=y[i], scale=y_std[i])
+            ibx = np.digitize(x=rx, bins=bin_edges_x) - 1
+            iby = np.digitize(x=ry, bins=bin_edges_y) - 1
+            if 0 <= ibx < num_bins_x and 0 <= iby < num_bins_y:
+                counts[ibx, iby] += weights[i] / num_sub_samples
+    return counts
+
+
+def make_beams(prng, num):
+    x = prng.uniform(low=-1.0, high=1.0, size=num)
+    y = prng.uniform(low=-1.0, high=1.0, size=num)
+    x_std = prng.uniform(low=0.01, high=0.2, size=num)
+    y_std = prng.uniform(low=0.01, high=0.2, size=num)
+    weights = prng.integers(low=0, high=4, size=num).astype(float)
+    return x, y, x_std, y_std, weights
+
+
+def test_histogram2d_std_matches_reference():
+    prng = np.random.Generator(np.random.PCG64(1))
+    x, y, x_std, y_std, weights = make_beams(prng=prng, num=200)
+    bins = (np.linspace(-1.2, 1.2, 9), np.linspace(-1.0, 1.0, 7))
+    num_sub_samples = 500
+
+    ref = histogram2d_std_reference(
+        x=x,
+        y=y,
+        x_std=x_std,
+        y_std=y_std,
+        weights=weights,
+        bins=bins,
+        prng=np.random.Generator(np.random.PCG64(2)),
+        num_sub_samples=num_sub_samples,
+    )
+
+    for chunk_size in [1, 777, 2**20]:
+        img, _ = plenoptics.analysis.image.histogram2d_std(
+            x=x,
+            y=y,
+            x_std=x_std,
+            y_std=y_std,
+            weights=weights,
+            bins=bins,
+            prng=np.random.Generator(np.random.PCG64(3)),
+            num_sub_samples=num_sub_samples,
+            chunk_size=chunk_size,
+        )
+        assert img.shape == ref.shape
+        assert abs(np.sum(img) - np.sum(ref)) < 0.02 * np.sum(ref)
+        assert np.max(np.abs(img - ref)) < 0.05 * np.max(ref)
+
+
+def test_histogram2d_std_zero_weights():
+    prng = np.random.Generator(np.random.PCG64(1))
+    x, y, x_std, y_std, _ = make_beams(prng=prng, num=10)
+    bins = (np.linspace(-1, 1, 5), np.linspace(-1, 1, 5))
+    img, _ = plenoptics.analysis.image.histogram2d_std(
+        x=x,
+        y=y,
+        x_std=x_std,
+        y_std=y_std,
+        weights=np.zeros(10),
+        bins=bins,
+        prng=prng,
+    )
+    assert img.shape == (4, 4)
+    assert np.all(img == 0.0)
+
+
+def test_histogram2d_roi_matches_histogram2d():
+    prng = np.random.Generator(np.random.PCG64(5))
+    bins = (np.linspace(-1, 1, 101), np.linspace(-2, 2, 51))
+    x = prng.normal(loc=0.3, scale=0.05, size=1000)
+    y = prng.normal(loc=-0.5, scale=0.1, size=1000)
+    x[0] = 1.0
+    y[0] = 2.0
+    x[1] = 5.0
+
+    full = np.histogram2d(x, y, bins=bins)[0]
+    roi, (ox, oy) = plenoptics.analysis.image.histogram2d_roi(
+        x=x, y=y, bins=bins
+    )
+    assert np.sum(roi) == np.sum(full)
+    np.testing.assert_array_equal(
+        roi, full[ox : ox + roi.shape[0], oy : oy + roi.shape[1]]
+    )
+
+
+def test_histogram2d_stack_matches_histogram2d():
+    prng = np.random.Generator(np.random.PCG64(6))
+    bins = (np.linspace(-1, 1, 101), np.linspace(-2, 2, 51))
+    x = prng.normal(loc=0.3, scale=0.05, size=(4, 1000))
+    y = prng.normal(loc=-0.5, scale=0.1, size=(4, 1000))
+    x[0, 0] = 1.0
+    y[0, 0] = 2.0
+    x[1, 1] = 5.0
+
+    stack = plenoptics.analysis.image.histogram2d_stack(x=x, y=y, bins=bins)
+    roi = plenoptics.analysis.image.histogram2d_stack(
+        x=x, y=y, bins=bins, roi=True
+    )
+    for i in range(x.shape[0]):
+        full = np.histogram2d(x[i], y[i], bins=bins)[0]
+        np.testing.assert_array_equal(stack[i], full)
+        assert np.sum(roi[i]) == np.sum(full)
@@ -0,0 +1,47 @@
+import plenoptics
+import numpy as np
+import tempfile
+import os
+
+
+def test_image_stack_append_and_read():
+    bins = [np.linspace(-1, 1, 5), np.linspace(-2, 2, 4)]
+    prng = np.random.Generator(np.random.PCG64(1))
+    images = prng.uniform(size=(3, 4, 3)).astype(np.float32)
+    object_distances = [1e3, 2e3, 4e3]
+
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        path = os.path.join(tmp, "images.stack")
+        plenoptics.analysis.image_stack.init(path=path, bins=bins)
+
+        stack = plenoptics.analysis.image_stack.read(path=path)
+        assert stack["images"].shape == (0, 4, 3)
+        np.testing.assert_array_equal(stack["bins"][0], bins[0])
+        np.testing.assert_array_equal(stack["bins"][1], bins[1])
+
+        for i in range(3):
+            plenoptics.analysis.image_stack.append(
+                path=path,
+                image=images[i],
+                object_distance=object_distances[i],
+            )
+
+        # an interrupted append leaves a partial record
+        with open(path, "ab") as f:
+            f.write(b"\x00" * 7)
+
+        stack = plenoptics.analysis.image_stack.read(path=path)
+        assert stack["images"].shape == (3, 4, 3)
+        np.testing.assert_array_equal(stack["images"], images)
+        np.testing.assert_array_equal(
+            stack["object_distance"], object_distances
+        )
+        del stack
+
+        plenoptics.analysis.image_stack.append(
+            path=path, image=images[0], object_distance=8e3
+        )
+        stack = plenoptics.analysis.image_stack.read(path=path)
+        assert stack["images"].shape == (4, 4, 3)
+        np.testing.assert_array_equal(stack["images"][3], images[0])
+        del stack
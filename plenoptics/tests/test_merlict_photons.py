@@ -0,0 +1,64 @@
+import plenoptics
+import numpy as np
+import tempfile
+import os
+
+
+def format_photons_reference(ids, supports, directions, wavelengths):
+    out = ""
+    for i in range(len(ids)):
+        out += plenoptics.merlict.PHOTON_LINE_FORMAT.format(
+            ids[i],
+            supports[i, 0],
+            supports[i, 1],
+            supports[i, 2],
+            directions[i, 0],
+            directions[i, 1],
+            directions[i, 2],
+            wavelengths[i],
+        )
+    return out.encode()
+
+
+def make_photons(prng, num):
+    ids = np.arange(num) * 997
+    supports = prng.normal(size=(num, 3)) * 10 ** prng.uniform(
+        low=-4, high=4, size=(num, 3)
+    )
+    directions = prng.normal(size=(num, 3))
+    wavelengths = prng.uniform(low=250e-9, high=700e-9, size=num)
+
+    # rounding ties, signed zeros, and values python has to format
+    supports[0] = [9.9995, -0.0, 0.0]
+    supports[1] = [1.0005, 0.00125, -99.995]
+    supports[2] = [np.nan, np.inf, 1e-300]
+    directions[3] = [5e-324, -1e200, 0.5]
+    return ids, supports, directions, wavelengths
+
+
+def test_photon_lines_are_identical_to_format():
+    prng = np.random.Generator(np.random.PCG64(1))
+    ids, supports, directions, wavelengths = make_photons(prng, num=5000)
+
+    ref = format_photons_reference(ids, supports, directions, wavelengths)
+    out = plenoptics.merlict.format_photons_to_space_seperated_values(
+        ids=ids,
+        supports=supports,
+        directions=directions,
+        wavelengths=wavelengths,
+    )
+    assert out == ref
+
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        path = os.path.join(tmp, "photons.ssv")
+        for chunk_size in [97, 333]:
+            plenoptics.merlict.append_photons_to_space_seperated_values(
+                path=path,
+                ids=ids,
+                supports=supports,
+                directions=directions,
+                wavelengths=wavelengths,
+                chunk_size=chunk_size,
+            )
+        with open(path, "rb") as f:
+            assert f.read() == ref + ref
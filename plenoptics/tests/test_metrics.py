@@ -0,0 +1,84 @@
+import plenoptics
+import tempfile
+import pytest
+import numpy as np
+
+
+def _simulate(job):
+    return {"num_photons": 10 * job["number"]}
+
+
+def _fail(job):
+    raise ValueError("fails")
+
+
+def test_record_and_summarize():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as work_dir:
+        for number in range(3):
+            job = {
+                "instrument_key": "A",
+                "observation_key": "star",
+                "number": number,
+            }
+            out = plenoptics.metrics.run_job_and_record(
+                job=job,
+                run_job=_simulate,
+                work_dir=work_dir,
+                stage="responses_map",
+            )
+            assert out["num_photons"] == 10 * number
+
+        job = {"script": "plot_depth", "argv": ["--instrument_key", "B"]}
+        with pytest.raises(ValueError):
+            plenoptics.metrics.run_job_and_record(
+                job=job,
+                run_job=_fail,
+                work_dir=work_dir,
+                stage="plot_depth",
+            )
+
+        records = plenoptics.metrics.read(work_dir=work_dir)
+        assert len(records) == 4
+        for record in records:
+            assert record["wall_s"] >= 0.0
+            assert record["cpu_s"] >= 0.0
+            if record["max_rss_bytes"] is None:
+                assert record["worker_max_rss_bytes_so_far"] > 0
+            else:
+                assert record["max_rss_bytes"] > 0
+
+        summary = plenoptics.metrics.summarize(records=records)
+        resp = summary["stage"]["responses_map"]
+        assert resp["num_jobs"] == 3
+        assert resp["num_failed"] == 0
+        assert resp["num_photons"] == 0 + 10 + 20
+        assert (
+            summary["stage_instrument"]["responses_map"]["A"]["num_jobs"] == 3
+        )
+
+        plot = summary["stage_instrument"]["plot_depth"]["B"]
+        assert plot["num_jobs"] == 1
+        assert plot["num_failed"] == 1
+
+
+def _allocate(job):
+    block = np.ones(job["num_bytes"], dtype=np.uint8)
+    return {"num_photons": int(block[0])}
+
+
+def test_max_rss_is_the_peak_of_the_job():
+    if not plenoptics.metrics._reset_peak_rss():
+        pytest.skip("The OS can not reset the peak resident memory.")
+
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as work_dir:
+        big = 256 * 1024**2
+        for num_bytes in [big, 1024]:
+            plenoptics.metrics.run_job_and_record(
+                job={"num_bytes": num_bytes},
+                run_job=_allocate,
+                work_dir=work_dir,
+                stage="test",
+            )
+        records = plenoptics.metrics.read(work_dir=work_dir)
+        assert records[0]["max_rss_bytes"] > big
+        assert records[1]["max_rss_bytes"] < big
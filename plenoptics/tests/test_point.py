@@ -0,0 +1,242 @@
+import plenoptics
+import numpy as np
+import pytest
+import types
+
+
+class ImageBeamsThinLens:
+    def __init__(self, cx, cy, x, y):
+        self.cx = cx
+        self.cy = cy
+        self.x = x
+        self.y = y
+
+    def cx_cy_in_object_distance(self, object_distance):
+        cx = np.arctan(np.tan(self.cx) - self.x / object_distance)
+        cy = np.arctan(np.tan(self.cy) - self.y / object_distance)
+        return cx, cy
+
+
+def make_beams(prng, num):
+    image_beams = ImageBeamsThinLens(
+        cx=prng.uniform(low=-0.01, high=0.01, size=num),
+        cy=prng.uniform(low=-0.01, high=0.01, size=num),
+        x=prng.uniform(low=-30, high=30, size=num),
+        y=prng.uniform(low=-30, high=30, size=num),
+    )
+    light_field_geometry = types.SimpleNamespace(
+        cx_std=np.ones(num) * 1e-4,
+        cy_std=np.ones(num) * 1e-4,
+    )
+    return image_beams, light_field_geometry
+
+
+def test_refocus_stack_projection():
+    prng = np.random.Generator(np.random.PCG64(0))
+    image_beams, light_field_geometry = make_beams(prng=prng, num=100)
+    participating_beams = {3: 2, 10: 1, 57: 4}
+
+    stack = plenoptics.sources.point.RefocusStack(
+        image_beams=image_beams,
+        light_field_geometry=light_field_geometry,
+        participating_beams=participating_beams,
+        oversampling=10,
+        prng=prng,
+    )
+    assert stack.closed_form
+
+    for object_distance in [1.5e3, 1e4, 5e4]:
+        cx, cy = stack.cx_cy_in_object_distance(object_distance)
+        cx_ref, cy_ref = image_beams.cx_cy_in_object_distance(object_distance)
+        np.testing.assert_allclose(cx, cx_ref[stack.beam_ids])
+        np.testing.assert_allclose(cy, cy_ref[stack.beam_ids])
+
+    cx_hits, cy_hits = stack.samples(object_distance=1e4)
+    assert len(cx_hits) == 10 * (2 + 1 + 4)
+    assert len(cy_hits) == 10 * (2 + 1 + 4)
+
+
+def test_refocus_stack_spreads_match_make_image():
+    prng = np.random.Generator(np.random.PCG64(1))
+    image_beams, light_field_geometry = make_beams(prng=prng, num=300)
+    participating_beams = {}
+    for beam_id in range(0, 300, 3):
+        participating_beams[beam_id] = 2
+
+    image_binning = plenoptics.sources.point.make_image_binning(
+        field_of_view_deg=6.5, num_pixel_on_edge=128
+    )
+    stack = plenoptics.sources.point.RefocusStack(
+        image_beams=image_beams,
+        light_field_geometry=light_field_geometry,
+        participating_beams=participating_beams,
+        oversampling=10,
+        prng=prng,
+    )
+    point = plenoptics.sources.point
+    estimate = point.estimate_inverse_photon_density_pixel_per_photon
+    depths = [2e3, 1e4, 5e4]
+    spreads = stack.spreads(
+        object_distances=depths, image_binning=image_binning, percentile=80
+    )
+    assert len(spreads) == len(depths)
+
+    for i in range(len(depths)):
+        img = plenoptics.sources.point.make_image(
+            image_beams=image_beams,
+            light_field_geometry=light_field_geometry,
+            participating_beams=participating_beams,
+            object_distance=depths[i],
+            image_binning=image_binning,
+            oversampling=10,
+            prng=prng,
+        )
+        spread = estimate(image=img, percentile=80)
+        assert abs(spread - spreads[i]) < 0.05 * spread
+
+
+def test_golden_section_search_log():
+    true_x = 12345.0
+
+    def f(x):
+        return np.abs(np.log(x) - np.log(true_x))
+
+    xs, fs = plenoptics.sources.point.golden_section_search_log(
+        evaluate=f,
+        start=1e3,
+        stop=1e5,
+        relative_tolerance=1e-4,
+        max_num_evaluations=100,
+    )
+    assert len(xs) == len(fs)
+    assert len(xs) < 100
+    x_best = xs[np.argmin(fs)]
+    assert abs(x_best - true_x) < 1e-3 * true_x
+
+    xs, fs = plenoptics.sources.point.golden_section_search_log(
+        evaluate=f,
+        start=1e3,
+        stop=1e5,
+        relative_tolerance=1e-4,
+        max_num_evaluations=5,
+    )
+    assert len(xs) == 5
+
+
+def test_participating_beams_from_lixel_ids():
+    pb = plenoptics.sources.point.make_participating_beams_from_lixel_ids(
+        beam_ids=[7, 3, 7, 7, 1, 3]
+    )
+    np.testing.assert_array_equal(pb["beam_ids"], [1, 3, 7])
+    np.testing.assert_array_equal(pb["num_photons"], [1, 2, 3])
+    assert (
+        plenoptics.sources.point.get_num_photons_in_participating_beams(
+            participating_beams=pb
+        )
+        == 6
+    )
+
+    pb_dict = plenoptics.sources.point.make_dict_from_participating_beams(
+        participating_beams=pb
+    )
+    assert pb_dict == {1: 1, 3: 2, 7: 3}
+    pb_back = plenoptics.sources.point.make_participating_beams_from_dict(
+        participating_beams_dict=pb_dict
+    )
+    np.testing.assert_array_equal(pb_back["beam_ids"], pb["beam_ids"])
+    np.testing.assert_array_equal(pb_back["num_photons"], pb["num_photons"])
+
+
+def estimate_inverse_photon_density_reference(image, percentile):
+    I = image.flatten()
+    S = np.sum(I)
+    a = np.flip(np.argsort(I))
+    num_photons = 0.0
+    fraction = 0.0
+    num_pixel = 0
+    while fraction < percentile / 100:
+        s = I[a[num_pixel]]
+        num_photons += s
+        fraction += s / S
+        num_pixel += 1
+    return num_pixel / num_photons
+
+
+def test_inverse_photon_density_matches_reference():
+    point = plenoptics.sources.point
+    estimate = point.estimate_inverse_photon_density_pixel_per_photon
+    prng = np.random.Generator(np.random.PCG64(3))
+    for i in range(20):
+        image = prng.poisson(lam=0.3, size=(64, 64)) / 10
+        for percentile in [1, 50, 80, 99]:
+            assert estimate(
+                image=image, percentile=percentile
+            ) == estimate_inverse_photon_density_reference(
+                image=image, percentile=percentile
+            )
+
+
+def test_refocus_stack_roi_matches_full_frame():
+    prng = np.random.Generator(np.random.PCG64(4))
+    image_beams, light_field_geometry = make_beams(prng=prng, num=300)
+    participating_beams = {}
+    for beam_id in range(0, 300, 7):
+        participating_beams[beam_id] = 3
+
+    image_binning = plenoptics.sources.point.make_image_binning(
+        field_of_view_deg=6.5, num_pixel_on_edge=512
+    )
+    stack = plenoptics.sources.point.RefocusStack(
+        image_beams=image_beams,
+        light_field_geometry=light_field_geometry,
+        participating_beams=participating_beams,
+        oversampling=10,
+        prng=prng,
+        reuse_samples=True,
+    )
+    depths = [2e3, 1e4, 5e4]
+    spreads = {}
+    for roi in [True, False]:
+        spreads[roi] = stack.spreads(
+            object_distances=depths,
+            image_binning=image_binning,
+            percentile=80,
+            roi=roi,
+        )
+    np.testing.assert_array_equal(spreads[True], spreads[False])
+
+
+def test_refocus_stack_spreads_match_image_of_each_depth():
+    prng = np.random.Generator(np.random.PCG64(5))
+    image_beams, light_field_geometry = make_beams(prng=prng, num=300)
+    participating_beams = {}
+    for beam_id in range(0, 300, 5):
+        participating_beams[beam_id] = 4
+
+    point = plenoptics.sources.point
+    estimate = point.estimate_inverse_photon_density_pixel_per_photon
+    image_binning = point.make_image_binning(
+        field_of_view_deg=6.5, num_pixel_on_edge=128
+    )
+    stack = point.RefocusStack(
+        image_beams=image_beams,
+        light_field_geometry=light_field_geometry,
+        participating_beams=participating_beams,
+        oversampling=10,
+        prng=prng,
+    )
+    depths = np.geomspace(1e3, 1e5, 11)
+    for max_num_samples_per_pass in [1, 2**22]:
+        spreads = stack.spreads(
+            object_distances=depths,
+            image_binning=image_binning,
+            percentile=80,
+            max_num_samples_per_pass=max_num_samples_per_pass,
+        )
+        for i in range(len(depths)):
+            img = stack.image(
+                object_distance=depths[i], image_binning=image_binning
+            )
+            assert spreads[i] == pytest.approx(
+                estimate(image=img, percentile=80), rel=1e-12
+            )
@@ -0,0 +1,139 @@
+import plenoptics
+import tempfile
+import os
+import pytest
+
+
+def _config(num_stars, chunk_size):
+    return {
+        "instruments": {
+            "A": {
+                "mirror": "m",
+                "sensor": "s",
+                "mirror_deformation": "d",
+                "sensor_transformation": "t",
+            }
+        },
+        "mirrors": {"m": {"focal_length": 1.0}},
+        "sensors": {"s": {"num_paxel_on_pixel_diagonal": 3}},
+        "mirror_deformations": {"d": {"amplitude": 0.0}},
+        "sensor_transformations": {"t": {"rot": 0.0}},
+        "statistics": {"light_field_geometry": {"num_blocks": 1}},
+        "merlict": {"merlict_propagation_config": {"night_sky": 0.0}},
+        "analysis": {"star": {"containment_percentile": 80}},
+        "observations": {
+            "instruments": {"A": {"star": {}, "phantom": {}}},
+            "star": {
+                "num_stars": num_stars,
+                "map_job_chunk_size": chunk_size,
+                "analyse_in_map_job": False,
+            },
+            "phantom": {"meshes": []},
+        },
+    }
+
+
+def test_map_jobs_cover_numbers_in_chunks():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        jobs = plenoptics.production.observations._make_mapping_jobs(
+            config=_config(num_stars=10, chunk_size=4),
+            work_dir=tmp,
+            task_key="responses",
+        )
+        star_jobs = [j for j in jobs if j["observation_key"] == "star"]
+        assert [j["numbers"] for j in star_jobs] == [
+            [0, 1, 2, 3],
+            [4, 5, 6, 7],
+            [8, 9],
+        ]
+        phantom_jobs = [j for j in jobs if j["observation_key"] == "phantom"]
+        assert [j["numbers"] for j in phantom_jobs] == [[0]]
+
+        number_jobs = plenoptics.production.observations._jobs_of_chunk(
+            job=star_jobs[2]
+        )
+        assert [j["number"] for j in number_jobs] == [8, 9]
+        assert number_jobs[0]["instrument_key"] == "A"
+
+
+def test_map_jobs_resume_with_the_numbers_still_missing():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        map_dir = os.path.join(tmp, "responses", "A", "star.map")
+        os.makedirs(map_dir)
+        for number in [0, 1, 2, 3, 5, 9]:
+            path = os.path.join(map_dir, "{:06d}.job.zip".format(number))
+            with open(path, "wb") as f:
+                pass
+
+        jobs = plenoptics.production.observations._make_mapping_jobs(
+            config=_config(num_stars=10, chunk_size=4),
+            work_dir=tmp,
+            task_key="responses",
+        )
+        star_jobs = [j for j in jobs if j["observation_key"] == "star"]
+        assert [j["numbers"] for j in star_jobs] == [[4, 6, 7], [8]]
+
+
+def test_outdated_responses_are_removed():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        config = _config(num_stars=2, chunk_size=4)
+        base_path = os.path.join(tmp, "responses", "A", "star")
+        os.makedirs(os.path.dirname(base_path))
+        with open(base_path + ".zip", "wb") as f:
+            pass
+        plenoptics.provenance.write(
+            path=base_path + ".zip",
+            digest=plenoptics.provenance.responses_digest(
+                config=config, instrument_key="A", observation_key="star"
+            ),
+        )
+
+        # up to date
+        jobs = plenoptics.production.observations._make_mapping_jobs(
+            config=config, work_dir=tmp, task_key="responses"
+        )
+        assert [j["observation_key"] for j in jobs] == ["phantom"]
+
+        # only changes how the jobs are chunked
+        config["observations"]["star"]["map_job_chunk_size"] = 1
+        jobs = plenoptics.production.observations._make_mapping_jobs(
+            config=config, work_dir=tmp, task_key="responses"
+        )
+        assert [j["observation_key"] for j in jobs] == ["phantom"]
+
+        # changes the responses
+        config["mirror_deformations"]["d"]["amplitude"] = 1.0
+        jobs = plenoptics.production.observations._make_mapping_jobs(
+            config=config, work_dir=tmp, task_key="responses"
+        )
+        star_jobs = [j for j in jobs if j["observation_key"] == "star"]
+        assert [j["numbers"] for j in star_jobs] == [[0], [1]]
+        assert not os.path.exists(base_path + ".zip")
+        assert plenoptics.provenance.read(
+            path=base_path + ".map"
+        ) == plenoptics.provenance.responses_digest(
+            config=config, instrument_key="A", observation_key="star"
+        )
+
+
+def test_existing_configs_do_not_analyse_in_map_job():
+    assert not plenoptics.production.observations._analyse_in_mapjob(
+        observation_config={"num_stars": 2}, observation_key="star"
+    )
+
+
+def test_map_job_chunk_size():
+    config = _config(num_stars=3, chunk_size=4)
+    del config["observations"]["star"]["map_job_chunk_size"]
+    assert (
+        plenoptics.production.observations._map_job_chunk_size(
+            config=config, observation_key="star"
+        )
+        == 1
+    )
+
+    config["observations"]["star"]["map_job_chunk_size"] = 0
+    with pytest.raises(AssertionError):
+        plenoptics.production.observations._map_job_chunk_size(
+            config=config, observation_key="star"
+        )
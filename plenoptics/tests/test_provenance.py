@@ -0,0 +1,31 @@
+import plenoptics
+import tempfile
+import os
+
+
+def test_digest_is_canonical():
+    a = plenoptics.provenance.digest({"a": 1, "b": [1, 2]}, "x")
+    b = plenoptics.provenance.digest({"b": [1, 2], "a": 1}, "x")
+    c = plenoptics.provenance.digest({"b": [1, 2], "a": 2}, "x")
+    assert a == b
+    assert a != c
+
+
+def test_outdated_artifact_is_removed():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        path = os.path.join(tmp, "plots")
+        os.makedirs(path)
+
+        # without sidecar it is taken as it is
+        assert not plenoptics.provenance.is_outdated(path=path, digest="a")
+
+        plenoptics.provenance.write(path=path, digest="a")
+        assert plenoptics.provenance.read(path=path) == "a"
+        assert not plenoptics.provenance.remove_if_outdated(
+            path=path, digest="a"
+        )
+        assert os.path.exists(path)
+
+        assert plenoptics.provenance.remove_if_outdated(path=path, digest="b")
+        assert not os.path.exists(path)
+        assert plenoptics.provenance.read(path=path) is None
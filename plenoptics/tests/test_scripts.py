@@ -0,0 +1,43 @@
+import plenoptics
+import os
+import ast
+import glob
+import pytest
+from importlib import resources as importlib_resources
+
+
+def _list_plot_scripts():
+    scripts_dir = os.path.join(
+        importlib_resources.files("plenoptics"), "scripts"
+    )
+    return sorted(glob.glob(os.path.join(scripts_dir, "plot_*.py")))
+
+
+def test_plot_scripts_can_run_in_process():
+    paths = _list_plot_scripts()
+    assert len(paths) > 0
+    for path in paths:
+        with open(path, "rt") as f:
+            tree = ast.parse(f.read())
+        functions = [
+            node.name
+            for node in tree.body
+            if isinstance(node, ast.FunctionDef)
+        ]
+        assert "make_argparser" in functions, path
+        assert "run" in functions, path
+
+        # nothing but imports, functions and the __main__ guard on the
+        # module's level, so importing does not run the script.
+        for node in tree.body:
+            assert isinstance(
+                node,
+                (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.If),
+            ), "{:s}:{:d}".format(path, node.lineno)
+
+
+def test_bad_argv_fails_the_job_not_the_worker():
+    with pytest.raises(RuntimeError):
+        plenoptics._run_script_in_process(
+            script="plot_depth", argv=["--no_such_argument"]
+        )
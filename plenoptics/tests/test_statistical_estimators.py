@@ -0,0 +1,58 @@
+import plenoptics
+import numpy as np
+
+
+def test_encirclement2d_sorted_vs_kdtree():
+    prng = np.random.Generator(np.random.PCG64(7))
+    num = 300
+    x = prng.normal(loc=0.1, scale=1.0, size=num)
+    y = prng.normal(loc=-0.2, scale=1.0, size=num)
+    x_std = 0.05 * np.ones(num)
+    y_std = 0.05 * np.ones(num)
+    weights = prng.integers(low=0, high=5, size=num)
+
+    results = {}
+    for method in ["kdtree", "sorted"]:
+        results[method] = (
+            plenoptics.analysis.statistical_estimators.encirclement2d(
+                x=x,
+                y=y,
+                x_std=x_std,
+                y_std=y_std,
+                weights=weights,
+                prng=np.random.Generator(np.random.PCG64(1)),
+                percentile=80,
+                num_sub_samples=10,
+                method=method,
+            )
+        )
+
+    kcx, kcy, kr = results["kdtree"]
+    scx, scy, sr = results["sorted"]
+    assert abs(kcx - scx) < 0.05
+    assert abs(kcy - scy) < 0.05
+    assert abs(kr - sr) < 0.03 * kr
+
+
+def test_encirclement2d_sorted_no_weights():
+    cx, cy, r = plenoptics.analysis.statistical_estimators.encirclement2d(
+        x=np.zeros(3),
+        y=np.zeros(3),
+        x_std=np.ones(3),
+        y_std=np.ones(3),
+        weights=np.zeros(3),
+        prng=np.random.Generator(np.random.PCG64(1)),
+        method="sorted",
+    )
+    assert np.isnan(cx)
+    assert np.isnan(cy)
+    assert np.isnan(r)
+
+
+def test_weighted_percentile():
+    a = np.array([3.0, 1.0, 2.0, 4.0])
+    w = np.array([1.0, 1.0, 1.0, 1.0])
+    wp = plenoptics.analysis.statistical_estimators.weighted_percentile
+    assert wp(a=a, weights=w, percentile=50) == 2.0
+    assert wp(a=a, weights=w, percentile=100) == 4.0
+    assert wp(a=a, weights=np.array([0.0, 0.0, 0.0, 1.0]), percentile=1) == 4.0
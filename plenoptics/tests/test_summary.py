@@ -0,0 +1,51 @@
+import plenoptics
+import numpy as np
+import tempfile
+import os
+
+
+def make_point_reports():
+    return {
+        "000001": {
+            "cx_deg": 0.5,
+            "cy_deg": -0.5,
+            "object_distance_m": 5e3,
+            "num_photons": 100,
+            "depth_m": [1e3, 4e3, 2e4],
+            "spreads_pixel_per_photon": [0.3, 0.1, 0.2],
+        },
+        "000000": {
+            "cx_deg": 0.0,
+            "cy_deg": 0.0,
+            "object_distance_m": 1e4,
+            "num_photons": 200,
+            "depth_m": [1e3, 1e4],
+            "spreads_pixel_per_photon": [0.2, 0.05],
+        },
+    }
+
+
+def test_point_summary_write_read():
+    reports = make_point_reports()
+    summary = plenoptics.analysis.summary.make(
+        observation_key="point", reports=reports
+    )
+
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        path = os.path.join(tmp, "point.summary.npz")
+        plenoptics.analysis.summary.write(path=path, summary=summary)
+        back = plenoptics.analysis.summary.read(path=path)
+
+    assert list(back["key"]) == ["000000", "000001"]
+    np.testing.assert_array_equal(back["reco_object_distance_m"], [1e4, 4e3])
+    np.testing.assert_array_equal(back["spread_pixel_per_photon"], [0.05, 0.1])
+    np.testing.assert_array_equal(back["num_photons"], [200, 100])
+
+    for i, key in enumerate(back["key"]):
+        depth_m, spreads = plenoptics.analysis.summary.point_curve(
+            summary=back, i=i
+        )
+        np.testing.assert_array_equal(depth_m, reports[key]["depth_m"])
+        np.testing.assert_array_equal(
+            spreads, reports[key]["spreads_pixel_per_photon"]
+        )
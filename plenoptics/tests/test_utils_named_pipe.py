@@ -0,0 +1,66 @@
+import plenoptics
+import tempfile
+import os
+import pytest
+import numpy as np
+
+
+def write_lines(path, num=100000):
+    with open(path, "wt") as f:
+        for i in range(num):
+            f.write("{:d}\n".format(i))
+
+
+def test_named_pipe_streams_from_writer_to_reader():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        path = os.path.join(tmp, "photons.ssv")
+
+        def read():
+            with open(path, "rt") as f:
+                return sum([int(line) for line in f])
+
+        out = plenoptics.utils.named_pipe_write_while_reading(
+            path=path, write=write_lines, read=read
+        )
+        assert out == sum(range(100000))
+        assert not os.path.exists(path)
+
+
+def test_named_pipe_reader_never_opens():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        path = os.path.join(tmp, "photons.ssv")
+
+        def read():
+            return 42
+
+        with pytest.raises(BrokenPipeError):
+            plenoptics.utils.named_pipe_write_while_reading(
+                path=path, write=write_lines, read=read
+            )
+        assert not os.path.exists(path)
+
+
+def test_named_pipe_streams_several_light_fields():
+    prng = np.random.Generator(np.random.PCG64(3))
+    light_fields = []
+    for num in [10, 2000, 7]:
+        supports = prng.normal(size=(num, 3))
+        directions = prng.normal(size=(num, 3))
+        light_fields.append((supports, directions))
+
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        path = os.path.join(tmp, "photons.ssv")
+
+        def write(path):
+            plenoptics.merlict.write_light_fields_to_space_seperated_values(
+                light_fields=light_fields, path=path
+            )
+
+        def read():
+            with open(path, "rt") as f:
+                return [int(line.split()[0]) for line in f]
+
+        ids = plenoptics.utils.named_pipe_write_while_reading(
+            path=path, write=write, read=read
+        )
+        assert ids == list(range(10 + 2000 + 7))
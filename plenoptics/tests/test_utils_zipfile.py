@@ -0,0 +1,186 @@
+import plenoptics
+import os
+import tempfile
+import glob
+import zipfile
+import pytest
+
+
+def write_job(path, source_config, response_payload):
+    with zipfile.ZipFile(
+        file=path, mode="w", compression=zipfile.ZIP_STORED
+    ) as z:
+        with plenoptics.utils.ZipWriter(
+            zipfile=z, name="source_config.json", mode="wt"
+        ) as f:
+            f.write(source_config)
+        with plenoptics.utils.ZipWriter(
+            zipfile=z, name="raw_sensor_response.phs.gz", mode="wb|gz"
+        ) as f:
+            f.write(response_payload)
+
+
+def make_map_dir(tmp, num_jobs):
+    map_dir = os.path.join(tmp, "star.map")
+    os.makedirs(map_dir)
+    for n in range(num_jobs):
+        write_job(
+            path=os.path.join(map_dir, "{:06d}.job.zip".format(n)),
+            source_config='{"number": ' + str(n) + "}",
+            response_payload=bytes([n % 256]) * (1000 + n),
+        )
+    return map_dir
+
+
+def test_zipfile_reduce_and_indexed_read():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        num_jobs = 13
+        map_dir = make_map_dir(tmp=tmp, num_jobs=num_jobs)
+        out_path = os.path.join(tmp, "star.zip")
+        plenoptics.utils.zipfile_reduce(
+            map_dir=map_dir,
+            out_path=out_path,
+            job_basenames=["source_config.json", "raw_sensor_response.phs.gz"],
+        )
+        assert os.path.exists(out_path)
+        assert os.path.exists(plenoptics.utils.zipfile_index_path(out_path))
+
+        with plenoptics.utils.zipfile_open_for_reading(file=out_path) as z:
+            assert isinstance(z, plenoptics.utils.IndexedZipFile)
+            for n in range(num_jobs):
+                key = "{:06d}".format(n)
+                with plenoptics.utils.ZipReader(
+                    zipfile=z, name=key + "/source_config.json", mode="rt"
+                ) as f:
+                    assert f.read() == '{"number": ' + str(n) + "}"
+                with plenoptics.utils.ZipReader(
+                    zipfile=z,
+                    name=key + "/raw_sensor_response.phs.gz",
+                    mode="rb|gz",
+                ) as f:
+                    assert f.read() == bytes([n % 256]) * (1000 + n)
+
+            with z.memoryview("000005/source_config.json") as view:
+                assert isinstance(view, memoryview)
+                assert bytes(view) == b'{"number": 5}'
+
+            assert plenoptics.utils.zipfile_has_member(
+                zipfile=z, name="000003/source_config.json"
+            )
+            assert not plenoptics.utils.zipfile_has_member(
+                zipfile=z, name="000003/compact_response.npz"
+            )
+            assert not plenoptics.utils.zipfile_has_member(
+                zipfile=z, name="{:06d}/source_config.json".format(num_jobs)
+            )
+
+
+def test_zipfile_reduce_resumes_after_interruption():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        num_jobs = 10
+        map_dir = make_map_dir(tmp=tmp, num_jobs=num_jobs)
+        out_path = os.path.join(tmp, "star.zip")
+        basenames = ["source_config.json", "raw_sensor_response.phs.gz"]
+
+        # job 6 is not finished yet
+        broken_path = os.path.join(map_dir, "000006.job.zip")
+        os.rename(broken_path, broken_path + ".tmp")
+        with open(broken_path, "wb") as f:
+            f.write(b"not a zipfile")
+
+        with pytest.raises(zipfile.BadZipFile):
+            plenoptics.utils.zipfile_reduce(
+                map_dir=map_dir,
+                out_path=out_path,
+                job_basenames=basenames,
+                checkpoint_num_jobs=4,
+            )
+
+        assert not os.path.exists(out_path)
+        assert os.path.exists(out_path + ".part")
+        num_jobs_left = len(glob.glob(os.path.join(map_dir, "*.job.zip")))
+        assert num_jobs_left == num_jobs - 4
+
+        # partially written garbage after the last checkpoint
+        with open(out_path + ".part", "ab") as f:
+            f.write(b"\x00" * 123)
+
+        os.rename(broken_path + ".tmp", broken_path)
+        plenoptics.utils.zipfile_reduce(
+            map_dir=map_dir,
+            out_path=out_path,
+            job_basenames=basenames,
+            checkpoint_num_jobs=4,
+        )
+        assert os.path.exists(out_path)
+        assert not os.path.exists(out_path + ".part")
+        assert len(os.listdir(map_dir)) == 0
+
+        with zipfile.ZipFile(out_path, "r") as z:
+            assert z.testzip() is None
+            assert len(z.namelist()) == 2 * num_jobs
+
+        with plenoptics.utils.zipfile_open_for_reading(file=out_path) as z:
+            for n in range(num_jobs):
+                name = "{:06d}/raw_sensor_response.phs.gz".format(n)
+                with plenoptics.utils.ZipReader(
+                    zipfile=z, name=name, mode="rb|gz"
+                ) as f:
+                    assert f.read() == bytes([n % 256]) * (1000 + n)
+
+
+def test_zipfile_reduce_interrupted_after_rename_keeps_archive():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        num_jobs = 5
+        map_dir = make_map_dir(tmp=tmp, num_jobs=num_jobs)
+        out_path = os.path.join(tmp, "star.zip")
+        basenames = ["source_config.json", "raw_sensor_response.phs.gz"]
+        plenoptics.utils.zipfile_reduce(
+            map_dir=map_dir, out_path=out_path, job_basenames=basenames
+        )
+
+        # as if the call had stopped before it removed its checkpoint
+        checkpoint_path = out_path + ".part.checkpoint.json"
+        plenoptics.utils.json_write(
+            checkpoint_path, {"job_number_strs": ["000000"]}
+        )
+        plenoptics.utils.zipfile_reduce(
+            map_dir=map_dir, out_path=out_path, job_basenames=basenames
+        )
+        assert not os.path.exists(checkpoint_path)
+        with zipfile.ZipFile(out_path, "r") as z:
+            assert len(z.namelist()) == 2 * num_jobs
+
+
+def test_zipfile_reduce_appends_to_existing_archive():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as tmp:
+        map_dir = make_map_dir(tmp=tmp, num_jobs=8)
+        out_path = os.path.join(tmp, "star.zip")
+        basenames = ["source_config.json", "raw_sensor_response.phs.gz"]
+
+        # jobs 5, 6, 7 are not done yet
+        for n in [5, 6, 7]:
+            path = os.path.join(map_dir, "{:06d}.job.zip".format(n))
+            os.rename(path, path + ".later")
+        plenoptics.utils.zipfile_reduce(
+            map_dir=map_dir, out_path=out_path, job_basenames=basenames
+        )
+        with zipfile.ZipFile(out_path, "r") as z:
+            assert len(z.namelist()) == 2 * 5
+
+        for n in [5, 6, 7]:
+            path = os.path.join(map_dir, "{:06d}.job.zip".format(n))
+            os.rename(path + ".later", path)
+        plenoptics.utils.zipfile_reduce(
+            map_dir=map_dir, out_path=out_path, job_basenames=basenames
+        )
+        assert not os.path.exists(out_path + ".part")
+        assert not os.path.exists(out_path + ".part.checkpoint.json")
+
+        with plenoptics.utils.zipfile_open_for_reading(file=out_path) as z:
+            for n in range(8):
+                name = "{:06d}/raw_sensor_response.phs.gz".format(n)
+                with plenoptics.utils.ZipReader(
+                    zipfile=z, name=name, mode="rb|gz"
+                ) as f:
+                    assert f.read() == bytes([n % 256]) * (1000 + n)
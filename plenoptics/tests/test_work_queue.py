@@ -0,0 +1,142 @@
+import plenoptics
+import tempfile
+import subprocess
+import math
+import sys
+import os
+import pytest
+
+
+def _start_workers(work_dir, num):
+    env = dict(os.environ)
+    package_dir = os.path.dirname(os.path.dirname(plenoptics.__file__))
+    env["PYTHONPATH"] = os.pathsep.join(
+        [package_dir] + sys.path[1:] + [env.get("PYTHONPATH", "")]
+    )
+    workers = []
+    for i in range(num):
+        cmd = [
+            sys.executable,
+            "-m",
+            "plenoptics",
+            "worker",
+            work_dir,
+            "--poll_s",
+            "0.05",
+            "--max_idle_s",
+            "3",
+        ]
+        workers.append(
+            subprocess.Popen(
+                cmd,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        )
+    return workers
+
+
+def test_workers_drain_the_queue():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as work_dir:
+        workers = _start_workers(work_dir=work_dir, num=3)
+        pool = plenoptics.work_queue.Pool(work_dir=work_dir, poll_s=0.05)
+
+        items = [float(i) for i in range(20)]
+        assert pool.map(math.sqrt, items) == [math.sqrt(i) for i in items]
+
+        with pytest.raises(RuntimeError) as err:
+            pool.map(math.sqrt, [4.0, -1.0])
+        assert "ValueError" in str(err.value)
+
+        for worker in workers:
+            assert worker.wait(timeout=60) == 0
+
+        queue_dir = plenoptics.work_queue.make_dir(work_dir)
+        for stage in ["todo", "claimed", "done"]:
+            assert os.listdir(os.path.join(queue_dir, stage)) == []
+
+
+def test_claim_of_dead_worker_is_put_back():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as work_dir:
+        plenoptics.work_queue.init(work_dir=work_dir)
+        plenoptics.work_queue.submit(
+            work_dir=work_dir, name="abc.000000", func=math.sqrt, item=9.0
+        )
+        path = plenoptics.work_queue.claim(work_dir=work_dir)
+        assert plenoptics.work_queue.claim(work_dir=work_dir) is None
+
+        # as if the worker which claimed it had died
+        dead_path = path[: path.rindex(".")] + ".999999999"
+        os.rename(path, dead_path)
+
+        plenoptics.work_queue.requeue_stale_claims(work_dir=work_dir)
+        path = plenoptics.work_queue.claim(work_dir=work_dir)
+        assert path is not None
+        result = plenoptics.work_queue.run_claimed(
+            work_dir=work_dir, claimed_path=path
+        )
+        assert result["out"] == 3.0
+        assert result["error"] is None
+
+
+def test_job_taken_as_stale_writes_no_result():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as work_dir:
+        plenoptics.work_queue.init(work_dir=work_dir)
+        queue_dir = plenoptics.work_queue.make_dir(work_dir)
+        done_dir = os.path.join(queue_dir, "done")
+
+        plenoptics.work_queue.submit(
+            work_dir=work_dir, name="abc.000000", func=sys.exit, item=3
+        )
+        path = plenoptics.work_queue.claim(work_dir=work_dir)
+        result = plenoptics.work_queue.run_claimed(
+            work_dir=work_dir, claimed_path=path
+        )
+        assert "SystemExit" in result["error"]
+        assert not os.path.exists(path)
+        os.remove(os.path.join(done_dir, "abc.000000"))
+
+        plenoptics.work_queue.submit(
+            work_dir=work_dir, name="abc.000001", func=math.sqrt, item=4.0
+        )
+        path = plenoptics.work_queue.claim(work_dir=work_dir)
+
+        # still running while it is put back and claimed by an other node
+        plenoptics.work_queue.requeue_stale_claims(
+            work_dir=work_dir, max_claim_age_s=-1.0
+        )
+        other_path = os.path.join(
+            queue_dir, "claimed", "abc.000001.other.node.1"
+        )
+        os.rename(plenoptics.work_queue.claim(work_dir=work_dir), other_path)
+
+        plenoptics.work_queue.run_claimed(work_dir=work_dir, claimed_path=path)
+        assert os.listdir(done_dir) == []
+
+        result = plenoptics.work_queue.run_claimed(
+            work_dir=work_dir, claimed_path=other_path
+        )
+        assert result["out"] == 2.0
+        assert os.listdir(done_dir) == ["abc.000001"]
+
+
+def _interrupt(item):
+    raise KeyboardInterrupt()
+
+
+def test_keyboard_interrupt_stops_the_worker():
+    with tempfile.TemporaryDirectory(prefix="plenoptics_") as work_dir:
+        plenoptics.work_queue.init(work_dir=work_dir)
+        plenoptics.work_queue.submit(
+            work_dir=work_dir, name="abc.000000", func=_interrupt, item=None
+        )
+        path = plenoptics.work_queue.claim(work_dir=work_dir)
+        with pytest.raises(KeyboardInterrupt):
+            plenoptics.work_queue.run_claimed(
+                work_dir=work_dir, claimed_path=path
+            )
+
+        queue_dir = plenoptics.work_queue.make_dir(work_dir)
+        assert os.listdir(os.path.join(queue_dir, "done")) == []
+        assert os.path.exists(path)
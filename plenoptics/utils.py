@@ -1,7 +1,6 @@
 import os
 import plenopy
 import io
-import gzip
 import json_utils
 import glob
 import re
@@ -9,6 +8,14 @@ import rename_after_writing
 import json_line_logger
 import zipfile
 import posixpath
+import struct
+import zlib
+import mmap
+import shutil
+import base64
+import threading
+import numpy as np
+from . import compression
 
 
 def LoggerStdout_if_None(logger):
@@ -40,7 +47,7 @@ class SerialPool:
     def __init__(self):
         pass
 
-    def map(func, iterable):
+    def map(self, func, iterable):
         return [func(item) for item in iterable]
 
 
@@ -79,19 +86,77 @@ def class_members_to_dict(c):
 
 
 def gzip_read_raw_sensor_response(path):
-    with gzip.open(path, "rb") as f:
+    with open(path, "rb") as fraw, compression.open_reader(fraw) as f:
         raw = plenopy.raw_light_field_sensor_response.read(f)
     return raw
 
 
-def gzip_write_raw_sensor_response(path, raw_sensor_response):
-    with gzip.open(path + ".incomplete", "wb") as f:
+def gzip_write_raw_sensor_response(
+    path, raw_sensor_response, codec=compression.DEFAULT
+):
+    with open(path + ".incomplete", "wb") as fraw, compression.open_writer(
+        fileobj=fraw, codec=codec
+    ) as f:
         plenopy.raw_light_field_sensor_response.write(
             f=f, raw_sensor_response=raw_sensor_response
         )
     os.rename(path + ".incomplete", path)
 
 
+def named_pipe_write_while_reading(path, write, read):
+    """
+    Makes a named pipe (FIFO) in path. While read() consumes the pipe in
+    this thread, write(path) streams into it from another thread. So the
+    data is never stored in full on disk.
+
+    Parameters
+    ----------
+    path : str
+        Path of the named pipe. Removed in the end.
+    write : function(path)
+        Opens path for writing and writes the data.
+    read : function()
+        Opens path for reading, e.g. by running a program which reads it.
+
+    Returns
+    -------
+    The return value of read().
+    """
+    os.mkfifo(path)
+    errors = []
+
+    def _write():
+        try:
+            write(path)
+        except BaseException as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=_write, daemon=True)
+    thread.start()
+    try:
+        out = read()
+    finally:
+        _named_pipe_unblock_writer(path=path, thread=thread)
+        os.remove(path)
+
+    if len(errors) > 0:
+        raise errors[0]
+    return out
+
+
+def _named_pipe_unblock_writer(path, thread):
+    """
+    When the reader quits without opening the pipe, the writer waits for
+    it forever. Opening and closing the reading end lets the writer run
+    into a BrokenPipeError instead.
+    """
+    thread.join(timeout=0.1)
+    while thread.is_alive():
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        os.close(fd)
+        thread.join(timeout=0.1)
+
+
 def json_write(path, o):
     with rename_after_writing.open(path, "wt") as f:
         f.write(json_utils.dumps(o))
@@ -104,40 +169,43 @@ def json_read(path):
 
 
 class ZipWriter:
-    def __init__(self, zipfile, name, mode="wt"):
+    """
+    Writes the member 'name' into the zipfile. The caller writes into a
+    file-like which streams into zipfile.open(name, "w"). For '|gz' the
+    payload is compressed incrementally on the way using the codec, see
+    plenoptics.compression. The suffix '|gz' is kept for compatibility and
+    does not imply gzip.
+    """
+
+    def __init__(self, zipfile, name, mode="wt", codec=compression.DEFAULT):
         self.mode = mode
         self.name = name
         self.zipfile = zipfile
+        self.codec = codec
 
         assert self.mode in ["wt", "wb", "wt|gz", "wb|gz"]
-
-        if "t" in self.mode:
-            self.buff = io.StringIO()
-        elif "b" in self.mode:
-            self.buff = io.BytesIO()
-        else:
+        if "t" not in self.mode and "b" not in self.mode:
             raise ValueError("Expected mode to contain either 'b' or 't'.")
 
     def __enter__(self):
-        return self.buff
+        self.member = self.zipfile.open(self.name, "w")
+        self.buff = self.member
 
-    def __exit__(self, type, value, traceback):
-        self.buff.seek(0)
+        if "|gz" in self.mode:
+            self.buff = compression.open_writer(
+                fileobj=self.buff, codec=self.codec
+            )
 
         if "t" in self.mode:
-            payload_bytes = str.encode(self.buff.read())
-        elif "b" in self.mode:
-            payload_bytes = self.buff.read()
-        del self.buff
+            self.buff = io.TextIOWrapper(
+                self.buff, encoding="utf-8", newline=""
+            )
 
-        if "|gz" in self.mode:
-            payload_raw = gzip.compress(payload_bytes)
-            del payload_bytes
-        else:
-            payload_raw = payload_bytes
+        return self.buff
 
-        with self.zipfile.open(self.name, "w") as z:
-            z.write(payload_raw)
+    def __exit__(self, type, value, traceback):
+        self.buff.close()
+        self.member.close()
 
     def __repr__(self):
         return "{:s}(name='{:s}', mode='{:s}')".format(
@@ -146,17 +214,29 @@ class ZipWriter:
 
 
 class ZipReader:
+    """
+    Reads the member 'name' from the zipfile. When the zipfile is an
+    IndexedZipFile, the member is streamed from the memory-mapped archive
+    and is neither copied nor decompressed up front. Otherwise the member
+    is read into memory. For '|gz' the codec is detected.
+    """
+
     def __init__(self, zipfile, name, mode="rt"):
         self.mode = mode
         self.name = name
 
         assert self.mode in ["rt", "rb", "rt|gz", "rb|gz"]
+        self.raw = None
+
+        if isinstance(zipfile, IndexedZipFile):
+            self.buff = self._open_stream(zipfile.memoryview(self.name))
+            return
 
         with zipfile.open(self.name, "r") as z:
             payload_raw = z.read()
 
         if "|gz" in self.mode:
-            payload_bytes = gzip.decompress(payload_raw)
+            payload_bytes = compression.decompress(payload_raw)
             del payload_raw
         else:
             payload_bytes = payload_raw
@@ -172,11 +252,22 @@ class ZipReader:
 
         self.buff.seek(0)
 
+    def _open_stream(self, view):
+        self.raw = MemoryviewIO(view=view)
+        stream = io.BufferedReader(self.raw)
+        if "|gz" in self.mode:
+            stream = compression.open_reader(stream)
+        if "t" in self.mode:
+            stream = io.TextIOWrapper(stream, encoding="utf-8")
+        return stream
+
     def __enter__(self):
         return self.buff
 
     def __exit__(self, type, value, traceback):
-        pass
+        self.buff.close()
+        if self.raw is not None:
+            self.raw.close()
 
     def __repr__(self):
         return "{:s}(name='{:s}', mode='{:s}')".format(
@@ -190,7 +281,48 @@ def zipfile_reduce(
     job_basenames=[],
     job_ext=".job.zip",
     remove_after_reduce=True,
+    checkpoint_num_jobs=256,
+    chunk_size=2**20,
 ):
+    """
+    Reduces the job-archives in map_dir into the archive out_path. The
+    member 'basename' of job-archive 'NNNNNN.job.zip' becomes the member
+    'NNNNNN/basename' in out_path.
+
+    The members' bytes are copied in chunks of chunk_size without being
+    decompressed. The reduction is written into out_path + '.part' and is
+    checkpointed every checkpoint_num_jobs jobs. When a reduction was
+    interrupted, the next call resumes from the last checkpoint and
+    appends the jobs which are not yet in the partial archive. Only when
+    all jobs are in, the partial archive is renamed to out_path. When
+    out_path already exists, the jobs in map_dir are appended to it.
+    """
+    assert checkpoint_num_jobs > 0
+    assert chunk_size > 0
+    part_path = out_path + ".part"
+    checkpoint_path = part_path + ".checkpoint.json"
+    index_path = zipfile_index_path(out_path)
+
+    if (
+        os.path.exists(checkpoint_path)
+        and os.path.exists(out_path)
+        and not os.path.exists(part_path)
+    ):
+        # The last call was interrupted right after it renamed the partial
+        # archive to out_path. Its jobs are already removed.
+        os.remove(checkpoint_path)
+        return
+
+    if os.path.exists(out_path) and not os.path.exists(part_path):
+        _zipfile_seed_part(
+            out_path=out_path,
+            part_path=part_path,
+            checkpoint_path=checkpoint_path,
+        )
+
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
     pot_job_paths = sorted(glob.glob(os.path.join(map_dir, "*" + job_ext)))
     job_paths = {}
 
@@ -200,22 +332,342 @@ def zipfile_reduce(
             job_number_str = re.findall(r"\d+", basename)[0]
             job_paths[job_number_str] = pot_job_path
 
-    with rename_after_writing.open(out_path, "wb") as file:
+    if os.path.exists(checkpoint_path) and os.path.exists(part_path):
+        checkpoint = json_read(checkpoint_path)
+        _zipfile_restore_checkpoint(path=part_path, checkpoint=checkpoint)
+    else:
+        checkpoint = {"job_number_strs": []}
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+    reduced = set(checkpoint["job_number_strs"])
+    todo = [j for j in job_paths if j not in reduced]
+    buff = bytearray(chunk_size)
+
+    for start in range(0, len(todo), checkpoint_num_jobs):
+        block = todo[start : start + checkpoint_num_jobs]
+        zmode = "a" if os.path.exists(part_path) else "w"
         with zipfile.ZipFile(
-            file=file, mode="w", compression=zipfile.ZIP_STORED
+            file=part_path, mode=zmode, compression=zipfile.ZIP_STORED
         ) as zout:
-            for job_number_str in job_paths:
-                with zipfile.ZipFile(job_paths[job_number_str], "r") as zin:
-                    for basename in job_basenames:
-                        with zin.open(basename, "r") as fin:
-                            with zout.open(
-                                os.path.join(job_number_str, basename), "w"
-                            ) as fout:
-                                fout.write(fin.read())
-
-    if remove_after_reduce:
-        for job_number_str in job_paths:
-            os.remove(job_paths[job_number_str])
+            for job_number_str in block:
+                _zipfile_reduce_copy_job(
+                    zout=zout,
+                    job_path=job_paths[job_number_str],
+                    job_number_str=job_number_str,
+                    job_basenames=job_basenames,
+                    buff=buff,
+                )
+
+        checkpoint["job_number_strs"] += block
+        checkpoint.update(
+            _zipfile_make_checkpoint(path=part_path, data_end=zout.start_dir)
+        )
+        json_write(checkpoint_path, checkpoint)
+
+        if remove_after_reduce:
+            for job_number_str in block:
+                os.remove(job_paths[job_number_str])
+
+    if not os.path.exists(part_path):
+        with zipfile.ZipFile(file=part_path, mode="w"):
+            pass
+
+    zipfile_write_index(path=part_path, index_path=index_path)
+    os.rename(part_path, out_path)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+
+def _zipfile_seed_part(out_path, part_path, checkpoint_path):
+    """
+    Makes the existing archive out_path the partial archive with a
+    checkpoint of all its jobs, so that further jobs are appended to it.
+    The checkpoint is written first. When interrupted before the rename,
+    out_path stays as it is.
+    """
+    with zipfile.ZipFile(file=out_path, mode="r") as z:
+        job_number_strs = sorted(
+            set([posixpath.dirname(name) for name in z.namelist()])
+        )
+        data_end = z.start_dir
+    checkpoint = {"job_number_strs": job_number_strs}
+    checkpoint.update(
+        _zipfile_make_checkpoint(path=out_path, data_end=data_end)
+    )
+    json_write(checkpoint_path, checkpoint)
+    os.rename(out_path, part_path)
+
+
+def _zipfile_make_checkpoint(path, data_end):
+    """
+    Appending to a zipfile overwrites its central directory. To be able to
+    restore the archive as it is now, the checkpoint keeps a copy of the
+    central directory and of where it starts.
+    """
+    with open(path, "rb") as f:
+        f.seek(data_end)
+        central_directory = f.read()
+    return {
+        "data_end": data_end,
+        "central_directory": base64.b64encode(central_directory).decode(),
+    }
+
+
+def _zipfile_restore_checkpoint(path, checkpoint):
+    with open(path, "r+b") as f:
+        f.truncate(checkpoint["data_end"])
+        f.seek(checkpoint["data_end"])
+        f.write(base64.b64decode(checkpoint["central_directory"]))
+
+
+def _zipfile_reduce_copy_job(
+    zout, job_path, job_number_str, job_basenames, buff
+):
+    with open(job_path, "rb") as fin:
+        with zipfile.ZipFile(file=fin, mode="r") as zin:
+            for basename in job_basenames:
+                info = zin.getinfo(basename)
+                oinfo = zipfile.ZipInfo(
+                    filename=posixpath.join(job_number_str, basename),
+                    date_time=info.date_time,
+                )
+                oinfo.compress_type = zipfile.ZIP_STORED
+                oinfo.file_size = info.file_size
+
+                with zout.open(oinfo, "w") as fout:
+                    if info.compress_type == zipfile.ZIP_STORED:
+                        fin.seek(_zipfile_payload_offset(f=fin, info=info))
+                        _copy_chunks(
+                            fin=fin,
+                            fout=fout,
+                            size=info.compress_size,
+                            buff=buff,
+                        )
+                    else:
+                        with zin.open(basename, "r") as fmember:
+                            shutil.copyfileobj(fmember, fout, len(buff))
+
+
+def _copy_chunks(fin, fout, size, buff):
+    view = memoryview(buff)
+    remaining = size
+    while remaining > 0:
+        num = fin.readinto(view[: min(remaining, len(buff))])
+        if num == 0:
+            raise EOFError("Expected {:d} more bytes.".format(remaining))
+        fout.write(view[:num])
+        remaining -= num
+
+
+def zipfile_index_path(path):
+    return path + ".index.npy"
+
+
+def zipfile_write_index(path, index_path=None):
+    """
+    Writes the sidecar index of the archive in path. The archive's members
+    are expected to be named '<job_number>/<basename>' and to be stored
+    without compression, as written by zipfile_reduce.
+
+    The index is a record-array sorted by 'job_number' with the fields
+    '<basename>/offset', '<basename>/size' and '<basename>/crc' for each
+    basename. The offset points to the first byte of the member's payload
+    and is -1 when the job has no such member.
+    """
+    members = {}
+    basenames = []
+    with open(path, "rb") as f:
+        with zipfile.ZipFile(file=f, mode="r") as z:
+            for info in z.infolist():
+                job_number_str, basename = posixpath.split(info.filename)
+                if not job_number_str.isdigit():
+                    continue
+                if info.compress_type != zipfile.ZIP_STORED:
+                    continue
+                if basename not in basenames:
+                    basenames.append(basename)
+                job_number = int(job_number_str)
+                if job_number not in members:
+                    members[job_number] = {}
+                members[job_number][basename] = (
+                    _zipfile_payload_offset(f=f, info=info),
+                    info.compress_size,
+                    info.CRC,
+                )
+
+    dtype = [("job_number", np.int64)]
+    for basename in basenames:
+        dtype.append((basename + "/offset", np.int64))
+        dtype.append((basename + "/size", np.int64))
+        dtype.append((basename + "/crc", np.uint32))
+
+    job_numbers = sorted(members.keys())
+    index = np.zeros(len(job_numbers), dtype=dtype)
+    for i, job_number in enumerate(job_numbers):
+        index[i]["job_number"] = job_number
+        for basename in basenames:
+            if basename in members[job_number]:
+                offset, size, crc = members[job_number][basename]
+            else:
+                offset, size, crc = -1, 0, 0
+            index[i][basename + "/offset"] = offset
+            index[i][basename + "/size"] = size
+            index[i][basename + "/crc"] = crc
+
+    if index_path is None:
+        index_path = zipfile_index_path(path)
+    with rename_after_writing.open(index_path, "wb") as f:
+        np.save(f, index)
+
+
+def _zipfile_payload_offset(f, info):
+    ZIP_LOCAL_HEADER_SIZE = 30
+    f.seek(info.header_offset)
+    local_header = f.read(ZIP_LOCAL_HEADER_SIZE)
+    filename_length, extra_length = struct.unpack("<HH", local_header[26:30])
+    return (
+        info.header_offset
+        + ZIP_LOCAL_HEADER_SIZE
+        + filename_length
+        + extra_length
+    )
+
+
+class IndexedZipFile:
+    """
+    Reads the members of an archive written by zipfile_reduce without
+    parsing its central directory. Each member is looked up in the
+    sidecar index (see zipfile_write_index) and read with a single seek.
+    Behaves like a zipfile.ZipFile opened for reading as far as ZipReader
+    and zipfile_has_member are concerned.
+    """
+
+    def __init__(self, file, check_crc=True):
+        self.file = file
+        self.check_crc = check_crc
+        self.index = np.load(zipfile_index_path(file), mmap_mode="r")
+        with open(file, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _lookup(self, name):
+        job_number_str, basename = posixpath.split(name)
+        if not job_number_str.isdigit():
+            raise KeyError(name)
+        if basename + "/offset" not in self.index.dtype.names:
+            raise KeyError(name)
+        job_number = int(job_number_str)
+        i = np.searchsorted(self.index["job_number"], job_number)
+        if i >= len(self.index) or self.index["job_number"][i] != job_number:
+            raise KeyError(name)
+        offset = int(self.index[basename + "/offset"][i])
+        if offset < 0:
+            raise KeyError(name)
+        size = int(self.index[basename + "/size"][i])
+        crc = int(self.index[basename + "/crc"][i])
+        return offset, size, crc
+
+    def getinfo(self, name):
+        offset, size, crc = self._lookup(name)
+        return {"offset": offset, "size": size, "crc": crc}
+
+    def memoryview(self, name):
+        """
+        Returns the payload of the member as a slice of the memory-mapped
+        archive without copying it.
+        """
+        offset, size, crc = self._lookup(name)
+        view = memoryview(self.mmap)[offset : offset + size]
+        if self.check_crc and zlib.crc32(view) != crc:
+            view.release()
+            raise zipfile.BadZipFile(
+                "Bad CRC-32 for member '{:s}' in '{:s}'.".format(
+                    name, self.file
+                )
+            )
+        return view
+
+    def read(self, name):
+        with self.memoryview(name) as view:
+            return bytes(view)
+
+    def open(self, name, mode="r"):
+        assert mode == "r"
+        return io.BufferedReader(MemoryviewIO(view=self.memoryview(name)))
+
+    def close(self):
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "{:s}(file='{:s}')".format(self.__class__.__name__, self.file)
+
+
+class MemoryviewIO(io.RawIOBase):
+    """
+    A read-only, seekable file-like over a memoryview which does not copy
+    the memoryview.
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        num = min(len(b), len(self.view) - self.pos)
+        b[:num] = self.view[self.pos : self.pos + num]
+        self.pos += num
+        return num
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.pos = offset
+        elif whence == io.SEEK_CUR:
+            self.pos += offset
+        elif whence == io.SEEK_END:
+            self.pos = len(self.view) + offset
+        else:
+            raise ValueError("Unknown whence.")
+        self.pos = max(0, self.pos)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def close(self):
+        if not self.closed:
+            self.view.release()
+        super().close()
+
+
+def zipfile_open_for_reading(file):
+    """
+    Returns an IndexedZipFile when the archive has a sidecar index and a
+    zipfile.ZipFile otherwise.
+    """
+    if os.path.exists(zipfile_index_path(file)):
+        return IndexedZipFile(file=file)
+    else:
+        return zipfile.ZipFile(file=file, mode="r")
+
+
+def zipfile_has_member(zipfile, name):
+    try:
+        zipfile.getinfo(name)
+        return True
+    except KeyError:
+        return False
 
 
 def zipfile_json_read_to_dict(file):
@@ -0,0 +1,301 @@
+"""
+A queue of jobs in work_dir/queue which workers on several nodes can drain
+together when they share the work_dir, e.g. via NFS. There is no broker.
+Everything is a file:
+
+- todo/<name>: The manifest of a job, i.e. the pickled function and its
+  item.
+- claimed/<name>.<host>.<pid>: A worker claims a job by renaming its
+  manifest into claimed/. The rename is atomic, so only one worker gets
+  the job.
+- done/<name>: The pickled result of the job, or the traceback when the
+  job raised.
+
+Files are written to a temporary name first and then renamed, so nobody
+reads a half written file.
+
+Pool(work_dir) has a 'map' and can be passed to plenoptics.run(). Start
+workers with
+
+    plenoptics worker <work_dir>
+
+on as many nodes as you like. Workers can start before and after the
+jobs are submitted.
+"""
+import os
+import time
+import uuid
+import pickle
+import socket
+import traceback
+from . import utils
+
+
+def make_dir(work_dir):
+    return os.path.join(work_dir, "queue")
+
+
+def init(work_dir):
+    for stage in ["todo", "claimed", "done"]:
+        os.makedirs(_stage_dir(work_dir, stage), exist_ok=True)
+
+
+class Pool:
+    """
+    Runs the jobs of map() in the workers which drain the queue in
+    work_dir, see work().
+    """
+
+    def __init__(self, work_dir, poll_s=1.0, max_claim_age_s=None):
+        """
+        Parameters
+        ----------
+        work_dir : str
+            The queue is in work_dir/queue.
+        poll_s : float
+            How often to look for the results.
+        max_claim_age_s : float or None
+            A job claimed longer ago than this is put back into todo/, e.g.
+            when its worker was killed. Claims of dead workers on this host
+            are always put back.
+        """
+        self.work_dir = work_dir
+        self.poll_s = float(poll_s)
+        self.max_claim_age_s = max_claim_age_s
+        init(work_dir=self.work_dir)
+
+    def map(self, func, iterable):
+        """
+        Returns [func(item) for item in iterable] with the items run by the
+        workers.
+
+        Raises
+        ------
+        RuntimeError
+            When at least one item raised in its worker.
+        """
+        batch = uuid.uuid4().hex
+        names = []
+        for i, item in enumerate(iterable):
+            name = "{:s}.{:06d}".format(batch, i)
+            submit(work_dir=self.work_dir, name=name, func=func, item=item)
+            names.append(name)
+
+        results = {}
+        while len(results) < len(names):
+            for name in names:
+                if name not in results:
+                    result = _pop_result(work_dir=self.work_dir, name=name)
+                    if result is not None:
+                        results[name] = result
+            if len(results) < len(names):
+                requeue_stale_claims(
+                    work_dir=self.work_dir,
+                    max_claim_age_s=self.max_claim_age_s,
+                )
+                time.sleep(self.poll_s)
+
+        errors = [results[n]["error"] for n in names if results[n]["error"]]
+        if len(errors) > 0:
+            raise RuntimeError(
+                "{:d} of {:d} jobs failed. First:\n{:s}".format(
+                    len(errors), len(names), errors[0]
+                )
+            )
+        return [results[name]["out"] for name in names]
+
+    def __repr__(self):
+        return "{:s}(work_dir='{:s}')".format(
+            self.__class__.__name__, self.work_dir
+        )
+
+
+def submit(work_dir, name, func, item):
+    """
+    Writes the manifest of the job func(item) into todo/. func must be
+    picklable, i.e. defined on module level.
+    """
+    _write_pickle(
+        path=os.path.join(_stage_dir(work_dir, "todo"), name),
+        obj={"func": func, "item": item},
+    )
+
+
+def claim(work_dir):
+    """
+    Returns the path of the manifest claimed by this process or None when
+    there is nothing to do.
+    """
+    todo_dir = _stage_dir(work_dir, "todo")
+    for name in sorted(os.listdir(todo_dir)):
+        if name.endswith(".tmp"):
+            continue
+        claimed_path = os.path.join(
+            _stage_dir(work_dir, "claimed"),
+            "{:s}.{:s}.{:d}".format(name, socket.gethostname(), os.getpid()),
+        )
+        try:
+            os.rename(os.path.join(todo_dir, name), claimed_path)
+        except FileNotFoundError:
+            continue  # An other worker was faster.
+        os.utime(claimed_path)  # The age of the claim starts now.
+        return claimed_path
+    return None
+
+
+def run_claimed(work_dir, claimed_path):
+    """
+    Runs the job in claimed_path and writes its result into done/.
+    """
+    name = _split_claim(os.path.basename(claimed_path))["name"]
+    result = {
+        "out": None,
+        "error": None,
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+    }
+    try:
+        manifest = _read_pickle(path=claimed_path)
+        result["out"] = manifest["func"](manifest["item"])
+    except (Exception, SystemExit):
+        # Also e.g. the SystemExit of a script's argparse. A
+        # KeyboardInterrupt stops the worker and leaves the claim behind,
+        # see requeue_stale_claims().
+        result["error"] = traceback.format_exc()
+
+    try:
+        os.remove(claimed_path)
+    except FileNotFoundError:
+        # It was taken as stale and put back into todo/. The worker which
+        # runs it again writes the result, so there is only one.
+        return result
+    _write_pickle(
+        path=os.path.join(_stage_dir(work_dir, "done"), name), obj=result
+    )
+    return result
+
+
+def work(work_dir, poll_s=1.0, max_idle_s=None, logger=None):
+    """
+    Claims and runs jobs from the queue in work_dir.
+
+    Parameters
+    ----------
+    work_dir : str
+        The queue is in work_dir/queue.
+    poll_s : float
+        How often to look for new jobs when there are none.
+    max_idle_s : float or None
+        Return after there were no jobs for this long. None waits forever.
+    logger : json_line_logger
+        Logs the jobs.
+
+    Returns
+    -------
+    num_jobs : int
+        The number of jobs which were run.
+    """
+    logger = utils.LoggerStdout_if_None(logger=logger)
+    init(work_dir=work_dir)
+    logger.info(
+        "Worker {:s}.{:d} on '{:s}'.".format(
+            socket.gethostname(), os.getpid(), make_dir(work_dir)
+        )
+    )
+
+    num_jobs = 0
+    idle_since = time.monotonic()
+    while True:
+        claimed_path = claim(work_dir=work_dir)
+        if claimed_path is None:
+            if max_idle_s is not None:
+                if time.monotonic() - idle_since > max_idle_s:
+                    break
+            time.sleep(poll_s)
+            continue
+
+        result = run_claimed(work_dir=work_dir, claimed_path=claimed_path)
+        num_jobs += 1
+        if result["error"]:
+            logger.warning(
+                "Job '{:s}' failed.".format(os.path.basename(claimed_path))
+            )
+        idle_since = time.monotonic()
+
+    logger.info("Worker ran {:d} jobs.".format(num_jobs))
+    return num_jobs
+
+
+def requeue_stale_claims(work_dir, max_claim_age_s=None):
+    """
+    Puts claimed jobs back into todo/ when their worker on this host is
+    dead, or, on any host, when they were claimed longer than
+    max_claim_age_s ago.
+    """
+    claimed_dir = _stage_dir(work_dir, "claimed")
+    hostname = socket.gethostname()
+    now = time.time()
+    for basename in os.listdir(claimed_dir):
+        owner = _split_claim(basename)
+        path = os.path.join(claimed_dir, basename)
+        try:
+            age_s = now - os.stat(path).st_mtime
+        except FileNotFoundError:
+            continue
+
+        stale = False
+        if owner["host"] == hostname and not _pid_is_alive(owner["pid"]):
+            stale = True
+        if max_claim_age_s is not None and age_s > max_claim_age_s:
+            stale = True
+
+        if stale:
+            try:
+                os.rename(
+                    path,
+                    os.path.join(_stage_dir(work_dir, "todo"), owner["name"]),
+                )
+            except FileNotFoundError:
+                pass
+
+
+def _stage_dir(work_dir, stage):
+    return os.path.join(make_dir(work_dir), stage)
+
+
+def _split_claim(basename):
+    # <batch>.<number>.<host>.<pid> where host may contain dots.
+    batch, number, rest = str.split(basename, ".", 2)
+    host, pid = str.rsplit(rest, ".", 1)
+    return {"name": batch + "." + number, "host": host, "pid": int(pid)}
+
+
+def _pid_is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _pop_result(work_dir, name):
+    path = os.path.join(_stage_dir(work_dir, "done"), name)
+    if not os.path.exists(path):
+        return None
+    result = _read_pickle(path=path)
+    os.remove(path)
+    return result
+
+
+def _write_pickle(path, obj):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f)
+    os.rename(tmp_path, path)
+
+
+def _read_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
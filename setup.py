@@ -31,12 +31,18 @@ setuptools.setup(
         "plenoptics.sources",
         "plenoptics.analysis",
         "plenoptics.production",
+        "plenoptics.scripts",
     ],
     package_data={
         "plenoptics": [
             os.path.join("scripts", "*"),
         ],
     },
+    entry_points={
+        "console_scripts": [
+            "plenoptics=plenoptics.__main__:main",
+        ],
+    },
     install_requires=[
         "perlin_noise",
         "json_utils_sebastian-achim-mueller",